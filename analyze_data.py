@@ -1,52 +1,71 @@
 import pandas as pd
 import sys
 
+from parksense.artifact_cache import cached, id_summary
+from parksense.bay_registry import BayRegistry
+
+BAYS_PATH = 'data/on-street-parking-bays.csv'
+SENSORS_PATH = 'data/on-street-parking-bay-sensors.csv'
+DUPLICATES_VERSION = 1
+
 def log(msg, file):
     print(msg)
     file.write(msg + "\n")
 
+def bay_duplicates():
+    # Rows of bays sharing a KerbsideID, first 5 by ID (cached until the bays file changes)
+    def compute():
+        bays = pd.read_csv(BAYS_PATH, usecols=['KerbsideID', 'RoadSegmentDescription'])
+        bays_with_id = bays[bays['KerbsideID'].notna()]
+        dupes = bays_with_id[bays_with_id.duplicated('KerbsideID', keep=False)]
+        head = dupes.sort_values('KerbsideID').head()
+        return {
+            'count': len(dupes),
+            'index': head.index.to_numpy(),
+            'kerbside_id': head['KerbsideID'].to_numpy(),
+            'description': head['RoadSegmentDescription'].fillna('NaN').to_numpy(dtype=str),
+        }
+    return cached('bay_duplicates', DUPLICATES_VERSION, [BAYS_PATH], compute)
+
 try:
     with open('analysis_report.txt', 'w') as f:
-        # Load datasets
+        # Load datasets (ID columns only; repeat runs read the cached summaries)
         log("Loading datasets...", f)
-        bays = pd.read_csv('data/on-street-parking-bays.csv')
-        sensors = pd.read_csv('data/on-street-parking-bay-sensors.csv')
+        bays = id_summary(BAYS_PATH, 'KerbsideID')
+        sensors = id_summary(SENSORS_PATH, 'KerbsideID')
 
-        log(f"Bays columns: {list(bays.columns)}", f)
-        log(f"Sensors columns: {list(sensors.columns)}", f)
+        log(f"Bays columns: {bays['columns'].tolist()}", f)
+        log(f"Sensors columns: {sensors['columns'].tolist()}", f)
 
         # Check KerbsideID
         log("\n--- KerbsideID Analysis ---", f)
-        log(f"Total bays rows: {len(bays)}", f)
-        bays_with_id = bays[bays['KerbsideID'].notna()]
-        log(f"Bays with KerbsideID: {len(bays_with_id)}", f)
-        log(f"Unique KerbsideIDs in bays: {bays['KerbsideID'].nunique()}", f)
+        log(f"Total bays rows: {bays['rows']}", f)
+        log(f"Bays with KerbsideID: {bays['non_null']}", f)
+        log(f"Unique KerbsideIDs in bays: {bays['unique']}", f)
 
-        log(f"\nTotal sensor readings: {len(sensors)}", f)
-        sensors_with_id = sensors[sensors['KerbsideID'].notna()]
-        log(f"Sensors with KerbsideID: {len(sensors_with_id)}", f)
-        log(f"Unique KerbsideIDs in sensors: {sensors['KerbsideID'].nunique()}", f)
+        log(f"\nTotal sensor readings: {sensors['rows']}", f)
+        log(f"Sensors with KerbsideID: {sensors['non_null']}", f)
+        log(f"Unique KerbsideIDs in sensors: {sensors['unique']}", f)
 
         # Overlap
-        # Convert to string to ensure type matching, dropping .0 if float
-        bays_ids = set(bays_with_id['KerbsideID'].astype(str).str.replace(r'\.0$', '', regex=True))
-        sensor_ids = set(sensors_with_id['KerbsideID'].astype(str).str.replace(r'\.0$', '', regex=True))
-
-        common_ids = bays_ids & sensor_ids
+        # Integer KerbsideIDs checked against the bay registry (sorted array lookup)
+        registry = BayRegistry.load_or_build(BAYS_PATH)
+        common_ids, missing_in_bays = registry.overlap(sensors['ids'])
         log(f"\nCommon KerbsideIDs: {len(common_ids)}", f)
 
         # Check if all sensor IDs are in bays
-        missing_in_bays = sensor_ids - bays_ids
         log(f"Sensor IDs NOT in bays file: {len(missing_in_bays)}", f)
         if len(missing_in_bays) > 0:
-            log(f"Example missing IDs (first 5): {list(missing_in_bays)[:5]}", f)
+            log(f"Example missing IDs (first 5): {[str(i) for i in missing_in_bays[:5]]}", f)
 
         # Check duplicates in bays
         log("\n--- Duplicates in Bays ---", f)
-        dupes = bays_with_id[bays_with_id.duplicated('KerbsideID', keep=False)]
-        if not dupes.empty:
-            log(f"Duplicate KerbsideIDs found in bays: {len(dupes)}", f)
-            log(str(dupes[['KerbsideID', 'RoadSegmentDescription']].sort_values('KerbsideID').head()), f)
+        dupes = bay_duplicates()
+        if dupes['count'] > 0:
+            log(f"Duplicate KerbsideIDs found in bays: {dupes['count']}", f)
+            head = pd.DataFrame({'KerbsideID': dupes['kerbside_id'], 'RoadSegmentDescription': dupes['description']},
+                                index=dupes['index'])
+            log(str(head), f)
         else:
             log("No duplicate KerbsideIDs in bays (ignoring NaNs).", f)
 
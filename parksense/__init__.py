@@ -0,0 +1,6 @@
+"""
+Shared data and modelling code for ParkSense.
+
+Scripts under `scripts/` and the training entry point import from here so
+the same logic is used everywhere (and by the FastAPI backend).
+"""
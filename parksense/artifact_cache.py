@@ -0,0 +1,148 @@
+"""
+Content-addressed cache for small artifacts derived from the big datasets
+(ID sets, time ranges, status counts, duplicate IDs), shared by the
+diagnostic scripts so a repeat run on unchanged data skips the CSV reads.
+
+An artifact is a dict of NumPy arrays and scalars. Its key hashes the
+artifact name, the transform version, any parameters and the inputs. An
+input is keyed by its size and mtime (or by its SHA-256 with
+`content=True`), and a directory such as the snapshot store by its Parquet
+part files. So a changed input or a bumped version gives a new key, and the
+old entry is never read again. Entries are uncompressed .npz files under
+`data/cache/`, loaded without pickle. A hit refreshes the entry's mtime, and
+after each write the least recently used entries are evicted until the cache
+fits in MAX_CACHE_BYTES.
+
+    python -m parksense.artifact_cache          # list entries
+    python -m parksense.artifact_cache clear
+"""
+import hashlib
+import json
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+from parksense.csv_profile import source_stat
+
+CACHE_DIR = 'data/cache'
+MAX_CACHE_BYTES = 64 * 1024 * 1024
+HASH_BLOCK = 8 * 1024 * 1024
+ID_SUMMARY_VERSION = 1
+
+
+def content_hash(path):
+    sha = hashlib.sha256()
+    with open(path, 'rb') as f:
+        while block := f.read(HASH_BLOCK):
+            sha.update(block)
+    return sha.hexdigest()
+
+
+def input_key(path, content=False):
+    """What identifies one input: its SHA-256 if `content`, else (size, mtime_ns)."""
+    if content and not os.path.isdir(path):
+        return [os.path.abspath(path), content_hash(path)]
+    return [os.path.abspath(path), *source_stat(path)]
+
+
+def artifact_key(name, version, inputs, params=None, content=False):
+    key = {'name': name, 'version': version, 'params': params,
+           'inputs': [input_key(path, content) for path in inputs]}
+    digest = hashlib.sha256(json.dumps(key, sort_keys=True, default=str).encode()).hexdigest()
+    return f'{name}-{digest[:16]}'
+
+
+def _entries(cache_dir):
+    if not os.path.isdir(cache_dir):
+        return []
+    return [os.path.join(cache_dir, name) for name in os.listdir(cache_dir) if name.endswith('.npz')]
+
+
+def evict(cache_dir=CACHE_DIR, max_bytes=MAX_CACHE_BYTES):
+    """Deletes the least recently used entries until the cache is at most `max_bytes`."""
+    entries = sorted((os.stat(path).st_mtime_ns, os.path.getsize(path), path) for path in _entries(cache_dir))
+    total = sum(size for _, size, _ in entries)
+    removed = 0
+    for _, size, path in entries:
+        if total <= max_bytes:
+            break
+        os.remove(path)
+        total -= size
+        removed += 1
+    return removed
+
+
+def _load(path):
+    artifact = {}
+    with np.load(path, allow_pickle=False) as data:
+        for name in data.files:
+            value = data[name]
+            artifact[name] = value.item() if value.ndim == 0 else value
+    return artifact
+
+
+def _save(path, artifact):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        np.savez(f, **{name: np.asarray(value) for name, value in artifact.items()})
+    os.replace(tmp_path, path)
+
+
+def cached(name, version, inputs, compute, params=None, content=False,
+           cache_dir=CACHE_DIR, max_bytes=MAX_CACHE_BYTES):
+    """
+    Returns `compute()` (a dict of arrays and scalars) for `inputs`, read
+    from the cache when an entry with the same name, version, params and
+    inputs exists. Scalars come back as Python scalars, sequences as arrays.
+    """
+    path = os.path.join(cache_dir, artifact_key(name, version, inputs, params, content) + '.npz')
+    if os.path.exists(path):
+        try:
+            artifact = _load(path)
+            os.utime(path)  # mark as recently used
+            return artifact
+        except (OSError, ValueError, KeyError):
+            pass  # unreadable entry (e.g. interrupted write): recompute it
+
+    _save(path, compute())
+    artifact = _load(path)
+    evict(cache_dir, max_bytes)
+    return artifact
+
+
+def id_summary(path, column, **kwargs):
+    """
+    Rows, columns and the values of one ID column of a CSV: non-null count,
+    distinct count and the distinct integer IDs (for `BayRegistry.overlap`).
+    """
+    def compute():
+        columns = pd.read_csv(path, nrows=0).columns
+        values = pd.read_csv(path, usecols=[column])[column]
+        ids = pd.to_numeric(values, errors='coerce').dropna()
+        return {
+            'columns': np.asarray(columns, dtype=str),
+            'rows': len(values),
+            'non_null': int(values.notna().sum()),
+            'unique': int(values.nunique()),
+            'ids': np.unique(ids.to_numpy(dtype=np.int64)),
+        }
+    return cached('ids', ID_SUMMARY_VERSION, [path], compute, params={'column': column}, **kwargs)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) == 2 and sys.argv[1] == 'clear':
+        for entry in _entries(CACHE_DIR):
+            os.remove(entry)
+        print(f"[SUCCESS] Cleared {CACHE_DIR}")
+    elif len(sys.argv) == 1:
+        entries = sorted(_entries(CACHE_DIR), key=os.path.getmtime, reverse=True)
+        for entry in entries:
+            print(f"{os.path.basename(entry)}  {os.path.getsize(entry) / 1024:.1f}KB")
+        print(f"{len(entries)} entries, {sum(map(os.path.getsize, entries)) / 1024 ** 2:.1f}MB "
+              f"(limit {MAX_CACHE_BYTES / 1024 ** 2:.0f}MB)")
+    else:
+        print("Usage: python -m parksense.artifact_cache [clear]")
+        sys.exit(1)
@@ -0,0 +1,204 @@
+"""
+Rolling-origin backtests for the occupancy model (time-based splits, see
+MODELING_STRATEGY.md).
+
+The engineered feature matrix is built once, sorted by time and saved as
+.npy files under `data/backtest/`. The cache is keyed by the snapshot store's
+size/mtime, the horizon and the grouping (with the neighbourhood index
+fingerprint for spatial grouping). Because rows are in time order,
+every fold is a pair of contiguous row ranges:
+
+    fold k: train [first bucket, origin_k)   test [origin_k, origin_k + test_days)
+
+Training rows whose target would fall inside the test window are purged.
+The target is the group's next *observed* bucket, which can lie several
+buckets ahead, so each row is purged on its own target bucket (stored with
+the matrix) rather than a fixed horizon before the origin.
+Workers in a process pool memory-map the matrix and slice their own fold, so
+no arrays are pickled between processes. Each fold reports MAE/RMSE, with a
+persistence baseline (predict the current ratio), plus per-hour error sums
+that are merged into an hour-of-day table.
+"""
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+from parksense.csv_profile import source_stat
+from parksense.features import (
+    BUCKETS_PER_DAY, FEATURES, build_feature_frame, is_occupied, kerbside_group, resample_groups,
+    target_buckets, target_column, to_buckets,
+)
+from parksense.snapshot_store import STORE_DIR, read_snapshots
+from parksense.spatial import index_fingerprint
+
+CACHE_DIR = 'data/backtest'
+REPORT_PATH = 'models/backtest_report.json'
+HOUR = FEATURES.index('hour')
+RATIO = FEATURES.index('occupancy_ratio')
+
+
+def _matrix_paths(cache_dir):
+    return {name: os.path.join(cache_dir, f'{name}.npy') for name in ('X', 'y', 'bucket', 'target_bucket')}
+
+
+def build_matrix(horizon=15, root=STORE_DIR, cache_dir=CACHE_DIR, group_fn=kerbside_group, grouping='kerbside'):
+    """
+    Builds (or reuses) the time-sorted feature matrix for `horizon`:
+    X (float32, FEATURES order), y (float32), bucket and target_bucket
+    (int64), one row per group and bucket with both lags and a target.
+    Returns the cache metadata.
+    """
+    size, mtime_ns = source_stat(root)
+    key = {'store_size': size, 'store_mtime_ns': mtime_ns, 'horizon': horizon,
+           'grouping': grouping, 'index': index_fingerprint(group_fn), 'features': FEATURES}
+    meta_path = os.path.join(cache_dir, 'matrix.json')
+    paths = _matrix_paths(cache_dir)
+    if os.path.exists(meta_path) and all(os.path.exists(p) for p in paths.values()):
+        with open(meta_path) as f:
+            meta = json.load(f)
+        if meta['key'] == key:
+            print(f"Using cached feature matrix {cache_dir} ({meta['rows']:,} rows)")
+            return meta
+
+    print("Building feature matrix...")
+    df = read_snapshots(columns=['kerbsideid', 'status', 'status_timestamp'], root=root)
+    group_ids = group_fn(df['kerbsideid'].to_numpy())
+    located = group_ids >= 0
+    group, bucket, ratio = resample_groups(group_ids[located], to_buckets(df['status_timestamp'][located]),
+                                           is_occupied(df['status'])[located])
+    del df, group_ids
+    target = target_column(horizon)
+    frame = build_feature_frame(group, bucket, ratio, (horizon,))
+    frame['target_bucket'] = target_buckets(group, bucket, horizon)
+    frame = frame.dropna(subset=FEATURES + [target])
+    order = np.argsort(to_buckets(frame['timestamp']), kind='stable')
+
+    os.makedirs(cache_dir, exist_ok=True)
+    arrays = {
+        'X': frame[FEATURES].to_numpy(dtype=np.float32)[order],
+        'y': frame[target].to_numpy(dtype=np.float32)[order],
+        'bucket': to_buckets(frame['timestamp'])[order],
+        'target_bucket': frame['target_bucket'].to_numpy(dtype=np.int64)[order],
+    }
+    for name, array in arrays.items():
+        np.save(paths[name] + '.tmp.npy', array)
+        os.replace(paths[name] + '.tmp.npy', paths[name])
+    meta = {'key': key, 'rows': len(frame)}
+    with open(meta_path, 'w') as f:
+        json.dump(meta, f)
+    return meta
+
+
+def rolling_folds(bucket, folds=4, test_days=7, train_days=None):
+    """
+    Row ranges for `folds` consecutive test windows of `test_days` at the end
+    of the data (the last fold ends at the last bucket). Training is
+    expanding, or sliding over `train_days` if given. Rows of the training
+    range whose target bucket reaches the origin are purged by `train_mask`.
+    """
+    test_buckets = test_days * BUCKETS_PER_DAY
+    end = int(bucket[-1]) + 1
+    result = []
+    for k in range(folds):
+        origin = end - (folds - k) * test_buckets
+        train_start = origin - train_days * BUCKETS_PER_DAY if train_days else int(bucket[0])
+        fold = {
+            'fold': k,
+            'train': [int(np.searchsorted(bucket, train_start)), int(np.searchsorted(bucket, origin))],
+            'test': [int(np.searchsorted(bucket, origin)), int(np.searchsorted(bucket, origin + test_buckets))],
+            'origin_bucket': origin,
+        }
+        if fold['train'][1] > fold['train'][0] and fold['test'][1] > fold['test'][0]:
+            result.append(fold)
+    return result
+
+
+def train_mask(fold, target_bucket):
+    """Rows of the fold's training range whose target is known before the test window opens."""
+    train_lo, train_hi = fold['train']
+    return np.asarray(target_bucket[train_lo:train_hi]) < fold['origin_bucket']
+
+
+def _errors(pred, y, hour):
+    err = pred - y
+    return {
+        'mae': float(np.abs(err).mean()),
+        'rmse': float(np.sqrt((err ** 2).mean())),
+        # Sums rather than means so folds can be merged exactly
+        'hour_abs': np.bincount(hour, weights=np.abs(err), minlength=24).tolist(),
+        'hour_sq': np.bincount(hour, weights=err ** 2, minlength=24).tolist(),
+        'hour_n': np.bincount(hour, minlength=24).tolist(),
+    }
+
+
+def run_fold(cache_dir, fold, model_params, nthread):
+    """Trains and scores one fold from the memory-mapped matrix (runs in a worker process)."""
+    from xgboost import XGBRegressor
+
+    started = time.perf_counter()
+    paths = _matrix_paths(cache_dir)
+    X = np.load(paths['X'], mmap_mode='r')
+    y = np.load(paths['y'], mmap_mode='r')
+    (train_lo, train_hi), (test_lo, test_hi) = fold['train'], fold['test']
+    keep = train_mask(fold, np.load(paths['target_bucket'], mmap_mode='r'))
+
+    model = XGBRegressor(**model_params, n_jobs=nthread)
+    model.fit(X[train_lo:train_hi][keep], y[train_lo:train_hi][keep])
+    X_test, y_test = np.asarray(X[test_lo:test_hi]), np.asarray(y[test_lo:test_hi])
+    pred = np.clip(model.predict(X_test), 0.0, 1.0)
+    hour = X_test[:, HOUR].astype(np.int64)
+
+    result = dict(fold, train_rows=int(keep.sum()), purged_rows=int((~keep).sum()), test_rows=test_hi - test_lo, **_errors(pred, y_test, hour))
+    result['persistence_mae'] = float(np.abs(X_test[:, RATIO] - y_test).mean())
+    result['seconds'] = round(time.perf_counter() - started, 2)
+    return result
+
+
+def _run_fold_job(args):
+    return run_fold(*args)
+
+
+def run_backtest(model_params, horizon=15, folds=4, test_days=7, train_days=None, workers=None,
+                 root=STORE_DIR, cache_dir=CACHE_DIR, group_fn=kerbside_group, grouping='kerbside'):
+    """Runs every fold in a process pool. Returns the report dict (per fold and per hour)."""
+    meta = build_matrix(horizon, root, cache_dir, group_fn, grouping)
+    bucket = np.load(_matrix_paths(cache_dir)['bucket'], mmap_mode='r')
+    fold_specs = rolling_folds(bucket, folds, test_days, train_days)
+    if not fold_specs:
+        raise ValueError(f"Not enough history for {folds} folds of {test_days} test days")
+
+    workers = min(workers or os.cpu_count() or 1, len(fold_specs))
+    # Split the cores between workers so folds don't oversubscribe the CPU
+    nthread = max(1, (os.cpu_count() or 1) // workers)
+    started = time.perf_counter()
+    results = []
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        jobs = [pool.submit(_run_fold_job, (cache_dir, fold, model_params, nthread)) for fold in fold_specs]
+        for done, job in enumerate(as_completed(jobs), 1):
+            results.append(job.result())
+            print(f"Finished {done}/{len(jobs)} folds...", end='\r')
+    print()
+    results.sort(key=lambda r: r['fold'])
+
+    hour_abs = np.sum([r.pop('hour_abs') for r in results], axis=0)
+    hour_sq = np.sum([r.pop('hour_sq') for r in results], axis=0)
+    hour_n = np.sum([r.pop('hour_n') for r in results], axis=0)
+    seen = hour_n > 0
+    return {
+        'horizon': horizon,
+        'grouping': grouping,
+        'rows': meta['rows'],
+        'test_days': test_days,
+        'train_days': train_days,
+        'workers': workers,
+        'wall_s': round(time.perf_counter() - started, 2),
+        'folds': results,
+        'mae': float(hour_abs.sum() / hour_n.sum()),
+        'rmse': float(np.sqrt(hour_sq.sum() / hour_n.sum())),
+        'by_hour': [{'hour': int(h), 'mae': float(hour_abs[h] / hour_n[h]),
+                     'rmse': float(np.sqrt(hour_sq[h] / hour_n[h])), 'rows': int(hour_n[h])}
+                    for h in np.flatnonzero(seen)],
+    }
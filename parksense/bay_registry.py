@@ -0,0 +1,146 @@
+"""
+Integer-keyed registry of the static parking bays (`on-street-parking-bays.csv`).
+
+Bays are stored as sorted int64 KerbsideIDs with position-aligned attribute
+arrays (Latitude, Longitude, RoadSegmentID). Membership and overlap checks are
+`np.searchsorted` lookups, and enrichment is a direct position gather. This
+replaces the `astype(str).str.replace(r'\\.0$', ...)` normalization, Python
+string sets and string-key merges used across the scripts.
+
+The registry is persisted to `data/bay_registry.npz` and rebuilt when the bays
+CSV changes:
+
+    python -m parksense.bay_registry
+"""
+import os
+
+import numpy as np
+import pandas as pd
+
+BAYS_PATH = 'data/on-street-parking-bays.csv'
+REGISTRY_PATH = 'data/bay_registry.npz'
+MISSING_SEGMENT = -1
+
+
+def to_int_ids(values):
+    """IDs as int64, dropping missing and non-numeric values (123, 123.0 and '123' all become 123)."""
+    ids = pd.to_numeric(pd.Series(values), errors='coerce').dropna()
+    return ids.to_numpy(dtype=np.int64)
+
+
+class BayRegistry:
+
+    def __init__(self, ids, latitude, longitude, road_segment, duplicate_ids=None,
+                 source_size=None, source_mtime_ns=None):
+        self.ids = ids
+        self.latitude = latitude
+        self.longitude = longitude
+        self.road_segment = road_segment
+        self.duplicate_ids = duplicate_ids if duplicate_ids is not None else np.empty(0, dtype=np.int64)
+        self.source_size = source_size
+        self.source_mtime_ns = source_mtime_ns
+
+    def __len__(self):
+        return len(self.ids)
+
+    @classmethod
+    def from_frame(cls, bays):
+        """Builds the registry from a bays DataFrame (first row wins for duplicate IDs)."""
+        bays = bays.assign(KerbsideID=pd.to_numeric(bays['KerbsideID'], errors='coerce'))
+        bays = bays.dropna(subset=['KerbsideID'])
+        ids = bays['KerbsideID'].to_numpy(dtype=np.int64)
+        unique, first, counts = np.unique(ids, return_index=True, return_counts=True)
+        rows = bays.iloc[first]
+        segment = pd.to_numeric(rows['RoadSegmentID'], errors='coerce').fillna(MISSING_SEGMENT)
+        return cls(
+            ids=unique,
+            latitude=rows['Latitude'].to_numpy(dtype=np.float64),
+            longitude=rows['Longitude'].to_numpy(dtype=np.float64),
+            road_segment=segment.to_numpy(dtype=np.int64),
+            duplicate_ids=unique[counts > 1],
+        )
+
+    @classmethod
+    def from_csv(cls, path=BAYS_PATH):
+        bays = pd.read_csv(path, usecols=['KerbsideID', 'RoadSegmentID', 'Latitude', 'Longitude'])
+        registry = cls.from_frame(bays)
+        stat = os.stat(path)
+        registry.source_size, registry.source_mtime_ns = stat.st_size, stat.st_mtime_ns
+        return registry
+
+    def save(self, path=REGISTRY_PATH):
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            np.savez(f, ids=self.ids, latitude=self.latitude, longitude=self.longitude,
+                     road_segment=self.road_segment, duplicate_ids=self.duplicate_ids,
+                     source=np.array([self.source_size or -1, self.source_mtime_ns or -1], dtype=np.int64))
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path=REGISTRY_PATH):
+        with np.load(path) as data:
+            size, mtime_ns = (int(v) for v in data['source'])
+            return cls(data['ids'], data['latitude'], data['longitude'], data['road_segment'],
+                       data['duplicate_ids'], size, mtime_ns)
+
+    @classmethod
+    def load_or_build(cls, bays_path=BAYS_PATH, path=REGISTRY_PATH):
+        """Loads the persisted registry, rebuilding it if the bays CSV has changed."""
+        stat = os.stat(bays_path)
+        if os.path.exists(path):
+            registry = cls.load(path)
+            if (registry.source_size, registry.source_mtime_ns) == (stat.st_size, stat.st_mtime_ns):
+                return registry
+        registry = cls.from_csv(bays_path)
+        registry.save(path)
+        return registry
+
+    def positions(self, ids):
+        """Row position of each id in the registry, -1 where the bay is unknown."""
+        ids = np.asarray(ids, dtype=np.int64)
+        if len(self.ids) == 0:
+            return np.full(ids.shape, -1, dtype=np.int64)
+        pos = np.minimum(np.searchsorted(self.ids, ids), len(self.ids) - 1)
+        return np.where(self.ids[pos] == ids, pos, -1)
+
+    def contains(self, ids):
+        """Boolean mask: is each id a known bay?"""
+        return self.positions(ids) >= 0
+
+    def overlap(self, ids):
+        """
+        Splits the distinct ids seen elsewhere (e.g. sensors, snapshots) into
+        (matched, ghost) int arrays: known bays vs IDs missing from the map.
+        """
+        unique = np.unique(to_int_ids(ids))
+        known = self.contains(unique)
+        return unique[known], unique[~known]
+
+    def lookup(self, ids, attribute):
+        """Position-aligned attribute ('latitude', 'longitude', 'road_segment') for each id."""
+        pos = self.positions(ids)
+        values = getattr(self, attribute)
+        missing = np.nan if values.dtype.kind == 'f' else MISSING_SEGMENT
+        return np.where(pos >= 0, values[np.maximum(pos, 0)], missing)
+
+    def enrich(self, df, id_column='kerbsideid'):
+        """
+        Adds Latitude, Longitude and RoadSegmentID to `df` by direct position
+        lookup. Rows for unknown bays are dropped, like an inner merge.
+        """
+        ids = pd.to_numeric(df[id_column], errors='coerce').fillna(-1)
+        pos = self.positions(ids.to_numpy(dtype=np.int64))
+        keep = pos >= 0
+        out = df.loc[keep].copy()
+        pos = pos[keep]
+        out['Latitude'] = self.latitude[pos]
+        out['Longitude'] = self.longitude[pos]
+        out['RoadSegmentID'] = self.road_segment[pos]
+        return out
+
+
+if __name__ == "__main__":
+    registry = BayRegistry.load_or_build()
+    print(f"[SUCCESS] Bay registry: {len(registry):,} bays, "
+          f"{len(registry.duplicate_ids)} duplicate KerbsideIDs -> {REGISTRY_PATH}")
@@ -0,0 +1,187 @@
+"""
+Dependency-free evaluator for the trained XGBoost regressor.
+
+`export_model` flattens every tree of a saved booster into a few NumPy arrays
+and saves them as one .npz file. Only the exporter needs xgboost.
+`CompiledModel` loads the .npz and scores rows with NumPy alone, so backend
+workers can skip importing xgboost.
+
+Each tree is stored as a complete binary tree of the model's depth, in heap
+order: node p has children 2p+1 and 2p+2. There are three arrays of internal
+nodes (split feature, float32 threshold, default direction for missing
+values) and one array of leaf values. A leaf above the bottom level becomes a
+pass-through node that always goes left, and its value is copied to every
+bottom slot under it. Scoring then needs no child-pointer lookups:
+
+    pos = 2 * pos + 2 - (x < threshold or (x is NaN and default_left))
+
+This runs for all trees and a block of rows at once, one level per step. As
+in XGBoost, features are compared as float32. The prediction is the base
+margin plus the leaf sum, passed through the objective's link. XGBoost keeps
+`base_score` in output space, so for the logistic link it is exported as
+logit(base_score).
+
+    python -m parksense.compiled_model models/parking_model_15m.ubj
+"""
+import json
+import os
+import sys
+
+import numpy as np
+
+SUPPORTED_OBJECTIVES = {
+    'reg:squarederror': 'identity',
+    'reg:absoluteerror': 'identity',
+    'reg:pseudohubererror': 'identity',
+    'reg:logistic': 'logistic',
+}
+MAX_DEPTH = 12     # complete trees take 2**depth leaf slots each
+BLOCK_ROWS = 256   # rows scored together (bounds the rows x trees position matrix)
+
+
+def compiled_path(model_path):
+    """models/parking_model_15m.ubj -> models/parking_model_15m.npz"""
+    return os.path.splitext(model_path)[0] + '.npz'
+
+
+def _base_score(value):
+    # '5E-1' in older models, '[5E-1]' (one per target) since xgboost 3
+    return float(str(value).strip('[]').split(',')[0])
+
+
+def _base_margin(base_score, link):
+    """`base_score` moved from output space to margin space (where the leaf values are added)."""
+    if link == 'logistic':
+        return float(np.log(base_score / (1.0 - base_score)))
+    return base_score
+
+
+def _tree_depth(tree):
+    parents = tree['parents']
+    depth = [0] * len(parents)
+    for node in range(1, len(parents)):
+        # XGBoost numbers children after their parent
+        depth[node] = depth[parents[node]] + 1
+    return max(depth)
+
+
+def _fill_tree(tree, depth, feature, threshold, default_left, leaf):
+    """Writes one XGBoost tree into its complete-tree slots (1-D views for this tree)."""
+    inner = 2 ** depth - 1
+    left, right = tree['left_children'], tree['right_children']
+    stack = [(0, 0, 0)]  # (node id, heap position, level)
+    while stack:
+        node, pos, level = stack.pop()
+        if left[node] == -1:
+            # Leaf: the pass-through defaults (feature 0, +inf, default left) lead to
+            # the leftmost bottom slot under `pos`; every slot below gets the value
+            first = last = pos
+            for _ in range(depth - level):
+                first, last = 2 * first + 1, 2 * last + 2
+            leaf[first - inner:last - inner + 1] = tree['split_conditions'][node]
+        else:
+            feature[pos] = tree['split_indices'][node]
+            threshold[pos] = tree['split_conditions'][node]
+            default_left[pos] = tree['default_left'][node]
+            stack.append((left[node], 2 * pos + 1, level + 1))
+            stack.append((right[node], 2 * pos + 2, level + 1))
+
+
+def export_model(model_path, out_path=None):
+    """Flattens the booster at `model_path` into an .npz file. Returns the output path."""
+    import xgboost as xgb
+
+    model = json.loads(xgb.Booster(model_file=model_path).save_raw('json'))
+    learner = model['learner']
+    objective = learner['objective']['name']
+    if objective not in SUPPORTED_OBJECTIVES:
+        raise ValueError(f"Objective {objective} is not supported by the compiled evaluator")
+    if int(learner['learner_model_param'].get('num_target', 1)) != 1:
+        raise ValueError("Only single-target regressors can be compiled")
+
+    trees = learner['gradient_booster']['model']['trees']
+    if any(any(tree['split_type']) for tree in trees):
+        raise ValueError("Categorical splits are not supported by the compiled evaluator")
+    depth = max([_tree_depth(tree) for tree in trees], default=0)
+    if depth > MAX_DEPTH:
+        raise ValueError(f"Trees of depth {depth} are too deep to compile (max {MAX_DEPTH})")
+
+    inner = 2 ** depth - 1
+    feature = np.zeros((len(trees), inner), dtype=np.int32)
+    threshold = np.full((len(trees), inner), np.inf, dtype=np.float32)
+    default_left = np.ones((len(trees), inner), dtype=bool)
+    leaf = np.zeros((len(trees), 2 ** depth), dtype=np.float32)
+    for t, tree in enumerate(trees):
+        _fill_tree(tree, depth, feature[t], threshold[t], default_left[t], leaf[t])
+
+    link = SUPPORTED_OBJECTIVES[objective]
+    base_margin = _base_margin(_base_score(learner['learner_model_param']['base_score']), link)
+    out_path = out_path or compiled_path(model_path)
+    tmp_path = out_path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        np.savez(f, feature=feature, threshold=threshold, default_left=default_left, leaf=leaf,
+                 depth=np.int32(depth), base_margin=np.float32(base_margin), link=link,
+                 feature_names=np.asarray(learner.get('feature_names') or [], dtype=str))
+    os.replace(tmp_path, out_path)
+    return out_path
+
+
+class CompiledModel:
+
+    def __init__(self, feature, threshold, default_left, leaf, depth, base_margin, link='identity', feature_names=()):
+        self.trees = len(leaf)
+        self.depth = int(depth)
+        # Flattened so one `take` gathers a node from every tree at once
+        self.feature = feature.ravel()
+        self.threshold = threshold.ravel()
+        self.default_left = default_left.ravel()
+        self.leaf = leaf.ravel()
+        self.base_margin = np.float32(base_margin)
+        self.link = str(link)
+        self.feature_names = [str(name) for name in feature_names]
+        self._inner = 2 ** self.depth - 1
+        self._tree_base = np.arange(self.trees, dtype=np.int64) * self._inner
+        self._leaf_base = np.arange(self.trees, dtype=np.int64) * 2 ** self.depth - self._inner
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            arrays = {name: data[name] for name in data.files}
+        if 'base_score' in arrays:
+            # Exported before the base score was stored in margin space
+            arrays['base_margin'] = _base_margin(float(arrays.pop('base_score')), str(arrays.get('link', 'identity')))
+        return cls(**arrays)
+
+    def _margin(self, X):
+        flat = X.ravel()
+        row_base = (np.arange(len(X), dtype=np.int64) * X.shape[1])[:, None]
+        pos = np.zeros((len(X), self.trees), dtype=np.int64)
+        for _ in range(self.depth):
+            node = self._tree_base + pos
+            x = flat.take(row_base + self.feature.take(node))
+            go_left = (x < self.threshold.take(node)) | (np.isnan(x) & self.default_left.take(node))
+            pos = 2 * pos + 2 - go_left
+        return self.leaf.take(self._leaf_base + pos).sum(axis=1, dtype=np.float32) + self.base_margin
+
+    def predict(self, X):
+        """Scores an (n, n_features) array (or a single row) like `XGBRegressor.predict`."""
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        if X.ndim == 1:
+            X = X[None, :]
+        if len(X) == 0:
+            return np.empty(0, dtype=np.float32)
+        margin = np.concatenate([self._margin(X[start:start + BLOCK_ROWS])
+                                 for start in range(0, len(X), BLOCK_ROWS)])
+        if self.link == 'logistic':
+            return 1.0 / (1.0 + np.exp(-margin))
+        return margin
+
+    # Same call the prediction engine makes on an xgboost.Booster
+    inplace_predict = predict
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 2:
+        print("Usage: python -m parksense.compiled_model <model.ubj>")
+        sys.exit(1)
+    print(f"[SUCCESS] Compiled model saved to {export_model(sys.argv[1])}")
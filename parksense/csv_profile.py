@@ -0,0 +1,194 @@
+"""
+Parallel one-pass profiler for the multi-GB 2019 sensor CSV (or the columnar
+store it is ingested into, see `parksense.sensor_events`).
+
+The file is split into byte ranges aligned to line starts, and each range is
+scanned in a worker process. One pass collects the row count and the distinct
+values of every requested column. The merged result is saved as JSON under
+`data/profiles/`, keyed by the source file's size and mtime, so the diagnostic
+scripts read it instead of rescanning the file.
+
+Assumes no quoted field contains a newline, which holds for the Open Data
+exports.
+
+    python -m parksense.csv_profile data/On-street_Car_Parking_Sensor_Data_-_2019.csv
+"""
+import io
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import pandas as pd
+import pyarrow.parquet as pq
+
+PROFILE_DIR = 'data/profiles'
+PROFILE_COLUMNS = ['BayId', 'StreetMarker', 'DeviceId', 'StreetId']
+BLOCK_SIZE = 64 * 1024 * 1024
+
+
+def normalize_values(values):
+    """Distinct values as strings with a trailing '.0' dropped (float-parsed IDs)."""
+    values = pd.Series(pd.unique(pd.Series(values).dropna()), dtype=str)
+    return set(values.str.replace(r'\.0$', '', regex=True))
+
+
+def read_header(path):
+    with open(path, 'rb') as f:
+        line = f.readline()
+    return [name.strip().strip('"') for name in line.decode('utf-8-sig').rstrip('\r\n').split(',')], len(line)
+
+
+def byte_ranges(path, parts):
+    """Splits the data section of `path` into `parts` (start, end) byte ranges."""
+    _, header_end = read_header(path)
+    size = os.path.getsize(path)
+    step = max(1, -(-(size - header_end) // parts))
+    return [(start, min(start + step, size)) for start in range(header_end, size, step)]
+
+
+def scan_range(path, start, end, header, columns, block_size=BLOCK_SIZE):
+    """
+    Scans the lines that *start* inside [start, end) and returns
+    (row_count, {column: set of normalized values}).
+    """
+    rows = 0
+    distinct = {column: set() for column in columns}
+    with open(path, 'rb') as f:
+        f.seek(start - 1)
+        f.readline()  # skip to the first line starting at or after `start`
+        pos = f.tell()
+        while pos < end:
+            data = f.read(min(block_size, end - pos))
+            if not data.endswith(b'\n'):
+                data += f.readline()  # finish the line that started inside the range
+            pos = f.tell()
+            block = pd.read_csv(io.BytesIO(data), header=None, names=header, usecols=columns, dtype=str)
+            rows += len(block)
+            for column in columns:
+                distinct[column].update(normalize_values(block[column]))
+    return rows, distinct
+
+
+def _scan_job(args):
+    return scan_range(*args)
+
+
+def profile_csv(path, columns=PROFILE_COLUMNS, workers=None):
+    """Scans `path` once in a process pool; returns the profile dict."""
+    header, _ = read_header(path)
+    missing = [c for c in columns if c not in header]
+    if missing:
+        raise ValueError(f"Columns not in {path}: {missing}")
+
+    workers = workers or os.cpu_count() or 1
+    # More ranges than workers keeps the pool busy when ranges finish unevenly
+    ranges = byte_ranges(path, workers * 4)
+    stat = os.stat(path)
+    rows = 0
+    distinct = {column: set() for column in columns}
+    started = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        jobs = [pool.submit(_scan_job, (path, s, e, header, columns)) for s, e in ranges]
+        for done, job in enumerate(as_completed(jobs), 1):
+            part_rows, part_distinct = job.result()
+            rows += part_rows
+            for column in columns:
+                distinct[column] |= part_distinct[column]
+            print(f"Scanned {done}/{len(ranges)} ranges, {rows:,} rows...", end='\r')
+    print(f"\nProfiled {path}: {rows:,} rows in {time.perf_counter() - started:.1f}s ({workers} workers)")
+
+    return {
+        'source': os.path.abspath(path),
+        'size': stat.st_size,
+        'mtime_ns': stat.st_mtime_ns,
+        'columns': header,
+        'rows': rows,
+        'distinct': {column: sorted(values) for column, values in distinct.items()},
+    }
+
+
+def _store_files(root):
+    return sorted(os.path.join(d, name) for d, _, names in os.walk(root)
+                  for name in names if name.endswith('.parquet'))
+
+
+def source_stat(path):
+    """(size, mtime_ns) of a CSV, or totals over a store directory's part files."""
+    if not os.path.isdir(path):
+        stat = os.stat(path)
+        return stat.st_size, stat.st_mtime_ns
+    stats = [os.stat(f) for f in _store_files(path)]
+    return sum(s.st_size for s in stats), max((s.st_mtime_ns for s in stats), default=0)
+
+
+def profile_store(root, columns=PROFILE_COLUMNS):
+    """Same profile as `profile_csv`, read column-wise from a Parquet store."""
+    files = _store_files(root)
+    if not files:
+        raise ValueError(f"No Parquet files under {root}")
+    header = pq.read_schema(files[0]).names
+    rows = 0
+    distinct = {column: set() for column in columns}
+    for path in files:
+        part = pq.read_table(path, columns=columns).to_pandas()
+        rows += len(part)
+        for column in columns:
+            distinct[column].update(normalize_values(part[column].astype(object)))
+    size, mtime_ns = source_stat(root)
+    return {
+        'source': os.path.abspath(root),
+        'size': size,
+        'mtime_ns': mtime_ns,
+        'columns': header,
+        'rows': rows,
+        'distinct': {column: sorted(values) for column, values in distinct.items()},
+    }
+
+
+def profile_path(path, profile_dir=PROFILE_DIR):
+    return os.path.join(profile_dir, os.path.basename(path) + '.profile.json')
+
+
+def load_profile(path, columns=PROFILE_COLUMNS, workers=None, profile_dir=PROFILE_DIR):
+    """
+    Returns the saved profile of `path` (a CSV or a store directory) if it is
+    still current (same size and mtime, covers `columns`); otherwise scans it
+    once and saves it. Distinct values come back as sets.
+    """
+    cached_path = profile_path(os.path.normpath(path), profile_dir)
+    size, mtime_ns = source_stat(path)
+    profile = None
+    if os.path.exists(cached_path):
+        with open(cached_path) as f:
+            profile = json.load(f)
+        stale = (profile['size'] != size or profile['mtime_ns'] != mtime_ns
+                 or not set(columns) <= set(profile['distinct']))
+        if stale:
+            profile = None
+        else:
+            print(f"Using saved profile {cached_path} ({profile['rows']:,} rows)")
+
+    if profile is None:
+        if os.path.isdir(path):
+            profile = profile_store(path, columns)
+        else:
+            profile = profile_csv(path, columns, workers)
+        os.makedirs(profile_dir, exist_ok=True)
+        tmp_path = cached_path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(profile, f)
+        os.replace(tmp_path, cached_path)
+
+    profile['distinct'] = {column: set(values) for column, values in profile['distinct'].items()}
+    return profile
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 2:
+        print("Usage: python -m parksense.csv_profile <csv_path>")
+        sys.exit(1)
+    result = load_profile(sys.argv[1])
+    for column, values in result['distinct'].items():
+        print(f"{column}: {len(values):,} distinct")
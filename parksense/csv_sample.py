@@ -0,0 +1,325 @@
+"""
+Seeded, cached row samples of the multi-GB sensor CSVs (or of the columnar
+stores they are ingested into), so exploratory notebooks load the same small
+sample every time instead of tokenizing the whole file.
+
+Three ways to pick the rows:
+
+    offsets   draws random byte offsets (seeded) and reads the line starting
+              after each one. Only the sampled lines are read, so a 1% sample
+              touches a few percent of the file. A line is picked in
+              proportion to the length of the line before it, which is close
+              to uniform for these fixed-layout exports.
+    stream    scans the file in fixed byte ranges (in a process pool, like
+              `parksense.csv_profile`) and keeps each line whose seeded random
+              key is below `fraction`: an exact uniform sample. With
+              `stratify` ('bay' or 'hour' of arrival) every stratum also keeps
+              at least `min_per_stratum` lines (its lowest keys), so rare bays
+              still show up.
+    store     for a day-partitioned Parquet store such as the 2019 events
+              `scripts/download_data.py` ingests into `data/sensors_2019/`
+              (it writes no extracted CSV): each part file is read and keyed
+              like a `stream` range, seeded by the part's name. 'hour' is the
+              local (Melbourne) hour of arrival, as in the CSV.
+
+The keys of a range depend only on the seed and the range, so a sample is
+the same for any number of workers. Samples are saved under `data/samples/`
+(CSV, or Parquet for a store), named by source, method, strata, fraction
+and seed, and rebuilt when the source's size or mtime changes.
+
+Assumes no quoted field contains a newline, which holds for the Open Data
+exports.
+
+    python -m parksense.csv_sample data/sensors_2019 --fraction 0.01 --seed 42
+    python -m parksense.csv_sample data/On-street_Car_Parking_Sensor_Data_-_2019.csv --fraction 0.01 --seed 42
+"""
+import argparse
+import io
+import json
+import os
+import time
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+from parksense.csv_profile import read_header, source_stat
+from parksense.sensor_events import LOCAL_TZ
+from parksense.snapshot_store import list_parts
+
+SAMPLE_DIR = 'data/samples'
+METHODS = ('offsets', 'stream', 'store')
+STRATA = {'bay': 'BayId', 'hour': 'ArrivalTime'}
+RANGE_SIZE = 64 * 1024 * 1024
+ESTIMATE_BYTES = 1024 * 1024
+HOUR_PATTERN = r'[ T](?P<hour>\d{1,2}):\d{2}(?::\d{2})?(?:\.\d+)?\s*(?P<half>[AaPp][Mm])?'
+
+
+def sample_path(path, fraction, seed, method, stratify=None, sample_dir=SAMPLE_DIR):
+    extension = 'parquet' if method == 'store' else 'csv'
+    name = f"{os.path.basename(os.path.normpath(path))}.{method}.{stratify or 'all'}.p{fraction:g}.seed{seed}.{extension}"
+    return os.path.join(sample_dir, name)
+
+
+def sample_offsets(path, fraction, seed):
+    """
+    Lines picked by `offsets` sampling, in file order. The number of draws
+    is `fraction` of the row count estimated from the first MB of data.
+    """
+    _, header_end = read_header(path)
+    size = os.path.getsize(path)
+    with open(path, 'rb') as f:
+        f.seek(header_end)
+        head = f.read(ESTIMATE_BYTES)
+    line_length = len(head) / max(head.count(b'\n'), 1)
+    draws = int(round(fraction * (size - header_end) / line_length))
+    rng = np.random.default_rng(seed)
+    lines = []
+    last_start = -1
+    # A small buffer: each draw only reads the tail of one line and the next line
+    with open(path, 'rb', buffering=4096) as f:
+        for offset in np.sort(rng.integers(header_end, size, draws)):
+            f.seek(offset - 1)
+            f.readline()  # skip to the first line starting at or after `offset`
+            start = f.tell()
+            if start < size and start != last_start:
+                lines.append(f.readline())
+                last_start = start
+    return lines
+
+
+def _strata_values(data, header, stratify):
+    column = STRATA[stratify]
+    values = pd.read_csv(io.BytesIO(data), header=None, names=header, usecols=[column], dtype=str,
+                         skip_blank_lines=False)[column]
+    if stratify == 'hour':
+        # The clock hour straight from the text (AM/PM or ISO), much faster than parsing the dates
+        parts = pc.extract_regex(pa.array(values, type=pa.string()), HOUR_PATTERN)
+        hour = pc.fill_null(pc.cast(pc.struct_field(parts, 'hour'), pa.int64()), -1).to_numpy()
+        half = pc.utf8_upper(pc.struct_field(parts, 'half'))
+        pm = pc.fill_null(pc.equal(half, 'PM'), False).to_numpy(zero_copy_only=False)
+        am = pc.fill_null(pc.equal(half, 'AM'), False).to_numpy(zero_copy_only=False)
+        return np.where(pm | am, hour % 12 + 12 * pm, hour)
+    return values.fillna('').str.replace(r'\.0$', '', regex=True).to_numpy()
+
+
+def scan_range(path, index, start, end, header, fraction, seed, stratify=None, min_per_stratum=1):
+    """
+    Keys the lines that start inside [start, end) with the seeded generator of
+    range `index`. Returns (rows, candidates): a frame of offset, key, stratum
+    and line for the lines with key < fraction plus each stratum's
+    `min_per_stratum` lowest keys in the range.
+    """
+    with open(path, 'rb') as f:
+        f.seek(start - 1)
+        f.readline()
+        pos = f.tell()
+        data = f.read(max(end - pos, 0))
+        if data and not data.endswith(b'\n'):
+            data += f.readline()
+
+    newlines = np.flatnonzero(np.frombuffer(data, dtype=np.uint8) == ord('\n'))
+    ends = np.r_[newlines + 1, len(data)] if len(data) and data[-1:] != b'\n' else newlines + 1
+    starts = np.r_[0, ends[:-1]].astype(np.int64)
+    keys = np.random.default_rng([seed, index]).random(len(starts))
+
+    keep = keys < fraction
+    strata = np.full(len(starts), '', dtype=object)
+    if stratify is not None and len(starts):
+        strata = _strata_values(data, header, stratify)
+        if len(strata) != len(starts):
+            raise ValueError(f"Could not split {path} at bytes {start}-{end} into lines")
+        lowest = pd.DataFrame({'stratum': strata, 'key': keys}).sort_values('key')
+        keep[lowest.groupby('stratum', sort=False).head(min_per_stratum).index.to_numpy()] = True
+
+    picked = np.flatnonzero(keep)
+    candidates = pd.DataFrame({
+        'offset': pos + starts[picked],
+        'key': keys[picked],
+        'stratum': strata[picked],
+        'line': [data[starts[i]:ends[i]] for i in picked],
+    })
+    return len(starts), candidates
+
+
+def _scan_job(args):
+    return scan_range(*args)
+
+
+def sample_stream(path, fraction, seed, stratify=None, min_per_stratum=1, workers=None, range_size=RANGE_SIZE):
+    """Lines picked by `stream` sampling, in file order. Returns (rows scanned, lines)."""
+    if stratify is not None and stratify not in STRATA:
+        raise ValueError(f"Unknown stratum {stratify!r} (expected one of {sorted(STRATA)})")
+    header, header_end = read_header(path)
+    size = os.path.getsize(path)
+    # Ranges depend only on the file size, so the keys (and the sample) don't depend on `workers`
+    bounds = [(start, min(start + range_size, size)) for start in range(header_end, size, range_size)]
+    jobs = [(path, i, s, e, header, fraction, seed, stratify, min_per_stratum) for i, (s, e) in enumerate(bounds)]
+
+    rows = 0
+    parts = []
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count() or 1) as pool:
+        for done, (part_rows, candidates) in enumerate(pool.map(_scan_job, jobs), 1):
+            rows += part_rows
+            parts.append(candidates)
+            print(f"Sampled {done}/{len(jobs)} ranges, {rows:,} rows...", end='\r')
+    print()
+    if not parts:
+        return 0, []
+
+    candidates = pd.concat(parts, ignore_index=True)
+    keep = candidates['key'].to_numpy() < fraction
+    if stratify is not None:
+        lowest = candidates.sort_values('key').groupby('stratum', sort=False).head(min_per_stratum)
+        keep[lowest.index.to_numpy()] = True
+    return rows, candidates[keep].sort_values('offset')['line'].tolist()
+
+
+def _store_strata(df, stratify):
+    values = df[STRATA[stratify]]
+    if stratify == 'hour':
+        return values.dt.tz_convert(LOCAL_TZ).dt.hour.fillna(-1).astype(np.int64).to_numpy()
+    return values.astype('string').fillna('').to_numpy(dtype=object)
+
+
+def sample_store(root, fraction, seed, stratify=None, min_per_stratum=1):
+    """
+    Rows picked by `store` sampling, in store order. Returns (rows scanned,
+    sampled DataFrame).
+    """
+    if stratify is not None and stratify not in STRATA:
+        raise ValueError(f"Unknown stratum {stratify!r} (expected one of {sorted(STRATA)})")
+    parts = list_parts(root)
+    if not parts:
+        raise ValueError(f"No Parquet part files under {root}")
+
+    rows = 0
+    candidates = []
+    for done, part in enumerate(parts, 1):
+        df = pq.read_table(os.path.join(root, part)).to_pandas()
+        # Seeded by the part's name, so adding days to the store leaves the other parts' picks as they were
+        keys = np.random.default_rng([seed, zlib.crc32(part.encode())]).random(len(df))
+        keep = keys < fraction
+        strata = np.full(len(df), '', dtype=object)
+        if stratify is not None and len(df):
+            strata = _store_strata(df, stratify)
+            lowest = pd.DataFrame({'stratum': strata, 'key': keys}).sort_values('key')
+            keep[lowest.groupby('stratum', sort=False).head(min_per_stratum).index.to_numpy()] = True
+        candidates.append(df[keep].assign(_key=keys[keep], _stratum=strata[keep]))
+        rows += len(df)
+        print(f"Sampled {done}/{len(parts)} parts, {rows:,} rows...", end='\r')
+    print()
+
+    candidates = pd.concat(candidates, ignore_index=True)
+    keep = candidates['_key'].to_numpy() < fraction
+    if stratify is not None:
+        lowest = candidates.sort_values('_key').groupby('_stratum', sort=False).head(min_per_stratum)
+        keep[lowest.index.to_numpy()] = True
+    return rows, candidates[keep].drop(columns=['_key', '_stratum']).reset_index(drop=True)
+
+
+def _write_lines(path, output_path, lines):
+    with open(path, 'rb') as f:
+        header_line = f.readline()
+    tmp_path = output_path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(header_line)
+        for line in lines:
+            f.write(line if line.endswith(b'\n') else line + b'\n')
+    os.replace(tmp_path, output_path)
+
+
+def build_sample(path, output_path, fraction, seed, method, stratify=None, min_per_stratum=1, workers=None):
+    """
+    Samples `path` into `output_path` (the CSV header plus the picked lines,
+    or a Parquet file for a store) and returns its metadata.
+    """
+    started = time.perf_counter()
+    os.makedirs(os.path.dirname(output_path) or '.', exist_ok=True)
+    if method == 'offsets':
+        if stratify is not None:
+            raise ValueError("Stratified samples need method='stream' (every line's stratum is read)")
+        lines = sample_offsets(path, fraction, seed)
+        rows = None
+        _write_lines(path, output_path, lines)
+        sampled = len(lines)
+    elif method == 'stream':
+        rows, lines = sample_stream(path, fraction, seed, stratify, min_per_stratum, workers)
+        _write_lines(path, output_path, lines)
+        sampled = len(lines)
+    elif method == 'store':
+        rows, df = sample_store(path, fraction, seed, stratify, min_per_stratum)
+        df.to_parquet(output_path + '.tmp', index=False)
+        os.replace(output_path + '.tmp', output_path)
+        sampled = len(df)
+    else:
+        raise ValueError(f"Unknown sampling method {method!r} (expected one of {METHODS})")
+
+    size, mtime_ns = source_stat(path)
+    meta = {
+        'source': os.path.abspath(path), 'size': size, 'mtime_ns': mtime_ns,
+        'fraction': fraction, 'seed': seed, 'method': method, 'stratify': stratify,
+        'min_per_stratum': min_per_stratum if stratify else None,
+        'rows': sampled, 'source_rows': rows, 'seconds': round(time.perf_counter() - started, 2),
+    }
+    with open(output_path + '.json.tmp', 'w') as f:
+        json.dump(meta, f)
+    os.replace(output_path + '.json.tmp', output_path + '.json')
+    print(f"Sampled {sampled:,} rows of {path} in {meta['seconds']}s -> {output_path}")
+    return meta
+
+
+def ensure_sample(path, fraction=0.01, seed=0, stratify=None, method=None, min_per_stratum=1,
+                  workers=None, sample_dir=SAMPLE_DIR):
+    """
+    Path of the saved sample of `path` (a CSV or a store directory), built
+    first if missing or if the source changed since. For a CSV `method`
+    defaults to 'offsets', or 'stream' when stratifying.
+    """
+    if os.path.isdir(path):
+        if method not in (None, 'store'):
+            raise ValueError(f"{path} is a store directory: it can only be sampled with method='store'")
+        method = 'store'
+    else:
+        method = method or ('stream' if stratify else 'offsets')
+    output_path = sample_path(path, fraction, seed, method, stratify, sample_dir)
+    size, mtime_ns = source_stat(path)
+    if os.path.exists(output_path) and os.path.exists(output_path + '.json'):
+        with open(output_path + '.json') as f:
+            meta = json.load(f)
+        if (meta['size'], meta['mtime_ns'], meta['min_per_stratum']) == (
+                size, mtime_ns, min_per_stratum if stratify else None):
+            print(f"Using saved sample {output_path} ({meta['rows']:,} rows)")
+            return output_path
+    build_sample(path, output_path, fraction, seed, method, stratify, min_per_stratum, workers)
+    return output_path
+
+
+def load_sample(path, fraction=0.01, seed=0, stratify=None, method=None, min_per_stratum=1,
+                workers=None, sample_dir=SAMPLE_DIR, **read_csv_kwargs):
+    """
+    `ensure_sample`, then reads the sample with `pd.read_csv(**read_csv_kwargs)`
+    (`pd.read_parquet` for a store sample).
+    """
+    output_path = ensure_sample(path, fraction, seed, stratify, method, min_per_stratum, workers, sample_dir)
+    if output_path.endswith('.parquet'):
+        return pd.read_parquet(output_path, **read_csv_kwargs)
+    return pd.read_csv(output_path, **read_csv_kwargs)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build a seeded, cached row sample of a large CSV or store.")
+    parser.add_argument('path', help="CSV file, or a store directory such as data/sensors_2019")
+    parser.add_argument('--fraction', type=float, default=0.01)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--stratify', choices=sorted(STRATA), default=None)
+    parser.add_argument('--method', choices=METHODS, default=None,
+                        help="CSV default: offsets, or stream when stratifying (stores: store)")
+    parser.add_argument('--min-per-stratum', type=int, default=1)
+    parser.add_argument('--workers', type=int, default=None)
+    args = parser.parse_args()
+    ensure_sample(args.path, args.fraction, args.seed, args.stratify, args.method, args.min_per_stratum, args.workers)
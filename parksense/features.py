@@ -0,0 +1,187 @@
+"""
+Feature engineering shared by training (`train_final_model.py`) and serving
+(the FastAPI backend). Keeping one implementation means the model never sees
+features at inference time that were computed differently from training.
+
+Everything works on sorted NumPy arrays:
+  1. bays -> neighbourhood group (`kerbsideid // 20 * 20`)
+  2. snapshots -> 15-minute buckets -> occupancy ratio per (group, bucket)
+  3. lags / targets are neighbouring rows of the same group in that sorted
+     order (same semantics as `groupby('group_id').shift(n)`), except that
+     rows more than MAX_GAP_BUCKETS apart are never chained (e.g. the 2019
+     history and the snapshots)
+"""
+import numpy as np
+import pandas as pd
+
+FEATURES_PATH = 'models/features.txt'
+FEATURES = ['group_id', 'occupancy_ratio', 'hour', 'day_of_week', 'lag_15m', 'lag_30m']
+
+GROUP_SIZE = 20
+BUCKET_MINUTES = 15
+BUCKET_NS = BUCKET_MINUTES * 60 * 10**9
+BUCKETS_PER_DAY = 24 * 60 // BUCKET_MINUTES
+MAX_GAP_BUCKETS = BUCKETS_PER_DAY  # a group's rows further apart than this start a new series
+OCCUPIED_STATUS = 'Present'
+
+
+def load_feature_order(path=FEATURES_PATH):
+    """Reads the feature order the exported model expects."""
+    with open(path) as f:
+        return f.read().strip().split(',')
+
+
+def kerbside_group(kerbsideid):
+    """Neighbourhood grouping: blocks of 20 consecutive kerbside IDs."""
+    return (np.asarray(kerbsideid, dtype=np.int64) // GROUP_SIZE) * GROUP_SIZE
+
+
+def is_occupied(status):
+    """1.0 where the sensor status is 'Present', else 0.0."""
+    if isinstance(status, pd.Series) and isinstance(status.dtype, pd.CategoricalDtype):
+        # Compare once per category instead of once per row
+        present = np.asarray(status.cat.categories == OCCUPIED_STATUS)
+        codes = status.cat.codes.to_numpy()
+        return np.where(codes >= 0, present[codes], False).astype(np.float64)
+    return (np.asarray(status) == OCCUPIED_STATUS).astype(np.float64)
+
+
+def to_buckets(timestamps):
+    """15-minute bucket index (since the epoch, UTC) for each timestamp."""
+    ns = pd.DatetimeIndex(timestamps).as_unit('ns').asi8
+    return ns // BUCKET_NS
+
+
+def bucket_start(buckets):
+    """Inverse of `to_buckets`: UTC timestamp at the start of each bucket."""
+    return pd.to_datetime(np.asarray(buckets, dtype=np.int64) * BUCKET_NS, utc=True)
+
+
+def time_features(buckets):
+    """(hour, day_of_week) for each bucket, matching `.dt.hour` / `.dt.dayofweek` in UTC."""
+    buckets = np.asarray(buckets, dtype=np.int64)
+    hour = (buckets % BUCKETS_PER_DAY) * BUCKET_MINUTES // 60
+    # 1970-01-01 was a Thursday (dayofweek == 3)
+    day_of_week = (buckets // BUCKETS_PER_DAY + 3) % 7
+    return hour, day_of_week
+
+
+def resample_groups(group_ids, buckets, occupied):
+    """
+    Mean occupancy per (group, bucket).
+    Returns (group, bucket, occupancy_ratio) arrays sorted by group then bucket.
+    """
+    group_ids = np.asarray(group_ids, dtype=np.int64)
+    buckets = np.asarray(buckets, dtype=np.int64)
+    occupied = np.asarray(occupied, dtype=np.float64)
+    if len(group_ids) == 0:
+        return group_ids, buckets, occupied
+
+    order = np.lexsort((buckets, group_ids))
+    g, b, o = group_ids[order], buckets[order], occupied[order]
+    starts = np.flatnonzero(np.r_[True, (g[1:] != g[:-1]) | (b[1:] != b[:-1])])
+    counts = np.diff(np.r_[starts, len(g)])
+    ratio = np.add.reduceat(o, starts) / counts
+    return g[starts], b[starts], ratio
+
+
+def combine_group_series(*series):
+    """
+    Concatenates several (group, bucket, ratio) series (e.g. 2019 history and
+    Supabase snapshots) and re-sorts them by group then bucket.
+    """
+    group, bucket, ratio = (np.concatenate(parts) for parts in zip(*series))
+    order = np.lexsort((bucket, group))
+    return group[order], bucket[order], ratio[order]
+
+
+def shift_within_groups(group, values, periods):
+    """`groupby(group).shift(periods)` for arrays already sorted by group."""
+    out = np.full(len(values), np.nan)
+    if periods == 0 or abs(periods) >= len(values):
+        return values.astype(np.float64) if periods == 0 else out
+    if periods > 0:
+        same = group[periods:] == group[:-periods]
+        out[periods:] = np.where(same, values[:-periods], np.nan)
+    else:
+        p = -periods
+        same = group[:-p] == group[p:]
+        out[:-p] = np.where(same, values[p:], np.nan)
+    return out
+
+
+def series_runs(group, bucket, max_gap=MAX_GAP_BUCKETS):
+    """
+    Run id for each row of a (group, bucket)-sorted series. A new run starts
+    with every group and after any gap of more than `max_gap` buckets, so
+    lags and targets (shifted within runs) never reach across a gap.
+    """
+    group = np.asarray(group, dtype=np.int64)
+    bucket = np.asarray(bucket, dtype=np.int64)
+    if len(group) == 0:
+        return group
+    return np.cumsum(np.r_[True, (group[1:] != group[:-1]) | (np.diff(bucket) > max_gap)])
+
+
+def target_column(horizon):
+    """Name of the target column for a horizon in minutes (e.g. 'target_15m')."""
+    return f'target_{horizon}m'
+
+
+def build_feature_frame(group, bucket, ratio, horizons=(15,)):
+    """
+    Resampled (group, bucket, occupancy_ratio) arrays -> frame with `timestamp`,
+    the columns in FEATURES order and one `target_{h}m` column per horizon
+    (h must be a multiple of 15). Nothing is dropped.
+    """
+    hour, day_of_week = time_features(bucket)
+    runs = series_runs(group, bucket)
+    frame = pd.DataFrame({
+        'timestamp': bucket_start(bucket),
+        'group_id': group,
+        'occupancy_ratio': ratio,
+        'hour': hour,
+        'day_of_week': day_of_week,
+        'lag_15m': shift_within_groups(runs, ratio, 1),
+        'lag_30m': shift_within_groups(runs, ratio, 2),
+    })
+    for horizon in horizons:
+        if horizon % BUCKET_MINUTES:
+            raise ValueError(f"Horizon {horizon}m is not a multiple of {BUCKET_MINUTES} minutes")
+        frame[target_column(horizon)] = shift_within_groups(runs, ratio, -(horizon // BUCKET_MINUTES))
+    return frame
+
+
+def target_buckets(group, bucket, horizon):
+    """Bucket of each row's target (`shift(-h)` within the group's run), NaN where there is none."""
+    return shift_within_groups(series_runs(group, bucket), bucket.astype(np.float64), -(horizon // BUCKET_MINUTES))
+
+
+def build_training_frame(df, group_fn=kerbside_group):
+    """
+    Snapshot rows (kerbsideid, status, status_timestamp) -> model-ready frame.
+    Rows without both lags or a target are dropped, as in the original pipeline.
+    """
+    group, bucket, ratio = resample_groups(
+        group_fn(df['kerbsideid'].to_numpy()),
+        to_buckets(df['status_timestamp']),
+        is_occupied(df['status']),
+    )
+    return build_feature_frame(group, bucket, ratio).dropna().reset_index(drop=True)
+
+
+def bucket_feature_matrix(group_id, occupancy_ratio, bucket, lag_15m, lag_30m):
+    """
+    Serving-side feature builder from 15-minute bucket indices (pure NumPy).
+    Returns an (n, 6) float array in FEATURES order; missing lags may be NaN.
+    """
+    hour, day_of_week = time_features(bucket)
+    columns = np.broadcast_arrays(np.asarray(group_id, dtype=np.int64), occupancy_ratio,
+                                  hour, day_of_week, lag_15m, lag_30m)
+    return np.column_stack([np.atleast_1d(c) for c in columns]).astype(np.float64)
+
+
+def feature_matrix(group_id, occupancy_ratio, timestamp, lag_15m, lag_30m):
+    """Same as `bucket_feature_matrix`, taking timestamps (scalars or arrays) instead."""
+    buckets = to_buckets(np.atleast_1d(pd.to_datetime(timestamp, utc=True)))
+    return bucket_feature_matrix(group_id, occupancy_ratio, buckets, lag_15m, lag_30m)
@@ -0,0 +1,125 @@
+"""
+Versioned models and warm-start retraining.
+
+Every training run records its model in `models/model_versions.json`, per
+horizon. Each entry holds the version number, how it was trained (full,
+continue or refresh), the watermark (last 15-minute bucket of snapshot data
+it saw), trees and rows. A copy of the model is kept under `models/versions/`.
+
+An incremental run starts from the latest version. It resamples only the
+snapshots from CONTEXT_DAYS before the watermark, so the first new rows have
+their lags. It trains on the rows whose target lies past the watermark,
+which the previous run could not label yet:
+
+    continue   boost `rounds` more trees on the new rows
+    refresh    keep every tree and re-fit its leaf values on the new rows
+"""
+import json
+import os
+import shutil
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+import xgboost as xgb
+
+from parksense.features import BUCKETS_PER_DAY, bucket_start, series_runs, target_buckets, to_buckets
+from parksense.out_of_core import booster_params
+from parksense.snapshot_store import STORE_DIR, list_days, read_snapshots
+
+MANIFEST_PATH = 'models/model_versions.json'
+VERSIONS_DIR = 'models/versions'
+MODES = ('continue', 'refresh')
+CONTEXT_DAYS = 1
+HOLDOUT_DAYS = 1
+
+
+def load_manifest(path=MANIFEST_PATH):
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+def latest_version(horizon, path=MANIFEST_PATH):
+    """The newest manifest entry for `horizon`, or None before the first recorded run."""
+    entries = load_manifest(path).get(str(horizon), [])
+    return entries[-1] if entries else None
+
+
+def record_version(model_file, horizon, kind, watermark, grouping, trees, rows,
+                   path=MANIFEST_PATH, versions_dir=VERSIONS_DIR, **extra):
+    """
+    Copies `model_file` to a versioned name and appends it to the manifest.
+    `watermark` is the last 15-minute bucket of data the model saw. Returns
+    the new version number.
+    """
+    manifest = load_manifest(path)
+    entries = manifest.setdefault(str(horizon), [])
+    version = entries[-1]['version'] + 1 if entries else 1
+
+    os.makedirs(versions_dir, exist_ok=True)
+    stem, ext = os.path.splitext(os.path.basename(model_file))
+    versioned = os.path.join(versions_dir, f'{stem}.v{version}{ext}')
+    shutil.copyfile(model_file, versioned)
+    entries.append({
+        'version': version, 'kind': kind, 'model': versioned,
+        'watermark_bucket': int(watermark), 'watermark': bucket_start([watermark])[0].isoformat(),
+        'grouping': grouping, 'trees': int(trees), 'rows': int(rows),
+        'trained_at': datetime.now(timezone.utc).isoformat(timespec='seconds'), **extra,
+    })
+
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    with open(path + '.tmp', 'w') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(path + '.tmp', path)
+    return version
+
+
+def store_watermark(root=STORE_DIR):
+    """Last 15-minute bucket in the snapshot store (only the last day is read)."""
+    days = list_days(root)
+    if not days:
+        raise ValueError(f"No snapshots in {root}")
+    last = read_snapshots(columns=['status_timestamp'], start=pd.Timestamp(days[-1], tz='UTC'), root=root)
+    return int(to_buckets(last['status_timestamp']).max())
+
+
+def context_start(watermark):
+    """Where an incremental run starts reading snapshots: CONTEXT_DAYS before the watermark."""
+    return bucket_start([watermark - CONTEXT_DAYS * BUCKETS_PER_DAY])[0]
+
+
+def new_rows(group, bucket, horizon, watermark):
+    """
+    Rows whose target lies past the watermark (unlabelled at the last run),
+    skipping each group's first two observed rows, whose lags would be cut
+    off. Lags are shifted within `series_runs`, so only a group's first run
+    can reach back past the snapshots read.
+    """
+    runs = series_runs(group, bucket)
+    index = np.arange(len(runs))
+    run_start = np.searchsorted(runs, runs)
+    new_group = np.ones(len(runs), dtype=bool)
+    new_group[1:] = np.asarray(group)[1:] != np.asarray(group)[:-1]
+    group_start = np.maximum.accumulate(np.where(new_group, index, 0))
+    cut_off = (runs == runs[group_start]) & (index - run_start < 2)
+    return (target_buckets(group, bucket, horizon) > watermark) & ~cut_off
+
+
+def update_booster(model_file, X, y, mode, model_params, rounds, nthread=None):
+    """Warm-starts from the booster at `model_file` on (X, y). Returns the updated booster."""
+    if mode not in MODES:
+        raise ValueError(f"Unknown incremental mode {mode!r} (expected one of {MODES})")
+    booster = xgb.Booster(model_file=model_file)
+    params = booster_params(model_params, nthread)
+    dtrain = xgb.DMatrix(X, label=y, nthread=nthread)
+    if mode == 'refresh':
+        params.update(process_type='update', updater='refresh', refresh_leaf=True)
+        rounds = booster.num_boosted_rounds()
+    return xgb.train(params, dtrain, num_boost_round=rounds, xgb_model=booster)
+
+
+def holdout_errors(y, predicted):
+    error = np.asarray(predicted, dtype=np.float64) - np.asarray(y, dtype=np.float64)
+    return {'mae': float(np.abs(error).mean()), 'rmse': float(np.sqrt((error ** 2).mean())), 'rows': len(error)}
@@ -0,0 +1,164 @@
+"""
+Stage-level run profiling for the training pipeline.
+
+    profiler = RunProfiler()
+    with profiler.stage('load') as stage:
+        df = read_snapshots(...)
+        stage.rows = len(df)
+    profiler.write_report('models/training_run.json')
+
+Each stage records wall time, CPU time (all threads, so XGBoost's workers
+count), peak RSS and an optional row count. On Linux the kernel's peak-RSS
+mark is reset at the start of every stage (/proc/self/clear_refs), so each
+stage reports its *own* peak and not the process-wide high-water mark. Where
+that isn't available the peak comes from `getrusage` and is cumulative.
+
+A disabled profiler hands out a plain stage object that times nothing but
+keeps whatever is set on it, so the instrumented code runs the same with
+profiling off and costs one small object per stage.
+"""
+import json
+import os
+import platform
+import resource
+import sys
+import time
+
+import pandas as pd
+
+_STATUS_PATH = '/proc/self/status'
+_CLEAR_REFS_PATH = '/proc/self/clear_refs'
+
+
+def _peak_rss_mb():
+    """Peak resident set size since the last reset (or process start), in MB."""
+    try:
+        with open(_STATUS_PATH) as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is KB on Linux, bytes on macOS
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def _reset_peak_rss():
+    """Resets the kernel's peak-RSS mark (Linux >= 4.0). Returns False if unsupported."""
+    try:
+        with open(_CLEAR_REFS_PATH, 'w') as f:
+            f.write('5')
+        return True
+    except OSError:
+        return False
+
+
+class _NullStage:
+    """Stand-in used when profiling is off: stores `rows` (and anything else) but records nothing."""
+
+    def __init__(self, name, rows):
+        self.name = name
+        self.rows = rows
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+class _Stage:
+
+    def __init__(self, profiler, name, rows):
+        self.profiler = profiler
+        self.name = name
+        self.rows = rows
+
+    def __enter__(self):
+        self.profiler._enter(self)
+        self._wall = time.perf_counter()
+        self._cpu = time.process_time()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        wall_s = time.perf_counter() - self._wall
+        cpu_s = time.process_time() - self._cpu
+        self.profiler._exit(self, wall_s, cpu_s, failed=exc_type is not None)
+        return False
+
+
+class RunProfiler:
+
+    def __init__(self, enabled=True):
+        self.enabled = enabled
+        self.started_at = pd.Timestamp.now(tz='UTC')
+        self._start = time.perf_counter()
+        self._cpu_start = time.process_time()
+        self.stages = []
+        self._stack = []     # [stage, running peak of the stage so far]
+        self.per_stage_peak = None
+
+    def stage(self, name, rows=None):
+        """Context manager timing one stage. Set `.rows` on it to record a row count."""
+        if not self.enabled:
+            return _NullStage(name, rows)
+        return _Stage(self, name, rows)
+
+    def _enter(self, stage):
+        # Resetting the peak would lose the enclosing stage's peak so far, so fold it in first
+        if self._stack:
+            self._stack[-1][1] = max(self._stack[-1][1], _peak_rss_mb())
+        self.per_stage_peak = _reset_peak_rss()
+        self._stack.append([stage, 0.0])
+
+    def _exit(self, stage, wall_s, cpu_s, failed):
+        _, peak = self._stack.pop()
+        peak = max(peak, _peak_rss_mb())
+        if self._stack:
+            self._stack[-1][1] = max(self._stack[-1][1], peak)
+        record = {
+            'stage': stage.name,
+            'depth': len(self._stack),
+            'wall_s': round(wall_s, 4),
+            'cpu_s': round(cpu_s, 4),
+            'peak_rss_mb': round(peak, 1),
+            'rows': None if stage.rows is None else int(stage.rows),
+        }
+        if failed:
+            record['failed'] = True
+        self.stages.append(record)
+
+    def report(self, **context):
+        """The run report as a dict; `context` (e.g. CLI arguments) is stored alongside."""
+        return {
+            'started_at': self.started_at.isoformat(),
+            'wall_s': round(time.perf_counter() - self._start, 4),
+            'cpu_s': round(time.process_time() - self._cpu_start, 4),
+            'peak_rss_mb': round(max((s['peak_rss_mb'] for s in self.stages), default=_peak_rss_mb()), 1),
+            'per_stage_peak': bool(self.per_stage_peak),
+            'context': context,
+            'stages': self.stages,
+            'machine': {'platform': platform.platform(), 'python': platform.python_version(),
+                        'cpus': os.cpu_count()},
+        }
+
+    def write_report(self, path, **context):
+        """Writes the JSON report atomically. Does nothing when disabled."""
+        if not self.enabled:
+            return None
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(self.report(**context), f, indent=2, default=str)
+        os.replace(tmp_path, path)
+        return path
+
+    def summary(self):
+        """One line per stage for the console."""
+        return "\n".join(
+            f"{'  ' * s['depth']}{s['stage']:<{24 - 2 * s['depth']}} {s['wall_s']:9.2f}s wall "
+            f"{s['cpu_s']:9.2f}s cpu {s['peak_rss_mb']:9.1f}MB peak"
+            + (f" {s['rows']:>12,} rows" if s['rows'] is not None else "")
+            for s in self.stages
+        )
@@ -0,0 +1,164 @@
+"""
+Asyncio ingester for the Melbourne Open Data `on-street-parking-bay-sensors`
+feed, writing changes only.
+
+Every poll pulls the whole feed through one pooled HTTP client. The first
+page gives the total count, and the remaining pages are fetched
+concurrently. Each bay's record is compared with the last state we know for
+it, kept in memory as kerbsideid -> (status, status_timestamp). The
+in-memory state moves forward only after the insert commits, so a failed
+write is retried on the next poll.
+
+Readers (feature resampling, rollup, transitions, tiles) average the rows
+present in each 15-minute bucket and do not carry a bay's last row forward.
+So the first poll in every bucket writes a keyframe with every bay, and the
+polls after it in the same bucket insert only the bays whose status or
+status_timestamp changed. At the default 15-minute interval every poll is a
+keyframe. Polling faster (`--interval 60`) records changes between
+keyframes for far fewer rows than writing the whole feed on every poll.
+
+Works with any async SQLAlchemy URL (`postgresql+asyncpg://...` as in the
+backend, `sqlite+aiosqlite:///local.db` for testing). `--base-url` points the
+poller at a local mock of the endpoint.
+
+    python -m parksense.live_ingest --db-url sqlite+aiosqlite:///local.db --table snapshots
+"""
+import argparse
+import asyncio
+import os
+import time
+from datetime import datetime
+
+import httpx
+from sqlalchemy import BigInteger, DateTime, String, column, table
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from parksense.features import BUCKET_MINUTES
+
+FEED_URL = ('https://data.melbourne.vic.gov.au/api/explore/v2.1/catalog/datasets/'
+            'on-street-parking-bay-sensors/records')
+SNAPSHOTS_TABLE = 'public.snapshots'
+POLL_SECONDS = 15 * 60
+KEYFRAME_SECONDS = BUCKET_MINUTES * 60
+PAGE_SIZE = 100            # the records API caps `limit` at 100
+MAX_CONNECTIONS = 8
+TIMEOUT = 30
+WRITE_BATCH = 1000
+
+
+def snapshots_table(name=SNAPSHOTS_TABLE):
+    """Core table for inserts; `id` is left to the database."""
+    schema, _, name = name.rpartition('.')
+    return table(name, column('kerbsideid', BigInteger), column('status', String),
+                 column('status_timestamp', DateTime(timezone=True)), schema=schema or None)
+
+
+async def _fetch_page(client, url, offset, limit):
+    response = await client.get(url, params={'limit': limit, 'offset': offset})
+    response.raise_for_status()
+    return response.json()
+
+
+async def fetch_feed(client, url=FEED_URL, page_size=PAGE_SIZE):
+    """
+    Returns every record of the feed as {kerbsideid: (status, status_timestamp)}.
+    If a bay shows up twice (the feed moved under the pagination), the newer
+    record wins.
+    """
+    first = await _fetch_page(client, url, 0, page_size)
+    pages = await asyncio.gather(*[_fetch_page(client, url, offset, page_size)
+                                   for offset in range(page_size, first['total_count'], page_size)])
+    feed = {}
+    for page in [first, *pages]:
+        for record in page['results']:
+            if record.get('kerbsideid') is None or not record.get('status_timestamp'):
+                continue
+            state = (record['status_description'], record['status_timestamp'])
+            kerbsideid = int(record['kerbsideid'])
+            if kerbsideid not in feed or state[1] > feed[kerbsideid][1]:
+                feed[kerbsideid] = state
+    return feed
+
+
+def changed_states(feed, last_states):
+    """The entries of `feed` whose (status, status_timestamp) differs from `last_states`."""
+    return {kerbsideid: state for kerbsideid, state in feed.items() if last_states.get(kerbsideid) != state}
+
+
+class LiveIngester:
+
+    def __init__(self, engine, client, url=FEED_URL, table_name=SNAPSHOTS_TABLE, clock=time.time):
+        self.engine = engine
+        self.client = client
+        self.url = url
+        self.table = snapshots_table(table_name)
+        self.clock = clock
+        self.last_states = {}
+        self.keyframe_bucket = None  # bucket of the last keyframe written
+
+    async def write(self, changes):
+        """Inserts the changed bays in batches, all in one transaction."""
+        rows = [{'kerbsideid': kerbsideid, 'status': status,
+                 'status_timestamp': datetime.fromisoformat(timestamp)}
+                for kerbsideid, (status, timestamp) in changes.items()]
+        async with self.engine.begin() as conn:
+            for start in range(0, len(rows), WRITE_BATCH):
+                await conn.execute(self.table.insert(), rows[start:start + WRITE_BATCH])
+        return len(rows)
+
+    async def poll_once(self):
+        """
+        One heartbeat: fetch, diff, write. Every bay is written on the first
+        poll of a bucket, only the changed ones after that. Returns
+        (bays in feed, rows written, whether it was a keyframe).
+        """
+        bucket = int(self.clock() // KEYFRAME_SECONDS)
+        feed = await fetch_feed(self.client, self.url)
+        keyframe = bucket != self.keyframe_bucket
+        rows = feed if keyframe else changed_states(feed, self.last_states)
+        written = await self.write(rows) if rows else 0
+        self.last_states.update(rows)
+        if keyframe:
+            self.keyframe_bucket = bucket
+        return len(feed), written, keyframe
+
+    async def run(self, interval=POLL_SECONDS, polls=None):
+        """Polls every `interval` seconds (forever, or `polls` times)."""
+        done = 0
+        while polls is None or done < polls:
+            start = time.monotonic()
+            try:
+                seen, written, keyframe = await self.poll_once()
+                print(f"[{datetime.now():%H:%M:%S}] {seen:,} bays in feed, "
+                      f"{written:,} {'keyframe' if keyframe else 'changed'} rows written")
+            except (httpx.HTTPError, OSError, KeyError, ValueError) as e:
+                print(f"[WARNING] Poll failed, retrying next heartbeat: {e}")
+            done += 1
+            if polls is None or done < polls:
+                await asyncio.sleep(max(0.0, interval - (time.monotonic() - start)))
+
+
+async def ingest(db_url, url=FEED_URL, table_name=SNAPSHOTS_TABLE, interval=POLL_SECONDS, polls=None,
+                 max_connections=MAX_CONNECTIONS):
+    engine = create_async_engine(db_url)
+    limits = httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections)
+    try:
+        # Pages queue for a pooled connection, so only the request itself is timed
+        async with httpx.AsyncClient(limits=limits, timeout=httpx.Timeout(TIMEOUT, pool=None)) as client:
+            await LiveIngester(engine, client, url, table_name).run(interval, polls)
+    finally:
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Poll the live sensor feed and store bay states (keyframes + changes).")
+    parser.add_argument('--db-url', default=os.environ.get('DATABASE_URL'),
+                        help="Async SQLAlchemy URL (default: $DATABASE_URL)")
+    parser.add_argument('--base-url', default=FEED_URL, help="Records endpoint (e.g. a local mock)")
+    parser.add_argument('--table', default=SNAPSHOTS_TABLE)
+    parser.add_argument('--interval', type=float, default=POLL_SECONDS, help="Seconds between polls")
+    parser.add_argument('--polls', type=int, default=None, help="Stop after this many polls")
+    args = parser.parse_args()
+    if not args.db_url:
+        parser.error("--db-url or DATABASE_URL is required")
+    asyncio.run(ingest(args.db_url, args.base_url, args.table, args.interval, args.polls))
@@ -0,0 +1,207 @@
+"""
+Out-of-core converter from 2019 arrival/departure sessions to 15-minute
+occupancy time series, per bay and per neighbourhood group.
+
+No session is expanded into per-bucket rows. Each session [arrival, departure)
+becomes two boundary events on the 15-minute grid:
+
+    bucket(arrival):   rate +1, correction -offset(arrival)
+    bucket(departure): rate -1, correction +offset(departure)
+
+A running sum of `rate` over the grid gives the number of full buckets covered.
+Adding the corrections gives the exact occupied seconds in every bucket:
+occupied[k] = B * cumsum(rate)[k] + correction[k].
+
+Pass 1 streams the sessions in chunks and spills the aggregated boundary
+events to a day-partitioned scratch store. Pass 2 sweeps the days in order
+with a carried per-bay rate. Memory is bounded by one chunk plus one day of
+the (bays x 96) grid.
+
+The 2019 bay key is not guaranteed to be a KerbsideID (see
+scripts/diagnose_data_loss.py and scripts/check_streetmarker.py), so only
+sessions whose key matches a bay in the registry are swept and grouped with
+the snapshots' group function. Anything else would merge unrelated bays into
+a snapshot group. `--bay-column StreetMarker` sweeps by the street marker.
+
+    python -m parksense.occupancy_sweep [--bay-column StreetMarker]
+"""
+import argparse
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+
+from parksense.bay_registry import BayRegistry
+from parksense.features import BUCKET_NS, BUCKETS_PER_DAY, bucket_start, kerbside_group
+from parksense.sensor_events import EVENTS_DIR, list_days, read_events
+from parksense.snapshot_store import append_frame, read_frame
+
+OCCUPANCY_DIR = 'data/occupancy_2019'
+BAY_COLUMN = 'BayId'
+DAY_NS = BUCKET_NS * BUCKETS_PER_DAY
+
+
+def iter_store_sessions(root=EVENTS_DIR, bay_column=BAY_COLUMN):
+    """Yields (bay, arrival_ns, departure_ns) chunks from the 2019 store, one day at a time."""
+    for day in list_days(root):
+        start = pd.Timestamp(day, tz='UTC')
+        df = read_events([bay_column, 'ArrivalTime', 'DepartureTime'],
+                         start=start, end=start + pd.Timedelta(days=1), root=root)
+        yield _session_arrays(df, bay_column)
+
+
+def iter_csv_sessions(path, chunksize=1000000, bay_column=BAY_COLUMN):
+    """Yields (bay, arrival_ns, departure_ns) chunks straight from the 2019 CSV."""
+    from parksense.sensor_events import normalize_sensor_events
+
+    columns = [bay_column, 'ArrivalTime', 'DepartureTime']
+    for chunk in pd.read_csv(path, usecols=columns, dtype=str, chunksize=chunksize):
+        yield _session_arrays(normalize_sensor_events(chunk), bay_column)
+
+
+def _session_arrays(df, bay_column):
+    # Non-numeric keys (e.g. some street markers) can't be KerbsideIDs
+    df = df.assign(**{bay_column: pd.to_numeric(df[bay_column], errors='coerce')})
+    df = df.dropna(subset=[bay_column, 'ArrivalTime', 'DepartureTime'])
+    bay = df[bay_column].to_numpy(dtype=np.int64)
+    arrival = pd.DatetimeIndex(df['ArrivalTime']).as_unit('ns').asi8
+    departure = pd.DatetimeIndex(df['DepartureTime']).as_unit('ns').asi8
+    valid = departure > arrival
+    return bay[valid], arrival[valid], departure[valid]
+
+
+def boundary_events(bay, arrival, departure):
+    """The two grid events per session, aggregated per (bay, bucket)."""
+    start_bucket, start_offset = np.divmod(arrival, BUCKET_NS)
+    end_bucket, end_offset = np.divmod(departure, BUCKET_NS)
+    events = pd.DataFrame({
+        'bay': np.concatenate([bay, bay]),
+        'bucket': np.concatenate([start_bucket, end_bucket]),
+        'rate': np.concatenate([np.ones(len(bay)), -np.ones(len(bay))]),
+        'correction': np.concatenate([-start_offset, end_offset]).astype(np.float64),
+    })
+    return events.groupby(['bay', 'bucket'], as_index=False, sort=False).sum()
+
+
+def sweep(session_chunks, known_bays, output_dir=OCCUPANCY_DIR, group_fn=kerbside_group):
+    """
+    Converts session chunks to 15-minute occupancy. Writes two day-partitioned
+    stores under `output_dir`:
+      bays/   bay, timestamp, occupancy        (fraction of the bucket occupied)
+      groups/ group_id, timestamp, occupancy_ratio, bays
+    Sessions of bays not in `known_bays` (sorted KerbsideIDs, e.g. the bay
+    registry's) are dropped. A bay counts towards its `group_fn` group from
+    its first arrival to its last departure.
+    Returns (bay_rows, group_rows) written.
+    """
+    spill_dir = os.path.join(output_dir, '_spill')
+    for sub in ('bays', 'groups', '_spill'):
+        shutil.rmtree(os.path.join(output_dir, sub), ignore_errors=True)
+
+    # --- Pass 1: boundary events to disk, plus each bay's active span ---
+    known_bays = np.asarray(known_bays, dtype=np.int64)
+    first_seen, last_seen = {}, {}
+    unmatched = set()
+    for bay, arrival, departure in session_chunks:
+        if len(bay) == 0 or len(known_bays) == 0:
+            unmatched.update(np.unique(bay).tolist())
+            continue
+        pos = np.minimum(np.searchsorted(known_bays, bay), len(known_bays) - 1)
+        matched = known_bays[pos] == bay
+        unmatched.update(np.unique(bay[~matched]).tolist())
+        bay, arrival, departure = bay[matched], arrival[matched], departure[matched]
+        if len(bay) == 0:
+            continue
+        events = boundary_events(bay, arrival, departure)
+        events['timestamp'] = bucket_start(events['bucket'].to_numpy())
+        append_frame(events, spill_dir, 'timestamp')
+
+        span = pd.DataFrame({'bay': bay, 'first': arrival, 'last': departure}).groupby('bay')
+        for b, value in span['first'].min().items():
+            first_seen[b] = min(first_seen.get(b, value), value)
+        for b, value in span['last'].max().items():
+            last_seen[b] = max(last_seen.get(b, value), value)
+
+    if unmatched:
+        print(f"[WARNING] Dropped sessions of {len(unmatched):,} 2019 bays that are not in the bay registry")
+    if not first_seen:
+        return 0, 0
+    bays = np.array(sorted(first_seen), dtype=np.int64)
+    bay_first = np.array([first_seen[b] // BUCKET_NS for b in bays])
+    bay_last = np.array([last_seen[b] // BUCKET_NS for b in bays])
+    groups, group_index = np.unique(group_fn(bays), return_inverse=True)
+
+    # --- Pass 2: day-by-day sweep with a carried per-bay rate ---
+    carry = np.zeros(len(bays))
+    first_day = int(bay_first.min() // BUCKETS_PER_DAY)
+    last_day = int(bay_last.max() // BUCKETS_PER_DAY)
+    bay_rows = group_rows = 0
+    for day in range(first_day, last_day + 1):
+        day_start = pd.Timestamp(day * DAY_NS, tz='UTC')
+        events = read_frame(spill_dir, 'timestamp', columns=['bay', 'bucket', 'rate', 'correction'],
+                            start=day_start, end=day_start + pd.Timedelta(days=1))
+        rate = np.zeros((len(bays), BUCKETS_PER_DAY))
+        correction = np.zeros((len(bays), BUCKETS_PER_DAY))
+        if len(events):
+            row = np.searchsorted(bays, events['bay'].to_numpy(dtype=np.int64))
+            col = events['bucket'].to_numpy(dtype=np.int64) - day * BUCKETS_PER_DAY
+            np.add.at(rate, (row, col), events['rate'].to_numpy())
+            np.add.at(correction, (row, col), events['correction'].to_numpy())
+
+        running = carry[:, None] + np.cumsum(rate, axis=1)
+        occupancy = np.clip((BUCKET_NS * running + correction) / BUCKET_NS, 0.0, 1.0)
+        carry = running[:, -1]
+
+        day_buckets = day * BUCKETS_PER_DAY + np.arange(BUCKETS_PER_DAY)
+        active = (day_buckets[None, :] >= bay_first[:, None]) & (day_buckets[None, :] <= bay_last[:, None])
+        if not active.any():
+            continue
+
+        bay_idx, col = np.nonzero(active)
+        bay_frame = pd.DataFrame({
+            'bay': bays[bay_idx],
+            'timestamp': bucket_start(day_buckets[col]),
+            'occupancy': occupancy[bay_idx, col].astype(np.float32),
+        })
+        bay_rows += append_frame(bay_frame, os.path.join(output_dir, 'bays'), 'timestamp')
+
+        occupied_sum = np.zeros((len(groups), BUCKETS_PER_DAY))
+        active_count = np.zeros((len(groups), BUCKETS_PER_DAY))
+        np.add.at(occupied_sum, group_index, np.where(active, occupancy, 0.0))
+        np.add.at(active_count, group_index, active.astype(np.float64))
+        g, col = np.nonzero(active_count)
+        group_frame = pd.DataFrame({
+            'group_id': groups[g],
+            'timestamp': bucket_start(day_buckets[col]),
+            'occupancy_ratio': occupied_sum[g, col] / active_count[g, col],
+            'bays': active_count[g, col].astype(np.int32),
+        })
+        group_rows += append_frame(group_frame, os.path.join(output_dir, 'groups'), 'timestamp')
+        print(f"Swept {day_start.date()}: {bay_rows:,} bay rows, {group_rows:,} group rows...", end='\r')
+
+    shutil.rmtree(spill_dir, ignore_errors=True)
+    print(f"\n[SUCCESS] Occupancy written to {output_dir}")
+    return bay_rows, group_rows
+
+
+def read_group_occupancy(start=None, end=None, output_dir=OCCUPANCY_DIR):
+    """
+    15-minute group occupancy from the sweep output as (group, bucket, ratio)
+    arrays sorted by group then bucket, ready for `features.build_feature_frame`.
+    """
+    df = read_frame(os.path.join(output_dir, 'groups'), 'timestamp',
+                    columns=['group_id', 'timestamp', 'occupancy_ratio'], start=start, end=end)
+    group = df['group_id'].to_numpy(dtype=np.int64)
+    bucket = pd.DatetimeIndex(df['timestamp']).as_unit('ns').asi8 // BUCKET_NS
+    ratio = df['occupancy_ratio'].to_numpy(dtype=np.float64)
+    order = np.lexsort((bucket, group))
+    return group[order], bucket[order], ratio[order]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Sweep 2019 sessions into 15-minute occupancy.")
+    parser.add_argument('--bay-column', default=BAY_COLUMN,
+                        help="2019 column matched against the registry's KerbsideIDs (e.g. StreetMarker)")
+    args = parser.parse_args()
+    sweep(iter_store_sessions(bay_column=args.bay_column), BayRegistry.load_or_build().ids)
@@ -0,0 +1,242 @@
+"""
+Precomputed occupancy tiles for the map, instead of heatmap HTML that embeds
+every point.
+
+Snapshots are binned into a Web Mercator grid at several zoom levels. Each
+slippy-map tile (z, x, y) is split into CELLS_PER_TILE x CELLS_PER_TILE cells.
+Bins are also split by time slice: day of week x hour, in Melbourne local
+time, as a user reads the map. For every (zoom, slice, cell) we keep the
+occupied and total snapshot counts, so occupancy = occupied / total and
+activity = total.
+
+Layout, one small file per zoom and slice:
+
+    data/tiles/z15/d0h08.npz    cell_x, cell_y, occupied, total (uint32)
+    data/tiles/_state.json      snapshot part files already folded in (and
+                                slice files staged but not yet swapped in)
+
+Counts are additive. An update reads only the snapshot part files it hasn't
+seen, aggregates them, and rewrites only the slices they touch.
+
+    python -m parksense.occupancy_tiles update
+    python -m parksense.occupancy_tiles tile 15 29551 20115 0 8
+"""
+import json
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+
+from parksense.bay_registry import BAYS_PATH, REGISTRY_PATH, BayRegistry
+from parksense.csv_profile import source_stat
+from parksense.features import is_occupied
+from parksense.snapshot_store import STORE_DIR, list_parts
+
+TILES_DIR = 'data/tiles'
+ZOOMS = (13, 15, 17)
+CELL_BITS = 4                  # 16 x 16 cells per tile (~15 m cells at z17 in Melbourne)
+CELLS_PER_TILE = 1 << CELL_BITS
+LOCAL_TZ = 'Australia/Melbourne'
+SLICES = 7 * 24
+PARTS_PER_BATCH = 64
+STATE_FILE = '_state.json'
+
+
+def mercator_cells(lat, lon, zoom):
+    """Global cell coordinates (x, y) at `zoom` (tile = cell >> CELL_BITS)."""
+    scale = 2.0 ** (zoom + CELL_BITS)
+    lat_rad = np.radians(np.asarray(lat, dtype=np.float64))
+    x = (np.asarray(lon, dtype=np.float64) + 180.0) / 360.0
+    y = (1.0 - np.log(np.tan(lat_rad) + 1.0 / np.cos(lat_rad)) / np.pi) / 2.0
+    return (x * scale).astype(np.int64), (y * scale).astype(np.int64)
+
+
+def cell_centres(cell_x, cell_y, zoom):
+    """(lat, lon) of cell centres, the inverse of `mercator_cells`."""
+    scale = 2.0 ** (zoom + CELL_BITS)
+    lon = (np.asarray(cell_x) + 0.5) / scale * 360.0 - 180.0
+    n = np.pi * (1.0 - 2.0 * (np.asarray(cell_y) + 0.5) / scale)
+    return np.degrees(np.arctan(np.sinh(n))), lon
+
+
+def time_slices(timestamps):
+    """day_of_week * 24 + hour in Melbourne local time."""
+    local = pd.DatetimeIndex(timestamps).tz_convert(LOCAL_TZ)
+    return (local.dayofweek * 24 + local.hour).to_numpy(dtype=np.int64)
+
+
+def slice_path(zoom, time_slice, tiles_dir=TILES_DIR):
+    day_of_week, hour = divmod(int(time_slice), 24)
+    return os.path.join(tiles_dir, f'z{zoom}', f'd{day_of_week}h{hour:02d}.npz')
+
+
+def _aggregate(slices, cell_x, cell_y, occupied, total):
+    """Sums counts per (slice, cell). Returns the unique keys and summed counts."""
+    keys = np.column_stack([slices, cell_x, cell_y])
+    unique, inverse = np.unique(keys, axis=0, return_inverse=True)
+    inverse = inverse.ravel()
+    return (unique,
+            np.bincount(inverse, weights=occupied, minlength=len(unique)),
+            np.bincount(inverse, weights=total, minlength=len(unique)))
+
+
+def read_slice(zoom, time_slice, tiles_dir=TILES_DIR):
+    """(cell_x, cell_y, occupied, total) for one zoom and slice; empty if nothing was seen."""
+    path = slice_path(zoom, time_slice, tiles_dir)
+    if not os.path.exists(path):
+        empty = np.empty(0, dtype=np.uint32)
+        return empty, empty, empty, empty
+    with np.load(path) as data:
+        return data['cell_x'], data['cell_y'], data['occupied'], data['total']
+
+
+def _write_slice(path, cell_x, cell_y, occupied, total):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        np.savez_compressed(f, cell_x=cell_x.astype(np.uint32), cell_y=cell_y.astype(np.uint32),
+                            occupied=occupied.astype(np.uint32), total=total.astype(np.uint32))
+    return tmp_path
+
+
+def _load_state(tiles_dir, settings):
+    path = os.path.join(tiles_dir, STATE_FILE)
+    if os.path.exists(path):
+        with open(path) as f:
+            state = json.load(f)
+        if state.get('settings') == settings:
+            if state.get('staged'):
+                print("Finishing an interrupted tiles update...")
+                _apply_staged(tiles_dir, state)
+            return state
+        print("Tile settings or bay registry changed: rebuilding all tiles.")
+    return {'settings': settings, 'parts': []}
+
+
+def _save_state(tiles_dir, state):
+    os.makedirs(tiles_dir, exist_ok=True)
+    path = os.path.join(tiles_dir, STATE_FILE)
+    with open(path + '.tmp', 'w') as f:
+        json.dump(state, f)
+    os.replace(path + '.tmp', path)
+
+
+def _apply_staged(tiles_dir, state):
+    """
+    Swaps in the slice files staged by an update. The state that lists them
+    (and already counts their parts) is saved first, so an interrupted swap
+    is finished on the next run instead of folding the same parts in again.
+    Files already swapped in have no .tmp left and are skipped.
+    """
+    for name in state.pop('staged', []):
+        path = os.path.join(tiles_dir, name)
+        if os.path.exists(path + '.tmp'):
+            os.replace(path + '.tmp', path)
+    _save_state(tiles_dir, state)
+
+
+def update_tiles(root=STORE_DIR, tiles_dir=TILES_DIR, zooms=ZOOMS, bays_path=BAYS_PATH,
+                 registry_path=REGISTRY_PATH):
+    """
+    Folds snapshot part files not seen before into the tiles. Returns the
+    number of (zoom, slice) files rewritten.
+    """
+    registry = BayRegistry.load_or_build(bays_path, registry_path)
+    size, mtime_ns = source_stat(bays_path)
+    settings = {'zooms': list(zooms), 'cell_bits': CELL_BITS, 'tz': LOCAL_TZ,
+                'bays_size': size, 'bays_mtime_ns': mtime_ns}
+    state = _load_state(tiles_dir, settings)
+    if not state['parts']:
+        for zoom in zooms:
+            for time_slice in range(SLICES):
+                path = slice_path(zoom, time_slice, tiles_dir)
+                if os.path.exists(path):
+                    os.remove(path)
+
+    seen = set(state['parts'])
+    new_parts = [part for part in list_parts(root) if part not in seen]
+    if not new_parts:
+        print("Tiles are up to date.")
+        return 0
+
+    # Aggregate the new snapshots per (zoom, slice, cell)
+    pending = {zoom: [] for zoom in zooms}
+    rows = 0
+    for i in range(0, len(new_parts), PARTS_PER_BATCH):
+        batch = [pq.read_table(os.path.join(root, part), columns=['kerbsideid', 'status', 'status_timestamp'])
+                 .to_pandas() for part in new_parts[i:i + PARTS_PER_BATCH]]
+        df = pd.concat(batch, ignore_index=True)
+        positions = registry.positions(df['kerbsideid'].to_numpy())
+        located = positions >= 0
+        located[located] &= ~np.isnan(registry.latitude[positions[located]])
+        df, positions = df[located], positions[located]
+        rows += len(df)
+        lat, lon = registry.latitude[positions], registry.longitude[positions]
+        slices = time_slices(df['status_timestamp'])
+        occupied = is_occupied(df['status'])
+        for zoom in zooms:
+            cell_x, cell_y = mercator_cells(lat, lon, zoom)
+            pending[zoom].append(_aggregate(slices, cell_x, cell_y, occupied, np.ones(len(df))))
+        print(f"Aggregated {min(i + PARTS_PER_BATCH, len(new_parts))}/{len(new_parts)} parts, "
+              f"{rows:,} snapshots...", end='\r')
+    print()
+
+    # Merge into the touched slices: write every file aside first
+    staged = []
+    for zoom, parts in pending.items():
+        if not parts:
+            continue
+        keys = np.concatenate([p[0] for p in parts])
+        occupied = np.concatenate([p[1] for p in parts])
+        total = np.concatenate([p[2] for p in parts])
+        for time_slice in np.unique(keys[:, 0]):
+            sel = keys[:, 0] == time_slice
+            old_x, old_y, old_occupied, old_total = read_slice(zoom, time_slice, tiles_dir)
+            merged, summed_occupied, summed_total = _aggregate(
+                np.zeros(len(old_x) + sel.sum(), dtype=np.int64),
+                np.concatenate([old_x.astype(np.int64), keys[sel, 1]]),
+                np.concatenate([old_y.astype(np.int64), keys[sel, 2]]),
+                np.concatenate([old_occupied, occupied[sel]]),
+                np.concatenate([old_total, total[sel]]),
+            )
+            path = slice_path(zoom, time_slice, tiles_dir)
+            _write_slice(path, merged[:, 1], merged[:, 2], summed_occupied, summed_total)
+            staged.append(os.path.relpath(path, tiles_dir))
+
+    # Record the new parts together with the staged files, then swap them in
+    rewritten = len(staged)
+    state['parts'] = sorted(seen | set(new_parts))
+    state['staged'] = staged
+    _save_state(tiles_dir, state)
+    _apply_staged(tiles_dir, state)
+    print(f"[SUCCESS] {rows:,} snapshots from {len(new_parts)} new parts -> {rewritten} slices rewritten")
+    return rewritten
+
+
+def read_tile(zoom, x, y, day_of_week, hour, tiles_dir=TILES_DIR):
+    """
+    One slippy-map tile for one time slice, as a small JSON-ready dict:
+    cell centres with occupancy ratio and snapshot count.
+    """
+    cell_x, cell_y, occupied, total = read_slice(zoom, day_of_week * 24 + hour, tiles_dir)
+    inside = ((cell_x >> CELL_BITS) == x) & ((cell_y >> CELL_BITS) == y)
+    lat, lon = cell_centres(cell_x[inside], cell_y[inside], zoom)
+    total = total[inside]
+    return {
+        'z': zoom, 'x': x, 'y': y, 'day_of_week': day_of_week, 'hour': hour,
+        'cells': [{'lat': round(float(a), 6), 'lon': round(float(o), 6), 'occupancy': round(float(oc / t), 4),
+                   'count': int(t)} for a, o, oc, t in zip(lat, lon, occupied[inside], total)],
+    }
+
+
+if __name__ == "__main__":
+    if len(sys.argv) >= 2 and sys.argv[1] == 'update':
+        update_tiles()
+    elif len(sys.argv) == 7 and sys.argv[1] == 'tile':
+        print(json.dumps(read_tile(*map(int, sys.argv[2:]))))
+    else:
+        print("Usage: python -m parksense.occupancy_tiles update")
+        print("       python -m parksense.occupancy_tiles tile <z> <x> <y> <day_of_week> <hour>")
+        sys.exit(1)
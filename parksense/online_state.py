@@ -0,0 +1,164 @@
+"""
+In-memory feature state for low-latency inference.
+
+For every neighbourhood group we keep a fixed-size ring buffer of the last
+`history` 15-minute buckets (occupancy sum, snapshot count and bucket index),
+stored as 2-D NumPy arrays indexed directly by `group_id // group_size`.
+Live sensor heartbeats are folded in with a few vectorized operations, and
+building the (occupancy_ratio, lag_15m, lag_30m) feature row for a group is
+O(1) with no pandas involved.
+
+Lags follow the training semantics in `parksense.features`: `lag_15m` is the
+group's previous *observed* bucket, `lag_30m` the one before that, and
+neither reaches across a gap of more than MAX_GAP_BUCKETS.
+
+`group_fn` maps kerbside IDs to group ids and must match the grouping the
+model was trained with: `kerbside_group` (default) or a
+`parksense.spatial.NeighbourhoodIndex` with `group_size=1`.
+"""
+import os
+
+import numpy as np
+
+from parksense.features import (
+    GROUP_SIZE, MAX_GAP_BUCKETS, bucket_feature_matrix, is_occupied, kerbside_group, to_buckets,
+)
+
+STATE_PATH = 'models/feature_state.npz'
+
+
+class GroupFeatureState:
+
+    def __init__(self, history=8, capacity=1024, group_size=GROUP_SIZE, group_fn=kerbside_group):
+        if history < 3:
+            raise ValueError("history must hold at least 3 buckets (current + two lags)")
+        self.history = history
+        self.group_size = group_size
+        self.group_fn = group_fn
+        self.sums = np.zeros((capacity, history))
+        self.counts = np.zeros((capacity, history), dtype=np.int64)
+        self.buckets = np.full((capacity, history), -1, dtype=np.int64)
+        self.head = np.zeros(capacity, dtype=np.int64)
+        self.filled = np.zeros(capacity, dtype=np.int64)
+
+    @property
+    def capacity(self):
+        return len(self.head)
+
+    def _grow(self, needed):
+        capacity = max(needed, 2 * self.capacity)
+        extra = capacity - self.capacity
+        self.sums = np.vstack([self.sums, np.zeros((extra, self.history))])
+        self.counts = np.vstack([self.counts, np.zeros((extra, self.history), dtype=np.int64)])
+        self.buckets = np.vstack([self.buckets, np.full((extra, self.history), -1, dtype=np.int64)])
+        self.head = np.concatenate([self.head, np.zeros(extra, dtype=np.int64)])
+        self.filled = np.concatenate([self.filled, np.zeros(extra, dtype=np.int64)])
+
+    def update(self, group_ids, buckets, occupied):
+        """
+        Folds observations into the state. All arguments are aligned arrays
+        (or scalars): group id, 15-minute bucket index and 0/1 occupancy.
+        Observations older than a group's latest bucket are ignored.
+        """
+        idx = np.atleast_1d(np.asarray(group_ids, dtype=np.int64)) // self.group_size
+        buckets = np.broadcast_to(np.asarray(buckets, dtype=np.int64), idx.shape)
+        occupied = np.broadcast_to(np.asarray(occupied, dtype=np.float64), idx.shape)
+        if len(idx) == 0:
+            return
+        if idx.max() >= self.capacity:
+            self._grow(int(idx.max()) + 1)
+
+        # Collapse to one (group, bucket) cell with sum/count, like the resample step
+        keys, inverse = np.unique(np.column_stack([buckets, idx]), axis=0, return_inverse=True)
+        inverse = inverse.ravel()
+        sums = np.bincount(inverse, weights=occupied, minlength=len(keys))
+        counts = np.bincount(inverse, minlength=len(keys))
+
+        # A heartbeat normally spans one or two buckets; apply them oldest first
+        for bucket in np.unique(keys[:, 0]):
+            sel = keys[:, 0] == bucket
+            g = keys[sel, 1]
+            latest = self.buckets[g, self.head[g]]
+            advance = latest < bucket
+            fresh = advance | (latest == bucket)
+
+            adv = g[advance]
+            self.head[adv] = (self.head[adv] + 1) % self.history
+            self.sums[adv, self.head[adv]] = 0.0
+            self.counts[adv, self.head[adv]] = 0
+            self.buckets[adv, self.head[adv]] = bucket
+            self.filled[adv] = np.minimum(self.filled[adv] + 1, self.history)
+
+            g = g[fresh]
+            self.sums[g, self.head[g]] += sums[sel][fresh]
+            self.counts[g, self.head[g]] += counts[sel][fresh]
+
+    def update_from_sensors(self, kerbsideids, statuses, timestamps):
+        """Folds in a live sensor heartbeat (kerbsideid, status, status_timestamp)."""
+        group_ids = np.atleast_1d(self.group_fn(kerbsideids))
+        known = group_ids >= 0  # bays the spatial index can't place
+        occupied = np.broadcast_to(is_occupied(statuses), group_ids.shape)
+        buckets = np.broadcast_to(to_buckets(np.atleast_1d(timestamps)), group_ids.shape)
+        self.update(group_ids[known], buckets[known], occupied[known])
+
+    def _ratio(self, idx, back):
+        slot = (self.head[idx] - back) % self.history
+        counts = self.counts[idx, slot]
+        ok = (self.filled[idx] > back) & (counts > 0)
+        for step in range(back):
+            newer = self.buckets[idx, (self.head[idx] - step) % self.history]
+            older = self.buckets[idx, (self.head[idx] - step - 1) % self.history]
+            ok &= newer - older <= MAX_GAP_BUCKETS
+        return np.where(ok, self.sums[idx, slot] / np.maximum(counts, 1), np.nan)
+
+    def active_groups(self):
+        """Group ids that have at least one observed bucket."""
+        return np.flatnonzero(self.filled > 0) * self.group_size
+
+    def latest_bucket(self, group_ids):
+        """Each group's latest observed bucket; -1 for groups never observed."""
+        idx = np.atleast_1d(np.asarray(group_ids, dtype=np.int64)) // self.group_size
+        known = (idx >= 0) & (idx < self.capacity)
+        idx = np.where(known, idx, 0)
+        return np.where(known & (self.filled[idx] > 0), self.buckets[idx, self.head[idx]], -1)
+
+    def feature_rows(self, group_ids):
+        """
+        (n, 6) feature matrix in FEATURES order for the given groups, from each
+        group's latest bucket. Unknown groups come back as NaN rows.
+        """
+        group_ids = np.atleast_1d(np.asarray(group_ids, dtype=np.int64))
+        idx = group_ids // self.group_size
+        known = (idx >= 0) & (idx < self.capacity)
+        idx = np.where(known, idx, 0)
+        known &= self.filled[idx] > 0
+        latest = np.where(known, self.buckets[idx, self.head[idx]], 0)
+        rows = bucket_feature_matrix(group_ids, self._ratio(idx, 0), latest,
+                                     self._ratio(idx, 1), self._ratio(idx, 2))
+        rows[~known, 1:] = np.nan
+        return rows
+
+    def save(self, path=STATE_PATH):
+        """Writes the state atomically so a restarted worker can pick it up."""
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            np.savez(f, sums=self.sums, counts=self.counts, buckets=self.buckets, head=self.head,
+                     filled=self.filled, history=self.history, group_size=self.group_size)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path=STATE_PATH, group_fn=kerbside_group):
+        with np.load(path) as data:
+            state = cls(history=int(data['history']), capacity=1, group_size=int(data['group_size']),
+                        group_fn=group_fn)
+            for name in ('sums', 'counts', 'buckets', 'head', 'filled'):
+                setattr(state, name, data[name].copy())
+        return state
+
+    @classmethod
+    def load_or_create(cls, path=STATE_PATH, **kwargs):
+        """Restores a saved state if there is one, otherwise starts cold."""
+        if os.path.exists(path):
+            return cls.load(path, kwargs.get('group_fn', kerbside_group))
+        return cls(**kwargs)
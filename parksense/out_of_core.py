@@ -0,0 +1,177 @@
+"""
+Out-of-core training data for XGBoost.
+
+`model.fit(X, y)` needs the raw snapshots, the resampled series and the whole
+feature matrix in memory at once. Here the snapshot store is walked a few
+days at a time instead:
+
+  1. Each day partition is read and resampled on its own. 15-minute buckets
+     never straddle UTC days, so this gives the same ratios as resampling
+     everything together.
+  2. The lags for a batch come from a carried tail: the last two observed
+     buckets of every group so far. The targets come from one day of
+     look-ahead, which covers MAX_GAP_BUCKETS (features never chain rows
+     further apart), so lags and targets match the in-memory build exactly.
+  3. Feature batches are spilled to .npy files, and an `xgboost.DataIter`
+     feeds them into a QuantileDMatrix (or an ExtMemQuantileDMatrix, which
+     also keeps the quantized pages on disk).
+
+Peak memory is bounded by one batch of raw snapshots plus the quantized
+training matrix, and not by the length of the history.
+"""
+import glob
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+import xgboost as xgb
+
+from parksense.features import (
+    FEATURES, build_feature_frame, combine_group_series, is_occupied, kerbside_group, resample_groups,
+    target_column, to_buckets,
+)
+from parksense.occupancy_sweep import OCCUPANCY_DIR, read_group_occupancy
+from parksense.snapshot_store import STORE_DIR, list_days, read_snapshots
+
+BATCH_DIR = 'data/training_batches'
+DAYS_PER_BATCH = 7
+LOOKAHEAD_DAYS = 1
+_EMPTY = (np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64), np.empty(0))
+
+
+def resample_day(day, root=STORE_DIR, group_fn=kerbside_group, history_2019=False):
+    """(group, bucket, ratio) for one UTC day of the snapshot store (plus 2019 history if asked)."""
+    start = pd.Timestamp(day, tz='UTC')
+    end = start + pd.Timedelta(days=1)
+    series = []
+    if day in set(list_days(root)):
+        df = read_snapshots(columns=['kerbsideid', 'status', 'status_timestamp'], start=start, end=end, root=root)
+        group_ids = group_fn(df['kerbsideid'].to_numpy())
+        located = group_ids >= 0
+        series.append(resample_groups(group_ids[located], to_buckets(df['status_timestamp'][located]),
+                                      is_occupied(df['status'])[located]))
+    if history_2019:
+        series.append(read_group_occupancy(start, end))
+    return combine_group_series(*series) if series else _EMPTY
+
+
+def group_tail(group, bucket, ratio, rows=2):
+    """The last `rows` observations of every group in a (group, bucket)-sorted series."""
+    if len(group) == 0:
+        return _EMPTY
+    last = np.r_[group[1:] != group[:-1], True]
+    keep = last.copy()
+    for back in range(1, rows):
+        keep[:-back] |= last[back:] & (group[:-back] == group[back:])
+    return group[keep], bucket[keep], ratio[keep]
+
+
+def iter_feature_batches(horizons=(15,), days_per_batch=DAYS_PER_BATCH, root=STORE_DIR,
+                         group_fn=kerbside_group, history_2019=False):
+    """
+    Yields feature frames (as from `features.build_feature_frame`) covering
+    `days_per_batch` days each, in time order. Nothing is dropped.
+    """
+    days = set(list_days(root))
+    if history_2019:
+        days |= set(list_days(os.path.join(OCCUPANCY_DIR, 'groups')))
+    days = sorted(days)
+
+    cache = {}
+    tail = _EMPTY
+    for i in range(0, len(days), days_per_batch):
+        batch_days = days[i:i + days_per_batch]
+        lookahead_days = days[i + days_per_batch:i + days_per_batch + LOOKAHEAD_DAYS]
+        for day in batch_days + lookahead_days:
+            if day not in cache:
+                cache[day] = resample_day(day, root, group_fn, history_2019)
+
+        batch = combine_group_series(tail, *(cache.pop(day) for day in batch_days))
+        group, bucket, ratio = combine_group_series(batch, *(cache[day] for day in lookahead_days))
+        frame = build_feature_frame(group, bucket, ratio, horizons)
+
+        # Only this batch's own buckets become training rows
+        first = pd.Timestamp(batch_days[0], tz='UTC')
+        last = pd.Timestamp(batch_days[-1], tz='UTC') + pd.Timedelta(days=1)
+        yield frame[(frame['timestamp'] >= first) & (frame['timestamp'] < last)]
+        tail = group_tail(*batch)
+
+
+def spill_feature_batches(horizons=(15,), batch_dir=BATCH_DIR, **kwargs):
+    """
+    Writes every batch from `iter_feature_batches` as `batch_NNNNN.X.npy`
+    (float32, FEATURES order) plus one `batch_NNNNN.target_{h}m.npy` per
+    horizon. Returns (batch_count, rows).
+    """
+    shutil.rmtree(batch_dir, ignore_errors=True)
+    os.makedirs(batch_dir)
+    batches = rows = 0
+    for frame in iter_feature_batches(horizons, **kwargs):
+        if len(frame) == 0:
+            continue
+        prefix = os.path.join(batch_dir, f'batch_{batches:05d}')
+        np.save(prefix + '.X.npy', frame[FEATURES].to_numpy(dtype=np.float32))
+        for horizon in horizons:
+            target = target_column(horizon)
+            np.save(f'{prefix}.{target}.npy', frame[target].to_numpy(dtype=np.float32))
+        batches += 1
+        rows += len(frame)
+        print(f"Spilled {batches} batches, {rows:,} feature rows...", end='\r')
+    print()
+    return batches, rows
+
+
+class FeatureBatchIter(xgb.DataIter):
+    """
+    Feeds the spilled batches of one horizon to XGBoost, one at a time.
+    Rows without both lags or a target are dropped, as in the in-memory path.
+    """
+
+    def __init__(self, batch_dir, horizon, cache_prefix=None):
+        self.paths = sorted(glob.glob(os.path.join(batch_dir, 'batch_*.X.npy')))
+        self.target = target_column(horizon)
+        self._index = 0
+        super().__init__(cache_prefix=cache_prefix)
+
+    def next(self, input_data):
+        if self._index >= len(self.paths):
+            return False
+        path = self.paths[self._index]
+        X = np.load(path, mmap_mode='r')
+        y = np.load(path.replace('.X.npy', f'.{self.target}.npy'), mmap_mode='r')
+        keep = ~(np.isnan(X).any(axis=1) | np.isnan(y))
+        input_data(data=np.ascontiguousarray(X[keep]), label=np.ascontiguousarray(y[keep]),
+                   feature_names=FEATURES)
+        self._index += 1
+        return True
+
+    def reset(self):
+        self._index = 0
+
+
+def booster_params(model_params, nthread=None):
+    """XGBRegressor keyword arguments -> native `xgb.train` parameters with `hist`."""
+    params = {
+        'objective': 'reg:squarederror',
+        'tree_method': 'hist',
+        'eta': model_params['learning_rate'],
+        'max_depth': model_params['max_depth'],
+        'subsample': model_params['subsample'],
+        'colsample_bytree': model_params['colsample_bytree'],
+    }
+    if nthread:
+        params['nthread'] = nthread
+    return params
+
+
+def train_from_batches(batch_dir, horizon, model_params, nthread=None, external_memory=False):
+    """Trains one horizon's booster from the spilled batches. Returns (booster, rows)."""
+    if external_memory:
+        it = FeatureBatchIter(batch_dir, horizon, cache_prefix=os.path.join(batch_dir, f'cache_{horizon}m'))
+        dtrain = xgb.ExtMemQuantileDMatrix(it, nthread=nthread)
+    else:
+        dtrain = xgb.QuantileDMatrix(FeatureBatchIter(batch_dir, horizon), nthread=nthread)
+    booster = xgb.train(booster_params(model_params, nthread), dtrain,
+                        num_boost_round=model_params['n_estimators'])
+    return booster, dtrain.num_row()
@@ -0,0 +1,112 @@
+"""
+Batch prediction engine for the backend.
+
+The model and feature manifest are loaded once. On every 15-minute heartbeat
+the groups observed in the newest bucket are scored in one vectorized
+`inplace_predict` call, and user clicks are answered from a cache keyed by
+(group_id, bucket), where bucket is the group's own latest observed bucket
+(the one its features come from). A quiet group keeps the prediction from
+its last observation instead of being rescored under the current bucket.
+Entries are dropped once their group has a newer observation.
+
+`model_path` may also point at a compiled .npz model (see
+`parksense.compiled_model`), in which case xgboost is never imported.
+The state's `group_fn` must assign the groups the model was trained on: a
+spatial model is only served with the same `NeighbourhoodIndex` fingerprint.
+"""
+import numpy as np
+
+from parksense.compiled_model import CompiledModel
+from parksense.features import FEATURES, FEATURES_PATH, load_feature_order, to_buckets
+from parksense.online_state import GroupFeatureState
+from parksense.spatial import FINGERPRINT_PATH, check_fingerprint, load_fingerprint
+
+MODEL_PATH = 'models/parking_model_15m.ubj'
+
+
+def load_model(model_path=MODEL_PATH):
+    """A compiled .npz model or an xgboost Booster; both score rows with `inplace_predict`."""
+    if model_path.endswith('.npz'):
+        return CompiledModel.load(model_path)
+    import xgboost as xgb
+    return xgb.Booster(model_file=model_path)
+
+
+class PredictionEngine:
+
+    def __init__(self, model_path=MODEL_PATH, features_path=FEATURES_PATH, state=None,
+                 fingerprint_path=FINGERPRINT_PATH):
+        features = load_feature_order(features_path)
+        if features != FEATURES:
+            raise ValueError(f"Model expects features {features}, but parksense.features builds {FEATURES}")
+        self.state = state if state is not None else GroupFeatureState()
+        check_fingerprint(self.state.group_fn, load_fingerprint(fingerprint_path), "the exported models")
+        self.booster = load_model(model_path)
+        self.bucket = None
+        self._cache = {}
+
+    def _score(self, rows):
+        # The model predicts the occupancy ratio 15 minutes ahead
+        return np.clip(self.booster.inplace_predict(rows), 0.0, 1.0)
+
+    def refresh(self, bucket=None):
+        """
+        Scores the groups observed in `bucket` (defaults to the newest bucket
+        seen by the state) in one batched call and caches the results.
+        Returns the number of groups scored.
+        """
+        groups = self.state.active_groups()
+        if len(groups) == 0:
+            return 0
+        latest = self.state.latest_bucket(groups)
+        if bucket is None:
+            bucket = int(latest.max())
+        groups = groups[latest == bucket]
+
+        if self.bucket is None or bucket > self.bucket:
+            if self._cache:
+                # Keep only predictions made from each group's latest observation
+                keys = np.array(list(self._cache), dtype=np.int64)
+                current = keys[self.state.latest_bucket(keys[:, 0]) == keys[:, 1]]
+                self._cache = {key: self._cache[key] for key in map(tuple, current.tolist())}
+            self.bucket = bucket
+        if len(groups) == 0:
+            return 0
+        predictions = self._score(self.state.feature_rows(groups))
+        self._cache.update(zip(zip(groups.tolist(), [bucket] * len(groups)), predictions.tolist()))
+        return len(groups)
+
+    def heartbeat(self, kerbsideids, statuses, timestamps):
+        """Folds a live sensor heartbeat into the feature state and rescores the groups it updated."""
+        self.state.update_from_sensors(kerbsideids, statuses, timestamps)
+        return self.refresh()
+
+    def predict_group(self, group_id, bucket=None):
+        """
+        Predicted occupancy ratio 15 minutes after the group's latest
+        observation (cache first). With `bucket`, only a prediction made in
+        that bucket is returned. None if the group has no such observation.
+        """
+        group_id = int(group_id)
+        latest = int(self.state.latest_bucket([group_id])[0])
+        if latest < 0 or (bucket is not None and bucket != latest):
+            return None
+        key = (group_id, latest)
+        value = self._cache.get(key)
+        if value is None:
+            # Group observed after the last refresh: score it on its own
+            value = float(self._score(self.state.feature_rows([group_id]))[0])
+            self._cache[key] = value
+        return value
+
+    def predict_bay(self, kerbsideid, timestamp=None):
+        """
+        Predicted occupancy ratio in 15 minutes for the neighbourhood of a bay.
+        None for a bay the grouping can't place (or a neighbourhood without
+        an observation in the timestamp's bucket).
+        """
+        group_id = int(np.atleast_1d(self.state.group_fn([kerbsideid]))[0])
+        if group_id < 0:
+            return None
+        bucket = None if timestamp is None else int(to_buckets([timestamp])[0])
+        return self.predict_group(group_id, bucket)
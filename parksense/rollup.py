@@ -0,0 +1,254 @@
+"""
+Materialized occupancy rollup: occupied and total snapshot counts per cell,
+at several time resolutions and spatial levels, so analyses and training
+query it instead of rescanning the raw snapshots.
+
+    levels:       bay (kerbsideid), group (kerbside_group, as in training),
+                  segment (RoadSegmentID from the bay registry)
+    resolutions:  5, 15 and 60 minute bins (UTC, since the epoch)
+
+Each (level, resolution) cube is partitioned by UTC day, one small file per
+day with the cells sorted by key then bin:
+
+    data/rollup/segment_5m/date=2024-05-01.npz   key, bin, occupied, total
+    data/rollup/_state.json                       snapshot parts folded in (and
+                                                  files staged but not yet swapped in)
+
+Counts are additive, so occupancy = occupied / total in any cell is the mean
+over its snapshots. At group level and 15 minutes this is exactly what
+`resample_groups` computes. `update_rollup` reads only snapshot parts it
+hasn't seen and rewrites only the days they touch.
+
+    python -m parksense.rollup update
+"""
+import json
+import os
+import shutil
+import sys
+
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+
+from parksense.bay_registry import BAYS_PATH, REGISTRY_PATH, BayRegistry
+from parksense.csv_profile import source_stat
+from parksense.features import GROUP_SIZE, is_occupied, kerbside_group
+from parksense.snapshot_store import STORE_DIR, list_parts, to_utc
+
+ROLLUP_DIR = 'data/rollup'
+LEVELS = ('bay', 'group', 'segment')
+RESOLUTIONS = (5, 15, 60)
+LEVEL_COLUMNS = {'bay': 'kerbsideid', 'group': 'group_id', 'segment': 'road_segment'}
+STATE_FILE = '_state.json'
+
+
+def resolution_ns(resolution):
+    return resolution * 60 * 10**9
+
+
+def cube_dir(level, resolution, rollup_dir=ROLLUP_DIR):
+    return os.path.join(rollup_dir, f'{level}_{resolution}m')
+
+
+def level_keys(level, kerbsideid, registry):
+    """Cell key of each snapshot at `level`; -1 where a bay has no road segment."""
+    if level == 'bay':
+        return np.asarray(kerbsideid, dtype=np.int64)
+    if level == 'group':
+        return kerbside_group(kerbsideid)
+    return registry.lookup(kerbsideid, 'road_segment')
+
+
+def _aggregate(key, time_bin, occupied, total):
+    """Sums counts per (key, bin). Returns the cells sorted by key then bin."""
+    if not len(key):
+        empty = np.empty(0, dtype=np.int64)
+        return empty, empty, empty, empty
+    order = np.lexsort((time_bin, key))
+    key, time_bin = key[order], time_bin[order]
+    starts = np.flatnonzero(np.r_[True, (key[1:] != key[:-1]) | (time_bin[1:] != time_bin[:-1])])
+    return (key[starts], time_bin[starts],
+            np.add.reduceat(np.asarray(occupied, dtype=np.int64)[order], starts),
+            np.add.reduceat(np.asarray(total, dtype=np.int64)[order], starts))
+
+
+def read_cells(level, resolution, day, rollup_dir=ROLLUP_DIR):
+    """(key, bin, occupied, total) for one day of a cube; empty if nothing was seen."""
+    path = os.path.join(cube_dir(level, resolution, rollup_dir), f'date={day}.npz')
+    if not os.path.exists(path):
+        empty = np.empty(0, dtype=np.int64)
+        return empty, empty, empty, empty
+    with np.load(path) as data:
+        return data['key'], data['bin'], data['occupied'], data['total']
+
+
+def _write_cells(path, key, time_bin, occupied, total):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        np.savez_compressed(f, key=key.astype(np.int64), bin=time_bin.astype(np.int64),
+                            occupied=occupied.astype(np.uint32), total=total.astype(np.uint32))
+    return tmp_path
+
+
+def _load_state(rollup_dir, settings):
+    path = os.path.join(rollup_dir, STATE_FILE)
+    if os.path.exists(path):
+        with open(path) as f:
+            state = json.load(f)
+        if state.get('settings') == settings:
+            if state.get('staged'):
+                print("Finishing an interrupted rollup update...")
+                _apply_staged(rollup_dir, state)
+            return state
+        print("Rollup settings or bay registry changed: rebuilding the rollup.")
+    return {'settings': settings, 'parts': []}
+
+
+def _save_state(rollup_dir, state):
+    os.makedirs(rollup_dir, exist_ok=True)
+    path = os.path.join(rollup_dir, STATE_FILE)
+    with open(path + '.tmp', 'w') as f:
+        json.dump(state, f)
+    os.replace(path + '.tmp', path)
+
+
+def _apply_staged(rollup_dir, state):
+    """
+    Swaps in the cell files staged by an update. The state that lists them
+    (and already counts their parts) is saved first, so an interrupted swap
+    is finished on the next run instead of folding the same parts in again.
+    Files already swapped in have no .tmp left and are skipped.
+    """
+    for name in state.pop('staged', []):
+        path = os.path.join(rollup_dir, name)
+        if os.path.exists(path + '.tmp'):
+            os.replace(path + '.tmp', path)
+    _save_state(rollup_dir, state)
+
+
+def update_rollup(root=STORE_DIR, rollup_dir=ROLLUP_DIR, bays_path=BAYS_PATH, registry_path=REGISTRY_PATH):
+    """
+    Folds snapshot part files not seen before into every cube, one day at a
+    time. Returns the number of snapshots added.
+    """
+    registry = BayRegistry.load_or_build(bays_path, registry_path)
+    size, mtime_ns = source_stat(bays_path)
+    settings = {'levels': list(LEVELS), 'resolutions': list(RESOLUTIONS), 'group_size': GROUP_SIZE,
+                'bays_size': size, 'bays_mtime_ns': mtime_ns}
+    state = _load_state(rollup_dir, settings)
+    if not state['parts']:
+        for level in LEVELS:
+            for resolution in RESOLUTIONS:
+                shutil.rmtree(cube_dir(level, resolution, rollup_dir), ignore_errors=True)
+
+    seen = set(state['parts'])
+    new_parts = [part for part in list_parts(root) if part not in seen]
+    if not new_parts:
+        print("Rollup is up to date.")
+        return 0
+
+    by_day = {}
+    for part in new_parts:
+        by_day.setdefault(part.split('/')[0][len('date='):], []).append(part)
+
+    rows = 0
+    for i, (day, parts) in enumerate(sorted(by_day.items())):
+        df = pd.concat([pq.read_table(os.path.join(root, part), columns=['kerbsideid', 'status', 'status_timestamp'])
+                        .to_pandas() for part in parts], ignore_index=True)
+        kerbsideid = df['kerbsideid'].to_numpy(dtype=np.int64)
+        ns = pd.DatetimeIndex(df['status_timestamp']).as_unit('ns').asi8
+        occupied = is_occupied(df['status'])
+
+        # Merge into this day's cells: write every file aside first
+        staged = []
+        for level in LEVELS:
+            keys = level_keys(level, kerbsideid, registry)
+            keep = keys >= 0
+            for resolution in RESOLUTIONS:
+                new = _aggregate(keys[keep], ns[keep] // resolution_ns(resolution),
+                                 occupied[keep], np.ones(keep.sum()))
+                old = read_cells(level, resolution, day, rollup_dir)
+                merged = _aggregate(*(np.concatenate([a, b]) for a, b in zip(old, new)))
+                path = os.path.join(cube_dir(level, resolution, rollup_dir), f'date={day}.npz')
+                _write_cells(path, *merged)
+                staged.append(os.path.relpath(path, rollup_dir))
+
+        # Record the day's parts together with its staged files, then swap them in
+        # (progress is kept per day, so an interrupted update resumes where it stopped)
+        state['parts'] = sorted(set(state['parts']) | set(parts))
+        state['staged'] = staged
+        _save_state(rollup_dir, state)
+        _apply_staged(rollup_dir, state)
+        rows += len(df)
+        print(f"Rolled up {i + 1}/{len(by_day)} days, {rows:,} snapshots...", end='\r')
+    print(f"\n[SUCCESS] {rows:,} snapshots from {len(new_parts)} new parts -> {len(by_day)} days updated")
+    return rows
+
+
+def query_cells(level, resolution, start=None, end=None, keys=None, rollup_dir=ROLLUP_DIR):
+    """
+    (key, bin, occupied, total) arrays for bins starting in [start, end)
+    (naive times are UTC), optionally only for `keys`, sorted by key then
+    bin. Only the days in range are read.
+    """
+    if level not in LEVELS or resolution not in RESOLUTIONS:
+        raise ValueError(f"No {level} cube at {resolution}m (levels {LEVELS}, resolutions {RESOLUTIONS})")
+    directory = cube_dir(level, resolution, rollup_dir)
+    days = sorted(name[len('date='):-len('.npz')] for name in os.listdir(directory)
+                  if name.startswith('date=') and name.endswith('.npz')) if os.path.isdir(directory) else []
+    start, end = to_utc(start), to_utc(end)
+
+    parts = []
+    for day in days:
+        day_start = pd.Timestamp(day, tz='UTC')
+        if (start is not None and day_start + pd.Timedelta(days=1) <= start) or (end is not None and day_start >= end):
+            continue
+        key, time_bin, occupied, total = read_cells(level, resolution, day, rollup_dir)
+        keep = np.ones(len(key), dtype=bool)
+        if start is not None:
+            keep &= time_bin >= -(-start.value // resolution_ns(resolution))
+        if end is not None:
+            keep &= time_bin < -(-end.value // resolution_ns(resolution))
+        if keys is not None:
+            keep &= np.isin(key, np.asarray(keys, dtype=np.int64))
+        parts.append((key[keep], time_bin[keep], occupied[keep], total[keep]))
+    if not parts:
+        empty = np.empty(0, dtype=np.int64)
+        return empty, empty, empty, empty
+
+    key, time_bin, occupied, total = (np.concatenate(column) for column in zip(*parts))
+    # Days are read in order, so a stable sort by key keeps the bins sorted
+    order = np.argsort(key, kind='stable')
+    return key[order], time_bin[order], occupied[order], total[order]
+
+
+def query(level, resolution, start=None, end=None, keys=None, rollup_dir=ROLLUP_DIR):
+    """
+    One cube as a DataFrame: the level's key column, `time_bin` (UTC start
+    of the bin), `occupied`, `total` and `occupancy_ratio`.
+    """
+    key, time_bin, occupied, total = query_cells(level, resolution, start, end, keys, rollup_dir)
+    return pd.DataFrame({
+        LEVEL_COLUMNS[level]: key,
+        'time_bin': pd.to_datetime(time_bin * resolution_ns(resolution), utc=True),
+        'occupied': occupied.astype(np.int64),
+        'total': total.astype(np.int64),
+        'occupancy_ratio': occupied / np.maximum(total, 1),
+    })
+
+
+def group_series(start=None, end=None, rollup_dir=ROLLUP_DIR):
+    """
+    (group, bucket, occupancy_ratio) at 15 minutes for training, the same
+    arrays `resample_groups` builds from raw snapshots.
+    """
+    group, bucket, occupied, total = query_cells('group', 15, start, end, rollup_dir=rollup_dir)
+    return group, bucket, occupied.astype(np.float64) / total
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 2 or sys.argv[1] != 'update':
+        print("Usage: python -m parksense.rollup update")
+        sys.exit(1)
+    update_rollup()
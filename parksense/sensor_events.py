@@ -0,0 +1,78 @@
+"""
+Columnar store for the 2019 on-street sensor event log
+(one row per ArrivalTime/DepartureTime session).
+
+Same day-partitioned Parquet layout as `parksense.snapshot_store`, partitioned
+by ArrivalTime under `data/sensors_2019/`. The 2019 times are local Melbourne
+times and are stored as UTC like the snapshots.
+"""
+import pandas as pd
+
+from parksense.snapshot_store import append_frame, list_days, read_frame
+
+EVENTS_DIR = 'data/sensors_2019'
+TIME_COLUMN = 'ArrivalTime'
+LOCAL_TZ = 'Australia/Melbourne'
+DATE_FORMAT = '%m/%d/%Y %I:%M:%S %p'  # as in the Open Data export
+
+TIME_COLUMNS = ['ArrivalTime', 'DepartureTime']
+INT_COLUMNS = ['DeviceId', 'SignPlateID', 'StreetId', 'BetweenStreet1ID', 'BetweenStreet2ID',
+               'SideOfStreet', 'BayId']
+FLOAT_COLUMNS = ['DurationMinutes', 'DurationSeconds']
+BOOL_COLUMNS = ['InViolation', 'VehiclePresent']
+
+
+def _parse_local_times(values):
+    times = pd.to_datetime(values, format=DATE_FORMAT, errors='coerce')
+    if times.isna().all() and values.notna().any():
+        times = pd.to_datetime(values, format='ISO8601', errors='coerce')
+    times = times.dt.tz_localize(LOCAL_TZ, ambiguous='NaT', nonexistent='shift_forward')
+    return times.dt.tz_convert('UTC').dt.as_unit('ns')
+
+
+def normalize_sensor_events(df):
+    """
+    Casts a chunk of the 2019 CSV (read with dtype=str) to fixed store types so
+    every part file has the same schema: UTC times, nullable ints, booleans and
+    categoricals for the remaining text columns.
+    """
+    df = df.copy()
+    for column in df.columns:
+        if column in TIME_COLUMNS:
+            df[column] = _parse_local_times(df[column])
+        elif column in INT_COLUMNS:
+            df[column] = pd.to_numeric(df[column], errors='coerce').astype('Int64')
+        elif column in FLOAT_COLUMNS:
+            df[column] = pd.to_numeric(df[column], errors='coerce').astype('float64')
+        elif column in BOOL_COLUMNS:
+            df[column] = df[column].str.lower().map({'true': True, 'false': False}).astype('boolean')
+        else:
+            df[column] = df[column].astype('category')
+    return df.dropna(subset=[TIME_COLUMN])
+
+
+def write_events(df, root=EVENTS_DIR):
+    """Normalizes and appends a chunk of raw (string) 2019 rows to the store."""
+    return append_frame(normalize_sensor_events(df), root, TIME_COLUMN)
+
+
+def ingest_csv_stream(stream, root=EVENTS_DIR, chunksize=500000):
+    """
+    Reads a CSV from any binary stream (e.g. a ZIP member) chunk by chunk
+    straight into the store. Returns the number of rows written.
+    """
+    total = 0
+    for chunk in pd.read_csv(stream, dtype=str, chunksize=chunksize):
+        total += write_events(chunk, root)
+        print(f"Ingested {total:,} rows...", end='\r')
+    print()
+    return total
+
+
+def read_events(columns=None, start=None, end=None, root=EVENTS_DIR):
+    """Loads 2019 sessions whose ArrivalTime is in [start, end)."""
+    return read_frame(root, TIME_COLUMN, columns=columns, start=start, end=end)
+
+
+def has_events(root=EVENTS_DIR):
+    return bool(list_days(root))
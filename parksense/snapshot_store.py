@@ -0,0 +1,176 @@
+"""
+Columnar, day-partitioned store for Supabase parking snapshots.
+
+Layout on disk (one Parquet part file per write, per day):
+
+    data/snapshots/date=2024-05-01/part-<n>.parquet
+    data/snapshots/date=2024-05-02/part-<n>.parquet
+
+Columns are stored with their real types (int64 kerbsideid, dictionary-encoded
+`status`, UTC datetime64 `status_timestamp`) so readers skip the CSV parse
+entirely and can ask for just the columns and days they need.
+
+CSV is only an import/export format:
+
+    python -m parksense.snapshot_store import data/supabase_snapshots.csv
+    python -m parksense.snapshot_store export data/supabase_snapshots.csv
+"""
+import os
+import sys
+import time
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+STORE_DIR = 'data/snapshots'
+TIME_COLUMN = 'status_timestamp'
+CSV_CHUNK_SIZE = 500000
+
+
+def normalize_snapshots(df):
+    """Casts a raw snapshots frame (CSV or SQL) to the store's column types."""
+    df = df.copy()
+    df = df.dropna(subset=['kerbsideid', TIME_COLUMN])
+    df['kerbsideid'] = df['kerbsideid'].astype('int64')
+    if 'id' in df.columns:
+        df['id'] = df['id'].astype('int64')
+    df['status'] = df['status'].astype('category')
+    df[TIME_COLUMN] = pd.to_datetime(df[TIME_COLUMN], utc=True).dt.as_unit('ns')
+    return df
+
+
+def append_frame(df, root, time_column):
+    """
+    Appends `df` to a day-partitioned store, one new part file per day touched.
+    Returns the number of rows written.
+    """
+    if df.empty:
+        return 0
+    days = df[time_column].dt.strftime('%Y-%m-%d')
+    stamp = time.time_ns()
+    for day, part in df.groupby(days, sort=True, observed=True):
+        day_dir = os.path.join(root, f'date={day}')
+        os.makedirs(day_dir, exist_ok=True)
+        table = pa.Table.from_pandas(part, preserve_index=False)
+        # Write under a temp name first so readers never see half a file
+        tmp_path = os.path.join(day_dir, f'.part-{stamp}.parquet.tmp')
+        pq.write_table(table, tmp_path)
+        os.replace(tmp_path, os.path.join(day_dir, f'part-{stamp}.parquet'))
+    return len(df)
+
+
+def list_days(root=STORE_DIR):
+    """Returns the sorted list of 'YYYY-MM-DD' partitions present in the store."""
+    if not os.path.isdir(root):
+        return []
+    return sorted(d[len('date='):] for d in os.listdir(root) if d.startswith('date='))
+
+
+def list_parts(root=STORE_DIR):
+    """
+    Sorted part files as paths relative to `root` ('date=.../part-<n>.parquet').
+    Part files are never rewritten, so incremental consumers can remember
+    which ones they have already processed.
+    """
+    return [f'date={day}/{name}' for day in list_days(root)
+            for name in sorted(os.listdir(os.path.join(root, f'date={day}'))) if name.endswith('.parquet')]
+
+
+def to_utc(value):
+    """pd.Timestamp in UTC (naive values are taken as UTC); None stays None."""
+    if value is None:
+        return None
+    value = pd.Timestamp(value)
+    return value.tz_localize('UTC') if value.tzinfo is None else value.tz_convert('UTC')
+
+
+def read_frame(root, time_column, columns=None, start=None, end=None):
+    """
+    Reads `columns` for rows with `start <= time_column < end` from a
+    day-partitioned store. Whole days outside the range are never opened.
+    """
+    start, end = to_utc(start), to_utc(end)
+    read_columns = None
+    if columns is not None:
+        read_columns = list(columns)
+        if (start is not None or end is not None) and time_column not in read_columns:
+            read_columns.append(time_column)
+
+    filters = []
+    if start is not None:
+        filters.append((time_column, '>=', start))
+    if end is not None:
+        filters.append((time_column, '<', end))
+
+    tables = []
+    for day in list_days(root):
+        day_start = pd.Timestamp(day, tz='UTC')
+        if start is not None and day_start + pd.Timedelta(days=1) <= start:
+            continue
+        if end is not None and day_start >= end:
+            continue
+        day_dir = os.path.join(root, f'date={day}')
+        for name in sorted(os.listdir(day_dir)):
+            if not name.endswith('.parquet'):
+                continue
+            tables.append(pq.read_table(os.path.join(day_dir, name),
+                                        columns=read_columns, filters=filters or None))
+
+    if not tables:
+        return pd.DataFrame(columns=columns or [])
+    # Per-file dictionaries differ, so unify them before building categoricals
+    df = pa.concat_tables(tables, promote_options='default').unify_dictionaries().to_pandas()
+    if columns is not None:
+        df = df[list(columns)]
+    return df
+
+
+def write_snapshots(df, root=STORE_DIR):
+    """Normalizes and appends snapshot rows to the store."""
+    return append_frame(normalize_snapshots(df), root, TIME_COLUMN)
+
+
+def read_snapshots(columns=None, start=None, end=None, root=STORE_DIR):
+    """
+    Loads snapshots from the store.
+
+    `columns` limits what is read from disk; `start`/`end` (inclusive/exclusive,
+    anything pd.Timestamp accepts, naive values are taken as UTC) limit the rows.
+    """
+    return read_frame(root, TIME_COLUMN, columns=columns, start=start, end=end)
+
+
+def import_csv(csv_path, root=STORE_DIR, chunksize=CSV_CHUNK_SIZE):
+    """Imports a `supabase_snapshots.csv` export into the store, chunk by chunk."""
+    total = 0
+    for chunk in pd.read_csv(csv_path, chunksize=chunksize):
+        total += write_snapshots(chunk, root)
+        print(f"Imported {total:,} rows...", end='\r')
+    print(f"\n[SUCCESS] Imported {total:,} rows from {csv_path} into {root}")
+    return total
+
+
+def export_csv(csv_path, root=STORE_DIR):
+    """Writes the whole store back out as a single CSV, one day at a time."""
+    total = 0
+    header = True
+    with open(csv_path, 'w', newline='') as f:
+        for day in list_days(root):
+            day_start = pd.Timestamp(day, tz='UTC')
+            part = read_snapshots(start=day_start, end=day_start + pd.Timedelta(days=1), root=root)
+            part.to_csv(f, index=False, header=header)
+            header = False
+            total += len(part)
+    print(f"[SUCCESS] Exported {total:,} rows to {csv_path}")
+    return total
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 3 or sys.argv[1] not in ('import', 'export'):
+        print("Usage: python -m parksense.snapshot_store import|export <csv_path>")
+        sys.exit(1)
+    if sys.argv[1] == 'import':
+        import_csv(sys.argv[2])
+    else:
+        export_csv(sys.argv[2])
@@ -0,0 +1,198 @@
+"""
+Spatial neighbourhoods built from bay Latitude/Longitude.
+
+Grouping by `kerbsideid // 20` assumes IDs are spatially sequential. Here bays
+are projected to metres around the CBD instead and bucketed into square grid
+cells. Each occupied cell is a neighbourhood with a dense integer group id.
+Cell codes are kept sorted, so both lookups are array operations:
+
+  - `group_of(kerbsideids)`: bay -> group through the bay registry (searchsorted)
+  - `groups_within(lat, lon, radius_m)`: candidate cells around the point,
+    then an exact distance check against each group's centroid
+
+`NeighbourhoodIndex` is callable like `features.kerbside_group`, so training
+and serving can use it through the same `group_fn` interface.
+
+Group ids are renumbered whenever the registry changes, so a model only makes
+sense with the index it was trained on. Training records the index
+`fingerprint` in the model manifest and in `models/neighbourhoods.txt`, and
+incremental runs and the prediction engine refuse an index that differs.
+
+    python -m parksense.spatial
+"""
+import hashlib
+import os
+
+import numpy as np
+
+from parksense.bay_registry import BAYS_PATH, BayRegistry
+
+INDEX_PATH = 'data/neighbourhoods.npz'
+FINGERPRINT_PATH = 'models/neighbourhoods.txt'
+CELL_METRES = 150.0
+ORIGIN_LAT, ORIGIN_LON = -37.8136, 144.9631  # Melbourne CBD
+EARTH_RADIUS_M = 6371008.8
+GRID_COLUMNS = 1 << 20  # cell code = row * GRID_COLUMNS + column (both offset to be positive)
+GRID_OFFSET = GRID_COLUMNS // 2
+NO_GROUP = -1
+
+
+def project(lat, lon):
+    """Equirectangular projection to (x, y) metres from the CBD origin (fine at city scale)."""
+    lat = np.asarray(lat, dtype=np.float64)
+    lon = np.asarray(lon, dtype=np.float64)
+    x = np.radians(lon - ORIGIN_LON) * np.cos(np.radians(ORIGIN_LAT)) * EARTH_RADIUS_M
+    y = np.radians(lat - ORIGIN_LAT) * EARTH_RADIUS_M
+    return x, y
+
+
+class NeighbourhoodIndex:
+
+    def __init__(self, bay_ids, bay_group, cell_codes, centroid_x, centroid_y, cell_metres=CELL_METRES,
+                 source=None):
+        self.bay_ids = bay_ids          # sorted KerbsideIDs (same order as the bay registry)
+        self.bay_group = bay_group      # group id per bay, NO_GROUP without coordinates
+        self.cell_codes = cell_codes    # sorted; group id == position in this array
+        self.centroid_x = centroid_x
+        self.centroid_y = centroid_y
+        self.cell_metres = cell_metres
+        self.source = source            # (size, mtime_ns) of the bays CSV the registry was built from
+
+    def __len__(self):
+        return len(self.cell_codes)
+
+    def __call__(self, kerbsideid):
+        return self.group_of(kerbsideid)
+
+    @property
+    def fingerprint(self):
+        """Hash of the bay -> group assignment; changes whenever group ids could."""
+        sha = hashlib.sha256(np.float64(self.cell_metres).tobytes())
+        for array in (self.bay_ids, self.bay_group, self.cell_codes):
+            sha.update(np.ascontiguousarray(array, dtype=np.int64).tobytes())
+        return sha.hexdigest()[:16]
+
+    def _cell_code(self, x, y):
+        column = np.floor(x / self.cell_metres).astype(np.int64) + GRID_OFFSET
+        row = np.floor(y / self.cell_metres).astype(np.int64) + GRID_OFFSET
+        return row * GRID_COLUMNS + column
+
+    @classmethod
+    def from_registry(cls, registry, cell_metres=CELL_METRES):
+        located = ~(np.isnan(registry.latitude) | np.isnan(registry.longitude))
+        x, y = project(registry.latitude, registry.longitude)
+        index = cls(registry.ids, None, None, None, None, cell_metres,
+                    (registry.source_size, registry.source_mtime_ns))
+
+        codes = index._cell_code(x[located], y[located])
+        cell_codes, group = np.unique(codes, return_inverse=True)
+        counts = np.bincount(group, minlength=len(cell_codes))
+        index.cell_codes = cell_codes
+        index.centroid_x = np.bincount(group, weights=x[located], minlength=len(cell_codes)) / counts
+        index.centroid_y = np.bincount(group, weights=y[located], minlength=len(cell_codes)) / counts
+        index.bay_group = np.full(len(registry.ids), NO_GROUP, dtype=np.int64)
+        index.bay_group[located] = group
+        return index
+
+    def save(self, path=INDEX_PATH):
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            np.savez(f, bay_ids=self.bay_ids, bay_group=self.bay_group, cell_codes=self.cell_codes,
+                     centroid_x=self.centroid_x, centroid_y=self.centroid_y, cell_metres=self.cell_metres,
+                     source=np.array(self.source or (-1, -1), dtype=np.int64))
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path=INDEX_PATH):
+        with np.load(path) as data:
+            source = tuple(int(v) for v in data['source']) if 'source' in data.files else None
+            return cls(data['bay_ids'], data['bay_group'], data['cell_codes'], data['centroid_x'],
+                       data['centroid_y'], float(data['cell_metres']), source)
+
+    @classmethod
+    def load_or_build(cls, bays_path=BAYS_PATH, path=INDEX_PATH, cell_metres=CELL_METRES):
+        """
+        Loads the saved index. It is rebuilt (and group ids may change) only if
+        the bays CSV behind the registry or the cell size changed.
+        """
+        registry = BayRegistry.load_or_build(bays_path)
+        if os.path.exists(path):
+            index = cls.load(path)
+            if (index.cell_metres == cell_metres and index.source == (registry.source_size, registry.source_mtime_ns)
+                    and np.array_equal(index.bay_ids, registry.ids)):
+                return index
+        index = cls.from_registry(registry, cell_metres)
+        index.save(path)
+        return index
+
+    def group_of(self, kerbsideid):
+        """Group id for each bay, NO_GROUP (-1) for bays not on the map."""
+        ids = np.atleast_1d(np.asarray(kerbsideid, dtype=np.int64))
+        if len(self.bay_ids) == 0:
+            return np.full(ids.shape, NO_GROUP, dtype=np.int64)
+        pos = np.minimum(np.searchsorted(self.bay_ids, ids), len(self.bay_ids) - 1)
+        return np.where(self.bay_ids[pos] == ids, self.bay_group[pos], NO_GROUP)
+
+    def group_of_point(self, lat, lon):
+        """Group whose cell contains the point, NO_GROUP if that cell has no bays."""
+        x, y = project(lat, lon)
+        codes = np.atleast_1d(self._cell_code(x, y))
+        if len(self.cell_codes) == 0:
+            return np.full(codes.shape, NO_GROUP, dtype=np.int64)
+        pos = np.minimum(np.searchsorted(self.cell_codes, codes), len(self.cell_codes) - 1)
+        return np.where(self.cell_codes[pos] == codes, pos, NO_GROUP)
+
+    def groups_within(self, lat, lon, radius_m):
+        """Group ids whose centroid is within `radius_m` metres of the point (nearest first)."""
+        if len(self.cell_codes) == 0:
+            return np.empty(0, dtype=np.int64)
+        x, y = project(lat, lon)
+        reach = int(np.ceil(radius_m / self.cell_metres)) + 1  # centroids sit anywhere inside a cell
+        offsets = np.arange(-reach, reach + 1)
+        centre = self._cell_code(x, y)
+        candidates = (centre + offsets[:, None] * GRID_COLUMNS + offsets[None, :]).ravel()
+
+        pos = np.minimum(np.searchsorted(self.cell_codes, candidates), len(self.cell_codes) - 1)
+        groups = pos[self.cell_codes[pos] == candidates]
+        distance = np.hypot(self.centroid_x[groups] - x, self.centroid_y[groups] - y)
+        inside = distance <= radius_m
+        return groups[inside][np.argsort(distance[inside], kind='stable')]
+
+
+def index_fingerprint(group_fn):
+    """Fingerprint of a NeighbourhoodIndex `group_fn`, None for kerbside grouping."""
+    return getattr(group_fn, 'fingerprint', None)
+
+
+def save_fingerprint(group_fn, path=FINGERPRINT_PATH):
+    """Records next to the models which index they were trained with (removed for kerbside grouping)."""
+    fingerprint = index_fingerprint(group_fn)
+    if fingerprint is None:
+        if os.path.exists(path):
+            os.remove(path)
+        return
+    with open(path, 'w') as f:
+        f.write(fingerprint)
+
+
+def load_fingerprint(path=FINGERPRINT_PATH):
+    """The index fingerprint the exported models expect, None for kerbside grouping."""
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return f.read().strip()
+
+
+def check_fingerprint(group_fn, expected, what='the models'):
+    """Raises if `group_fn` does not assign the groups `expected` (a recorded fingerprint) stands for."""
+    actual = index_fingerprint(group_fn)
+    if actual != expected:
+        raise ValueError(f"Trained with {f'neighbourhood index {expected}' if expected else 'kerbside grouping'}, "
+                         f"but the current grouping is {f'index {actual}' if actual else 'kerbside'}: "
+                         f"retrain {what} fully")
+
+
+if __name__ == "__main__":
+    index = NeighbourhoodIndex.load_or_build()
+    print(f"[SUCCESS] {len(index):,} neighbourhoods of {index.cell_metres:.0f}m -> {INDEX_PATH}")
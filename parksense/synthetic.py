@@ -0,0 +1,89 @@
+"""
+Synthetic snapshot tables shaped like `public.snapshots`
+(id, kerbsideid, status, status_timestamp) for benchmarks.
+
+Scale 1x is roughly our current Supabase volume (~770k rows): 1,000 bays
+reporting every 15 minutes for 8 days. Higher scales add more days of history
+(10x ~ 80 days, 100x ~ 800 days), generated one day at a time so large scales
+can be streamed into the snapshot store without holding them in memory.
+
+Occupancy follows a daily rhythm in Melbourne local time (weekday business
+peak, lunch bump, quieter evenings and weekends). Each bay is a two-state
+Markov chain around that rhythm, so a car that is parked tends to still be
+there 15 minutes later, like in the real feed. A small share of reports go
+missing, as with flaky sensors.
+"""
+import numpy as np
+import pandas as pd
+
+BAYS_1X = 1000
+DAYS_1X = 8
+START = '2024-05-06'  # a Monday
+LOCAL_TZ = 'Australia/Melbourne'
+PERSISTENCE = 0.7     # lag-1 autocorrelation of a bay's status between reports
+DROPOUT = 0.02        # share of missing reports
+SCALES = (1, 10, 100)
+
+
+def occupancy_probability(hour, day_of_week):
+    """CBD rhythm by local (fractional) hour: weekday peak + lunch bump, quieter nights/weekends."""
+    hour = np.asarray(hour, dtype=np.float64)
+    weekday = np.asarray(day_of_week) < 5
+    daytime = np.exp(-((hour - 13.0) ** 2) / (2 * 3.5 ** 2))
+    lunch = np.exp(-((hour - 12.5) ** 2) / (2 * 0.75 ** 2))
+    evening = np.exp(-((hour - 19.5) ** 2) / (2 * 1.5 ** 2))
+    return np.where(weekday,
+                    0.12 + 0.65 * daytime + 0.10 * lunch + 0.05 * evening,
+                    0.08 + 0.40 * daytime + 0.12 * evening)
+
+
+def iter_snapshots(scale=1.0, seed=0, bays=BAYS_1X, interval_minutes=15):
+    """
+    Yields the snapshots of `scale * DAYS_1X` days as one DataFrame per UTC day,
+    with ids continuing across days.
+    """
+    rng = np.random.default_rng(seed)
+    days = max(1, int(round(DAYS_1X * scale)))
+    slots_per_day = 24 * 60 // interval_minutes
+    interval_ns = interval_minutes * 60 * 10**9
+
+    # Kerbside IDs are sparse-ish and roughly sequential, like the real map
+    kerbsideids = np.sort(rng.choice(np.arange(5000, 5000 + bays * 3), size=bays, replace=False))
+    popularity = rng.normal(0.0, 0.12, size=bays)
+    occupied = rng.random(bays) < 0.2
+    next_id = 1
+
+    start_ns = pd.Timestamp(START, tz='UTC').value
+    for day in range(days):
+        slot_start = start_ns + (day * slots_per_day + np.arange(slots_per_day, dtype=np.int64)) * interval_ns
+        local = pd.to_datetime(slot_start, utc=True).tz_convert(LOCAL_TZ)
+        rhythm = occupancy_probability(local.hour + local.minute / 60.0, local.dayofweek)
+
+        # Stationary probability p with persistence rho:
+        # P(occupied | occupied) = p + rho * (1 - p), P(occupied | vacant) = p * (1 - rho)
+        status = np.empty((slots_per_day, bays), dtype=bool)
+        draws = rng.random((slots_per_day, bays))
+        for slot in range(slots_per_day):
+            p = np.clip(rhythm[slot] + popularity, 0.0, 1.0)
+            stay = np.where(occupied, p + PERSISTENCE * (1.0 - p), p * (1.0 - PERSISTENCE))
+            occupied = draws[slot] < stay
+            status[slot] = occupied
+
+        reported = rng.random((slots_per_day, bays)) >= DROPOUT
+        slot_idx, bay_idx = np.nonzero(reported)
+        ts = slot_start[slot_idx] + rng.integers(0, interval_ns, size=len(slot_idx))
+        yield pd.DataFrame({
+            'id': np.arange(next_id, next_id + len(ts), dtype=np.int64),
+            'kerbsideid': kerbsideids[bay_idx],
+            'status': pd.Categorical.from_codes(status[slot_idx, bay_idx].astype(np.int8), ['Unoccupied', 'Present']),
+            'status_timestamp': pd.to_datetime(ts, utc=True),
+        })
+        next_id += len(ts)
+
+
+def generate_snapshots(scale=1.0, seed=0, bays=BAYS_1X, interval_minutes=15):
+    """
+    Returns a snapshots DataFrame with `scale * DAYS_1X` days of history
+    (all of `iter_snapshots` in memory; prefer the iterator beyond ~10x).
+    """
+    return pd.concat(list(iter_snapshots(scale, seed, bays, interval_minutes)), ignore_index=True)
@@ -0,0 +1,287 @@
+"""
+Run-length-encoded store of per-bay state transitions.
+
+Most snapshot rows repeat the bay's previous status. Compaction collapses a
+bay's consecutive reports of the same status into one run:
+
+    (bay, status, start, end, reports)
+
+`start` and `end` are the times of the run's first and last report, and
+`reports` is how many snapshots it replaced. A run also ends when the bay
+misses a 15-minute bucket, so an offline sensor is not counted as observed.
+Runs are kept as flat arrays sorted by bay then start, in one .npz file.
+
+`group_ratios` builds the 15-minute occupancy series from the runs. It does
+not expand them into buckets: each run adds +1 (observed) and +occupied at
+its first bucket and takes them back after its last, and a running sum over
+the sorted events gives every (group, bucket) ratio. Each bay counts once
+per bucket it covers. If a bay reports at most once per bucket (the
+15-minute heartbeat), this gives exactly `resample_groups` over the raw
+snapshots.
+
+Compaction is incremental. Next to the runs it keeps a checkpoint of every
+bay's open run as of the start of the last compacted day. New part files
+for that day or later (the extractor appends to the current day's
+partition) re-open only that day: its runs are dropped, and the day is
+compacted again from the checkpoint. New parts for earlier days trigger a
+rebuild.
+
+    python -m parksense.transitions compact
+"""
+import json
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+from parksense.features import BUCKET_NS, OCCUPIED_STATUS, kerbside_group
+from parksense.snapshot_store import STORE_DIR, list_parts, read_snapshots
+
+TRANSITIONS_PATH = 'data/transitions.npz'
+STATE_SUFFIX = '.state.json'
+CHECKPOINT_SUFFIX = '.open.npz'
+RUN_COLUMNS = ('bay', 'status', 'start', 'end', 'reports')
+
+
+class TransitionRuns:
+
+    def __init__(self, bay, status, start, end, reports, statuses):
+        self.bay = np.asarray(bay, dtype=np.int64)
+        self.status = np.asarray(status, dtype=np.int8)
+        self.start = np.asarray(start, dtype=np.int64)
+        self.end = np.asarray(end, dtype=np.int64)
+        self.reports = np.asarray(reports, dtype=np.int32)
+        self.statuses = [str(s) for s in statuses]
+
+    def __len__(self):
+        return len(self.bay)
+
+    @property
+    def snapshots(self):
+        return int(self.reports.sum())
+
+    @classmethod
+    def empty(cls, statuses=()):
+        return cls(*(np.empty(0) for _ in RUN_COLUMNS), statuses)
+
+    def save(self, path=TRANSITIONS_PATH):
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            np.savez_compressed(f, **{name: getattr(self, name) for name in RUN_COLUMNS},
+                                statuses=np.asarray(self.statuses, dtype=str))
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path=TRANSITIONS_PATH):
+        with np.load(path) as data:
+            return cls(*(data[name] for name in RUN_COLUMNS), data['statuses'])
+
+    def group_ratios(self, group_fn=kerbside_group, start=None, end=None):
+        """
+        15-minute occupancy per (group, bucket) straight from the runs, for
+        buckets in [start, end). Returns (group, bucket, occupancy_ratio)
+        sorted by group then bucket, like `resample_groups`. Bays whose
+        group id is negative (not in a spatial index) are skipped.
+        """
+        bays, inverse = np.unique(self.bay, return_inverse=True)
+        group = np.atleast_1d(group_fn(bays)).astype(np.int64)[inverse]
+        first = self.start // BUCKET_NS
+        stop = self.end // BUCKET_NS + 1
+        if start is not None:
+            first = np.maximum(first, pd.Timestamp(start).value // BUCKET_NS)
+        if end is not None:
+            stop = np.minimum(stop, pd.Timestamp(end).value // BUCKET_NS)
+        keep = (group >= 0) & (stop > first)
+        group, first, stop = group[keep], first[keep], stop[keep]
+        present = np.isin(self.status[keep], [i for i, s in enumerate(self.statuses) if s == OCCUPIED_STATUS])
+        if not len(group):
+            empty = np.empty(0, dtype=np.int64)
+            return empty, empty, np.empty(0)
+
+        # +1 at each run's first bucket, -1 after its last, merged per (group, bucket)
+        event_group = np.concatenate([group, group])
+        event_bucket = np.concatenate([first, stop])
+        order = np.lexsort((event_bucket, event_group))
+        g, b = event_group[order], event_bucket[order]
+        observed = np.concatenate([np.ones(len(group)), -np.ones(len(group))])[order]
+        occupied = np.concatenate([present, -present.astype(np.float64)])[order]
+        starts = np.flatnonzero(np.r_[True, (g[1:] != g[:-1]) | (b[1:] != b[:-1])])
+        g, b = g[starts], b[starts]
+        # Every group's events sum to zero, so one running sum serves all groups
+        observed = np.cumsum(np.add.reduceat(observed, starts))
+        occupied = np.cumsum(np.add.reduceat(occupied, starts))
+
+        # The counts hold from each event up to the next one of the same group
+        segment = np.flatnonzero((g[:-1] == g[1:]) & (observed[:-1] > 0.5))
+        lengths = b[segment + 1] - b[segment]
+        offsets = np.arange(lengths.sum()) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+        return (np.repeat(g[segment], lengths),
+                np.repeat(b[segment], lengths) + offsets,
+                np.repeat(occupied[segment] / observed[segment], lengths))
+
+
+def _day_runs(df, statuses):
+    """Runs within one batch of snapshots, sorted by bay then start."""
+    if df.empty:
+        return TransitionRuns.empty(statuses)
+    codes = {status: i for i, status in enumerate(statuses)}
+    status_values = df['status'].astype(str).to_numpy()
+    for status in pd.unique(status_values):
+        if status not in codes:
+            codes[status] = len(statuses)
+            statuses.append(status)
+    bay = df['kerbsideid'].to_numpy(dtype=np.int64)
+    status = pd.Series(status_values).map(codes).to_numpy(dtype=np.int8)
+    ts = pd.DatetimeIndex(df['status_timestamp']).as_unit('ns').asi8
+    order = np.lexsort((ts, bay))
+    bay, status, ts = bay[order], status[order], ts[order]
+    bucket = ts // BUCKET_NS
+
+    breaks = np.r_[True, (bay[1:] != bay[:-1]) | (status[1:] != status[:-1]) | (bucket[1:] > bucket[:-1] + 1)]
+    starts = np.flatnonzero(breaks)
+    ends = np.r_[starts[1:], len(bay)] - 1
+    return TransitionRuns(bay[starts], status[starts], ts[starts], ts[ends], ends - starts + 1, statuses)
+
+
+def _concat(runs, statuses):
+    return TransitionRuns(*(np.concatenate([getattr(r, name) for r in runs]) for name in RUN_COLUMNS), statuses)
+
+
+def _take(runs, mask):
+    return TransitionRuns(*(getattr(runs, name)[mask] for name in RUN_COLUMNS), runs.statuses)
+
+
+def _last_per_bay(runs):
+    return np.r_[runs.bay[1:] != runs.bay[:-1], True] if len(runs) else np.zeros(0, dtype=bool)
+
+
+def _extend(open_runs, new):
+    """
+    Joins each bay's first new run onto its open run when the status is the
+    same and no bucket was missed. Returns (finished open runs, the new open
+    run of every bay, finished new runs).
+    """
+    first = np.r_[True, new.bay[1:] != new.bay[:-1]] if len(new) else np.zeros(0, dtype=bool)
+    pos = np.minimum(np.searchsorted(open_runs.bay, new.bay[first]), max(len(open_runs) - 1, 0))
+    found = (open_runs.bay[pos] == new.bay[first]) if len(open_runs) else np.zeros(first.sum(), dtype=bool)
+    joined = found.copy()
+    joined[found] = ((open_runs.status[pos[found]] == new.status[first][found])
+                     & (new.start[first][found] // BUCKET_NS <= open_runs.end[pos[found]] // BUCKET_NS + 1))
+    idx = np.flatnonzero(first)[joined]
+    new.start[idx] = open_runs.start[pos[joined]]
+    new.reports[idx] += open_runs.reports[pos[joined]]
+
+    # Open runs of bays seen again are finished, unless they were joined into a new run
+    touched = np.zeros(len(open_runs), dtype=bool)
+    touched[pos[found]] = True
+    continued = np.zeros(len(open_runs), dtype=bool)
+    continued[pos[joined]] = True
+    closed = _take(open_runs, touched & ~continued)
+    last = _last_per_bay(new)
+    still_open = _take(open_runs, ~touched)
+    merged_open = _concat([still_open, _take(new, last)], new.statuses)
+    merged_open = _take(merged_open, np.argsort(merged_open.bay, kind='stable'))
+    return closed, merged_open, _take(new, ~last)
+
+
+def _sorted(runs):
+    return _take(runs, np.lexsort((runs.start, runs.bay)))
+
+
+def _load_state(path):
+    state_path = path + STATE_SUFFIX
+    if os.path.exists(path) and os.path.exists(path + CHECKPOINT_SUFFIX) and os.path.exists(state_path):
+        with open(state_path) as f:
+            state = json.load(f)
+        if 'last_day' in state:
+            return state
+    return {'parts': []}
+
+
+def _day_of(part):
+    return part.split('/')[0][len('date='):]
+
+
+def _reopen(runs, checkpoint, day):
+    """
+    Rolls `runs` back to the start of `day`, given the open runs at that
+    point: runs finished before the day are kept, and the open runs replace
+    whatever they became (they keep their bay and start when extended).
+    """
+    day_start = pd.Timestamp(day, tz='UTC').value
+    pos = np.minimum(np.searchsorted(checkpoint.bay, runs.bay), max(len(checkpoint) - 1, 0))
+    was_open = np.zeros(len(runs), dtype=bool)
+    if len(checkpoint):
+        was_open = (checkpoint.bay[pos] == runs.bay) & (checkpoint.start[pos] == runs.start)
+    return _take(runs, (runs.start < day_start) & ~was_open)
+
+
+def compact(root=STORE_DIR, path=TRANSITIONS_PATH):
+    """
+    Brings the runs at `path` up to date with the snapshot store, one day at
+    a time. Returns the TransitionRuns.
+    """
+    state = _load_state(path)
+    parts = list_parts(root)
+    seen = set(state['parts'])
+    new_parts = [part for part in parts if part not in seen]
+    if state['parts'] and not new_parts and set(parts) == seen:
+        print("Transitions are up to date.")
+        return TransitionRuns.load(path)
+
+    last_day = state.get('last_day', '')
+    new_days = sorted({_day_of(part) for part in new_parts})
+    if state['parts'] and seen <= set(parts) and new_days[0] >= last_day:
+        runs = TransitionRuns.load(path)
+        statuses = runs.statuses
+        if new_days[0] > last_day:
+            last = _last_per_bay(runs)
+            closed, open_runs = [_take(runs, ~last)], _take(runs, last)
+        else:
+            # New parts in the last compacted day: compact it again from its checkpoint
+            checkpoint = TransitionRuns.load(path + CHECKPOINT_SUFFIX)
+            open_runs = TransitionRuns(*(getattr(checkpoint, name) for name in RUN_COLUMNS), statuses)
+            closed = [_reopen(runs, open_runs, last_day)]
+    else:
+        if state['parts']:
+            print("Snapshot days already compacted have changed: rebuilding transitions.")
+        new_days = sorted({_day_of(part) for part in parts})
+        statuses = []
+        closed, open_runs = [], TransitionRuns.empty(statuses)
+
+    snapshots = 0
+    checkpoint = open_runs
+    for i, day in enumerate(new_days):
+        if day == new_days[-1]:
+            checkpoint = open_runs
+        day_start = pd.Timestamp(day, tz='UTC')
+        df = read_snapshots(columns=['kerbsideid', 'status', 'status_timestamp'],
+                            start=day_start, end=day_start + pd.Timedelta(days=1), root=root)
+        df = df.dropna()
+        snapshots += len(df)
+        finished, open_runs, new_closed = _extend(open_runs, _day_runs(df, statuses))
+        closed += [finished, new_closed]
+        print(f"Compacted {i + 1}/{len(new_days)} days, {snapshots:,} snapshots...", end='\r')
+    print()
+
+    runs = _sorted(_concat(closed + [open_runs], statuses))
+    # Without a state file the next run rebuilds, so an interrupted save can't be extended twice
+    if os.path.exists(path + STATE_SUFFIX):
+        os.remove(path + STATE_SUFFIX)
+    runs.save(path)
+    TransitionRuns(*(getattr(checkpoint, name) for name in RUN_COLUMNS), statuses).save(path + CHECKPOINT_SUFFIX)
+    with open(path + STATE_SUFFIX + '.tmp', 'w') as f:
+        json.dump({'parts': parts, 'last_day': new_days[-1] if new_days else ''}, f)
+    os.replace(path + STATE_SUFFIX + '.tmp', path + STATE_SUFFIX)
+    print(f"[SUCCESS] {runs.snapshots:,} snapshots -> {len(runs):,} runs "
+          f"({runs.snapshots / max(len(runs), 1):.1f}x), {os.path.getsize(path) / 1024 ** 2:.1f}MB at {path}")
+    return runs
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 2 or sys.argv[1] != 'compact':
+        print("Usage: python -m parksense.transitions compact")
+        sys.exit(1)
+    compact()
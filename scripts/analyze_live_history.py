@@ -1,47 +1,60 @@
+import os
+import sys
+
 import pandas as pd
 
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from parksense.artifact_cache import cached, id_summary
+
 FILE_PATH = 'data/on-street-parking-bay-sensors.csv'
+TIME_RANGE_VERSION = 1
+
+def time_range(path, column):
+    # Start, end and span of a time column as text (cached until the file changes)
+    def compute():
+        times = pd.to_datetime(pd.read_csv(path, usecols=[column])[column], errors='coerce')
+        min_date, max_date = times.min(), times.max()
+        span = max_date - min_date if pd.notnull(min_date) and pd.notnull(max_date) else ''
+        return {'start': str(min_date), 'end': str(max_date), 'span': str(span)}
+    return cached('time_range', TIME_RANGE_VERSION, [path], compute, params={'column': column})
 
 def analyze_live_file():
     print(f"Loading {FILE_PATH}...")
-    df = pd.read_csv(FILE_PATH)
-    
-    print(f"Total Rows: {len(df)}")
-    
+    columns = pd.read_csv(FILE_PATH, nrows=0).columns
+
     # Check for time columns
-    time_cols = [c for c in df.columns if 'time' in c.lower() or 'date' in c.lower()]
+    time_cols = [c for c in columns if 'time' in c.lower() or 'date' in c.lower()]
+    # Using 'KerbsideID' or 'BayId'
+    id_col = 'KerbsideID' if 'KerbsideID' in columns else 'BayId'
+    summary = id_summary(FILE_PATH, id_col if id_col in columns else columns[0])
+
+    print(f"Total Rows: {summary['rows']}")
     print(f"Time Columns found: {time_cols}")
-    
+
     if not time_cols:
         print("No time columns found! It might be a static snapshot.")
         return
 
     # Analyze primary time column (usually Status_Timestamp or LastUpdated)
     # We prefer Status_Timestamp as it reflects the event time
-    target_col = 'Status_Timestamp' if 'Status_Timestamp' in df.columns else time_cols[0]
-    
+    target_col = 'Status_Timestamp' if 'Status_Timestamp' in columns else time_cols[0]
+
     print(f"Analyzing Time Range using: {target_col}")
-    df[target_col] = pd.to_datetime(df[target_col], errors='coerce')
-    
-    min_date = df[target_col].min()
-    max_date = df[target_col].max()
-    
-    print(f"Start Time: {min_date}")
-    print(f"End Time:   {max_date}")
-    
-    if pd.notnull(min_date) and pd.notnull(max_date):
-        duration = max_date - min_date
-        print(f"Time Span:  {duration}")
-    
+    times = time_range(FILE_PATH, target_col)
+
+    print(f"Start Time: {times['start']}")
+    print(f"End Time:   {times['end']}")
+
+    if times['span']:
+        print(f"Time Span:  {times['span']}")
+
     # Check if it's a snapshot (1 row per sensor) or a log (many rows per sensor)
-    # Using 'KerbsideID' or 'BayId'
-    id_col = 'KerbsideID' if 'KerbsideID' in df.columns else 'BayId'
-    if id_col in df.columns:
-        unique_ids = df[id_col].nunique()
+    if id_col in columns:
+        unique_ids = summary['unique']
         print(f"Unique Sensors: {unique_ids}")
-        ratio = len(df) / unique_ids
+        ratio = summary['rows'] / unique_ids
         print(f"Avg Records per Sensor: {ratio:.2f}")
-        
+
         if ratio < 1.1:
             print("\nCONCLUSION: This is likely a SNAPSHOT (Current State only).")
             print("It cannot be used for training history.")
@@ -0,0 +1,53 @@
+"""
+Rolling-origin backtest of the production model configuration before a
+promotion. Folds are trained and scored in parallel from a cached,
+memory-mapped feature matrix (see parksense/backtest.py).
+
+    python scripts/backtest.py --folds 4 --test-days 7
+"""
+import argparse
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from parksense.backtest import CACHE_DIR, REPORT_PATH, run_backtest
+from parksense.features import kerbside_group
+from parksense.spatial import NeighbourhoodIndex
+from train_final_model import GROUPINGS, MODEL_PARAMS
+
+def print_report(report):
+    print(f"\n--- BACKTEST {report['horizon']}m ({report['rows']:,} rows, {len(report['folds'])} folds, "
+          f"{report['workers']} workers, {report['wall_s']:.1f}s) ---")
+    print(f"{'fold':>4} {'train rows':>12} {'test rows':>10} {'MAE':>8} {'RMSE':>8} {'persist MAE':>12} {'secs':>7}")
+    for r in report['folds']:
+        print(f"{r['fold']:>4} {r['train_rows']:>12,} {r['test_rows']:>10,} {r['mae']:>8.4f} {r['rmse']:>8.4f} "
+              f"{r['persistence_mae']:>12.4f} {r['seconds']:>7.1f}")
+    print(f"{'all':>4} {'':>12} {'':>10} {report['mae']:>8.4f} {report['rmse']:>8.4f}")
+
+    print(f"\n{'hour':>4} {'MAE':>8} {'RMSE':>8} {'rows':>10}")
+    for h in report['by_hour']:
+        print(f"{h['hour']:>4} {h['mae']:>8.4f} {h['rmse']:>8.4f} {h['rows']:>10,}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rolling-origin backtest of the ParkSense model.")
+    parser.add_argument('--horizon', type=int, default=15, help="Minutes ahead (multiple of 15)")
+    parser.add_argument('--folds', type=int, default=4)
+    parser.add_argument('--test-days', type=int, default=7, help="Length of each test window")
+    parser.add_argument('--train-days', type=int, default=None,
+                        help="Sliding training window (default: all history before the fold)")
+    parser.add_argument('--workers', type=int, default=None, help="Parallel folds (default: all cores)")
+    parser.add_argument('--grouping', choices=GROUPINGS, default='kerbside')
+    parser.add_argument('--cache-dir', default=CACHE_DIR)
+    parser.add_argument('--report', default=REPORT_PATH)
+    args = parser.parse_args()
+
+    group_fn = NeighbourhoodIndex.load_or_build() if args.grouping == 'spatial' else kerbside_group
+    report = run_backtest(MODEL_PARAMS, args.horizon, args.folds, args.test_days, args.train_days, args.workers,
+                          cache_dir=args.cache_dir, group_fn=group_fn, grouping=args.grouping)
+    print_report(report)
+
+    os.makedirs(os.path.dirname(args.report) or '.', exist_ok=True)
+    with open(args.report, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"\n[SUCCESS] Report saved to {args.report}")
@@ -0,0 +1,104 @@
+import argparse
+import os
+import subprocess
+import sys
+import time
+
+import numpy as np
+from xgboost import XGBRegressor
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+from parksense.compiled_model import CompiledModel, compiled_path, export_model
+from parksense.features import FEATURES, build_training_frame
+from parksense.prediction import MODEL_PATH
+from parksense.synthetic import generate_snapshots
+
+# Import + load in a fresh interpreter, like a backend worker starting up
+# (VmHWM, because ru_maxrss carries over the benchmark process's own peak across fork/exec)
+COLD_START = """
+import resource, sys, time
+start = time.perf_counter()
+{load}
+seconds = time.perf_counter() - start
+try:
+    peak_kb = next(int(line.split()[1]) for line in open('/proc/self/status') if line.startswith('VmHWM:'))
+except OSError:
+    peak_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+print(seconds, peak_kb / 1024)
+"""
+LOADERS = {
+    'xgboost': "import xgboost as xgb\nmodel = xgb.Booster(model_file=sys.argv[1])",
+    'compiled': "from parksense.compiled_model import CompiledModel\nmodel = CompiledModel.load(sys.argv[1])",
+}
+
+def cold_start(loader, path, repeats):
+    runs = []
+    for _ in range(repeats):
+        out = subprocess.run([sys.executable, '-c', COLD_START.format(load=LOADERS[loader]), path],
+                             capture_output=True, text=True, check=True, cwd=REPO_DIR).stdout.split()
+        runs.append((float(out[0]), float(out[1])))
+    return min(runs)
+
+def latencies(fn, rows):
+    samples = []
+    for row in rows:
+        start = time.perf_counter()
+        fn(row)
+        samples.append(time.perf_counter() - start)
+    return np.percentile(np.asarray(samples) * 1e6, [50, 99])
+
+def throughput(fn, X, repeats=3):
+    best = min(_timed(fn, X) for _ in range(repeats))
+    return len(X) / best
+
+def _timed(fn, X):
+    start = time.perf_counter()
+    fn(X)
+    return time.perf_counter() - start
+
+def benchmark_compiled_model(model_path, singles, repeats):
+    model_path = os.path.abspath(model_path)
+    npz_path = compiled_path(model_path)
+    if not os.path.exists(npz_path) or os.path.getmtime(npz_path) < os.path.getmtime(model_path):
+        export_model(model_path, npz_path)
+    print(f"Model: {model_path} ({os.path.getsize(model_path) / 1024:.0f}KB) -> "
+          f"{npz_path} ({os.path.getsize(npz_path) / 1024:.0f}KB)")
+
+    model = XGBRegressor()
+    model.load_model(model_path)
+    booster = model.get_booster()
+    compiled = CompiledModel.load(npz_path)
+
+    # Feature rows shaped like production, with some missing lags
+    X = build_training_frame(generate_snapshots(scale=1.0))[FEATURES].to_numpy(dtype=np.float32)
+    rng = np.random.default_rng(0)
+    X[rng.random(len(X)) < 0.05, FEATURES.index('lag_30m')] = np.nan
+    X[rng.random(len(X)) < 0.02, FEATURES.index('lag_15m')] = np.nan
+    diff = np.abs(model.predict(X) - compiled.predict(X)).max()
+
+    print(f"\n--- RESULTS ({compiled.trees} trees, depth {compiled.depth}, {len(X):,} rows checked) ---")
+    print(f"Max |XGBRegressor.predict - compiled|: {diff:.2e}")
+    for name in LOADERS:
+        seconds, rss_mb = cold_start(name, model_path if name == 'xgboost' else npz_path, repeats)
+        print(f"Cold start ({name + '):':<10} {seconds * 1e3:8.1f}ms import+load, {rss_mb:6.1f}MB peak RSS")
+
+    load_xgb = min(_timed(lambda p: XGBRegressor().load_model(p), model_path) for _ in range(repeats))
+    load_compiled = min(_timed(CompiledModel.load, npz_path) for _ in range(repeats))
+    print(f"Load (warm):           xgboost {load_xgb * 1e3:.2f}ms, compiled {load_compiled * 1e3:.2f}ms")
+
+    rows = [X[i:i + 1] for i in rng.integers(0, len(X), size=singles)]
+    for name, fn in (('xgboost', booster.inplace_predict), ('compiled', compiled.predict)):
+        p50, p99 = latencies(fn, rows)
+        heartbeat = throughput(fn, X[:256], repeats)
+        batch = throughput(fn, X[:100000], repeats)
+        print(f"{name + ':':<10} single row p50 {p50:7.1f}us p99 {p99:7.1f}us | "
+              f"256-row batch {heartbeat:10,.0f} rows/s | 100k batch {batch:10,.0f} rows/s")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare the compiled NumPy evaluator with xgboost.")
+    parser.add_argument('--model', default=MODEL_PATH)
+    parser.add_argument('--singles', type=int, default=2000)
+    parser.add_argument('--repeats', type=int, default=3)
+    args = parser.parse_args()
+    benchmark_compiled_model(args.model, args.singles, args.repeats)
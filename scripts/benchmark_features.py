@@ -0,0 +1,59 @@
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from parksense.features import FEATURES, build_training_frame
+from parksense.synthetic import generate_snapshots
+
+def legacy_training_frame(df):
+    """The original pandas feature build from train_final_model.py, kept for comparison."""
+    df = df.copy()
+    df['status'] = df['status'].astype(object)  # as parsed from the CSV export
+    df['group_id'] = (df['kerbsideid'] // 20) * 20
+    df['is_occupied'] = df['status'].apply(lambda x: 1 if x == 'Present' else 0)
+    group_ts = df.groupby(['group_id', pd.Grouper(key='status_timestamp', freq='15min')])['is_occupied'].mean().reset_index()
+    group_ts.columns = ['group_id', 'timestamp', 'occupancy_ratio']
+    group_ts = group_ts.sort_values(['group_id', 'timestamp'])
+    group_ts['hour'] = group_ts['timestamp'].dt.hour
+    group_ts['day_of_week'] = group_ts['timestamp'].dt.dayofweek
+    group_ts['lag_15m'] = group_ts.groupby('group_id')['occupancy_ratio'].shift(1)
+    group_ts['lag_30m'] = group_ts.groupby('group_id')['occupancy_ratio'].shift(2)
+    group_ts['target_15m'] = group_ts.groupby('group_id')['occupancy_ratio'].shift(-1)
+    return group_ts.dropna().reset_index(drop=True)
+
+def best_of(fn, df, repeats):
+    best, result = float('inf'), None
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = fn(df)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+def benchmark_features(scale, repeats):
+    print(f"Generating {scale:g}x synthetic snapshots...")
+    df = generate_snapshots(scale=scale)
+    print(f"Rows: {len(df):,}")
+
+    legacy_s, legacy = best_of(legacy_training_frame, df, repeats)
+    vector_s, vector = best_of(build_training_frame, df, repeats)
+
+    columns = FEATURES + ['target_15m']
+    assert len(legacy) == len(vector), "row counts differ"
+    np.testing.assert_allclose(legacy[columns].to_numpy(float), vector[columns].to_numpy(float))
+
+    print(f"\n--- RESULTS ({len(vector):,} feature rows) ---")
+    print(f"Legacy pandas path: {legacy_s:.2f}s")
+    print(f"Vectorized module:  {vector_s:.2f}s")
+    print(f"Speedup:            {legacy_s / vector_s:.1f}x")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare the legacy pandas feature build with parksense.features.")
+    parser.add_argument('--scale', type=float, default=10.0)
+    parser.add_argument('--repeats', type=int, default=3)
+    args = parser.parse_args()
+    benchmark_features(args.scale, args.repeats)
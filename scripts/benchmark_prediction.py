@@ -0,0 +1,66 @@
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+from xgboost import XGBRegressor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from parksense.features import FEATURES, load_feature_order
+from parksense.prediction import MODEL_PATH, PredictionEngine
+from parksense.synthetic import generate_snapshots
+
+def latency_summary(label, samples_s):
+    samples_us = np.asarray(samples_s) * 1e6
+    p50, p99 = np.percentile(samples_us, [50, 99])
+    print(f"{label:<28} p50 {p50:9.1f}us   p99 {p99:9.1f}us   {len(samples_us) / np.sum(samples_s):12,.0f} lookups/s")
+
+def benchmark_prediction(clicks, seed):
+    print("Warming feature state from synthetic snapshots...")
+    engine = PredictionEngine()
+    df = generate_snapshots(scale=0.25, seed=seed)
+    engine.heartbeat(df['kerbsideid'].to_numpy(), df['status'], df['status_timestamp'])
+    groups = engine.state.active_groups()
+    rng = np.random.default_rng(seed)
+    click_groups = rng.choice(groups, size=clicks)
+
+    # --- Current path: one model call per click ---
+    # The backend loads an XGBRegressor and predicts a one-row DataFrame per click
+    model = XGBRegressor()
+    model.load_model(MODEL_PATH)
+    features = load_feature_order()
+    per_click = []
+    for group_id in click_groups:
+        start = time.perf_counter()
+        row = pd.DataFrame(engine.state.feature_rows([group_id]), columns=features)
+        model.predict(row)
+        per_click.append(time.perf_counter() - start)
+
+    # --- Engine path: one batched call per heartbeat, clicks hit the cache ---
+    heartbeats = []
+    for _ in range(20):
+        start = time.perf_counter()
+        scored = engine.refresh(engine.bucket)
+        heartbeats.append(time.perf_counter() - start)
+    cached = []
+    for group_id in click_groups:
+        start = time.perf_counter()
+        engine.predict_group(group_id)
+        cached.append(time.perf_counter() - start)
+
+    print(f"\n--- RESULTS ({len(groups)} groups, {clicks:,} clicks, features {FEATURES}) ---")
+    latency_summary("Per-click predict", per_click)
+    latency_summary("Cached click lookup", cached)
+    refresh_s = np.median(heartbeats)
+    print(f"Batched heartbeat refresh:   {refresh_s * 1e3:.2f}ms for {scored} groups "
+          f"({scored / refresh_s:,.0f} predictions/s)")
+    print(f"Per-click path:              {len(per_click) / np.sum(per_click):,.0f} predictions/s")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Per-click vs batched/cached prediction latency.")
+    parser.add_argument('--clicks', type=int, default=5000)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    benchmark_prediction(args.clicks, args.seed)
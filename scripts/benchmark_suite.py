@@ -0,0 +1,200 @@
+"""
+End-to-end benchmark of the training and inference pipeline on synthetic
+snapshots at 1x/10x/100x our current volume (see parksense/synthetic.py).
+
+Times each stage separately: CSV load, store load, 15-minute resample, lag
+features, XGBoost fit, model load, and single-row vs batch predict. Every run
+appends one JSON line per scale to data/benchmarks/results.jsonl and is
+compared with the previous run at the same scale, so regressions show up.
+
+    python scripts/benchmark_suite.py --scales 1 10
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+import xgboost as xgb
+from xgboost import XGBRegressor
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+from parksense.features import (
+    FEATURES, build_feature_frame, is_occupied, kerbside_group, resample_groups, target_column, to_buckets,
+)
+from parksense.snapshot_store import normalize_snapshots, read_snapshots, write_snapshots
+from parksense.synthetic import SCALES, iter_snapshots
+from train_final_model import MODEL_PARAMS
+
+RESULTS_PATH = 'data/benchmarks/results.jsonl'
+LOAD_COLUMNS = ['kerbsideid', 'status', 'status_timestamp']
+SINGLE_PREDICTS = 2000
+BATCH_ROWS = 100000
+
+def _git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                              text=True, check=True, cwd=REPO_DIR).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def timed(fn, *args, **kwargs):
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return time.perf_counter() - start, result
+
+def best_of(repeats, fn, *args, **kwargs):
+    """Fastest of `repeats` runs (less noisy than a single run for the sub-second stages)."""
+    best, result = float('inf'), None
+    for _ in range(repeats):
+        seconds, result = timed(fn, *args, **kwargs)
+        best = min(best, seconds)
+    return best, result
+
+def materialize(scale, seed, work_dir, csv):
+    """Streams the synthetic snapshots into a scratch store (and CSV). Returns the row count."""
+    store_dir = os.path.join(work_dir, 'snapshots')
+    csv_path = os.path.join(work_dir, 'snapshots.csv')
+    rows = 0
+    for day in iter_snapshots(scale=scale, seed=seed):
+        write_snapshots(day, store_dir)
+        if csv:
+            day.to_csv(csv_path, mode='a', header=rows == 0, index=False)
+        rows += len(day)
+    return store_dir, (csv_path if csv else None), rows
+
+def load_csv(path):
+    # What train_final_model.py did before the snapshot store
+    return normalize_snapshots(pd.read_csv(path, usecols=LOAD_COLUMNS))
+
+def resample(df):
+    return resample_groups(kerbside_group(df['kerbsideid'].to_numpy()),
+                           to_buckets(df['status_timestamp']), is_occupied(df['status']))
+
+def benchmark_scale(scale, seed, csv, trees, repeats, work_dir):
+    print(f"\n=== {scale:g}x ===")
+    stages = {}
+    stages['generate'], (store_dir, csv_path, rows) = timed(materialize, scale, seed, work_dir, csv)
+    print(f"Generated {rows:,} snapshots in {stages['generate']:.1f}s")
+
+    if csv_path:
+        stages['load_csv'], _ = best_of(repeats, load_csv, csv_path)
+    stages['load_store'], df = best_of(repeats, read_snapshots, columns=LOAD_COLUMNS, root=store_dir)
+    stages['resample'], (group, bucket, ratio) = best_of(repeats, resample, df)
+    del df
+    stages['lag_features'], frame = best_of(repeats, build_feature_frame, group, bucket, ratio)
+
+    target = target_column(15)
+    model_data = frame.dropna(subset=FEATURES + [target])
+    params = dict(MODEL_PARAMS, n_estimators=trees)
+    model = XGBRegressor(**params)
+    stages['fit'], _ = timed(model.fit, model_data[FEATURES], model_data[target])
+    model_path = os.path.join(work_dir, 'model.ubj')
+    model.save_model(model_path)
+
+    stages['model_load'], _ = best_of(max(repeats, 5), xgb.Booster, model_file=model_path)
+    booster = xgb.Booster(model_file=model_path)
+
+    X = model_data[FEATURES].to_numpy(dtype=np.float32)
+    rng = np.random.default_rng(seed)
+    picks = rng.integers(0, len(X), size=SINGLE_PREDICTS)
+    single = [timed(booster.inplace_predict, X[i:i + 1])[0] for i in picks]
+    batch = X[rng.integers(0, len(X), size=min(BATCH_ROWS, len(X)))]
+    batch_s, _ = best_of(repeats, booster.inplace_predict, batch)
+
+    return {
+        'recorded_at': pd.Timestamp.now(tz='UTC').isoformat(),
+        'commit': _git_commit(),
+        'scale': scale,
+        'seed': seed,
+        'rows': rows,
+        'feature_rows': len(model_data),
+        'trees': trees,
+        'repeats': repeats,
+        'stages_s': {name: round(seconds, 4) for name, seconds in stages.items()},
+        'predict_single_p50_us': round(float(np.percentile(single, 50)) * 1e6, 1),
+        'predict_single_p99_us': round(float(np.percentile(single, 99)) * 1e6, 1),
+        'predict_batch_rows_per_s': round(len(batch) / batch_s),
+        'machine': {'platform': platform.platform(), 'python': platform.python_version(),
+                    'cpus': os.cpu_count(), 'xgboost': xgb.__version__, 'pandas': pd.__version__},
+    }
+
+def previous_result(results_path, result):
+    """Most recent earlier run comparable with `result` (same scale, seed, trees and repeats)."""
+    if not os.path.exists(results_path):
+        return None
+    previous = None
+    with open(results_path) as f:
+        for line in f:
+            run = json.loads(line)
+            if all(run.get(k) == result[k] for k in ('scale', 'seed', 'trees', 'repeats')):
+                previous = run
+    return previous
+
+def _change(now, before, tolerance, name, previous, regressions, lower_is_better=True):
+    if not before:
+        return ""
+    change = now / before - 1.0 if lower_is_better else before / now - 1.0
+    note = f"   {change:+7.1%} vs {previous['commit'] or 'previous run'}"
+    if change > tolerance:
+        regressions.append(name)
+        note += "   <-- REGRESSION"
+    return note
+
+def report(result, previous, tolerance):
+    """Prints the stage timings; returns the stages more than `tolerance` slower than last time."""
+    regressions = []
+    previous = previous or {}
+    before = previous.get('stages_s', {})
+    print(f"\n--- RESULTS {result['scale']:g}x ({result['rows']:,} snapshots, "
+          f"{result['feature_rows']:,} feature rows) ---")
+    for name, seconds in result['stages_s'].items():
+        # Generation isn't part of the pipeline, it's only shown for context
+        check = before.get(name) if name != 'generate' else None
+        print(f"{name:<20} {seconds:10.4f}s" + _change(seconds, check, tolerance, name, previous, regressions))
+    print(f"{'predict_single':<20} {result['predict_single_p50_us']:9.1f}us p50, "
+          f"{result['predict_single_p99_us']:.1f}us p99"
+          + _change(result['predict_single_p50_us'], previous.get('predict_single_p50_us'),
+                    tolerance, 'predict_single', previous, regressions))
+    print(f"{'predict_batch':<20} {result['predict_batch_rows_per_s']:,} rows/s"
+          + _change(result['predict_batch_rows_per_s'], previous.get('predict_batch_rows_per_s'),
+                    tolerance, 'predict_batch', previous, regressions, lower_is_better=False))
+    return regressions
+
+def run_suite(scales, seed, csv, trees, repeats, results_path, tolerance):
+    os.makedirs(os.path.dirname(results_path), exist_ok=True)
+    regressions = []
+    for scale in scales:
+        work_dir = tempfile.mkdtemp(prefix=f'parksense-bench-{scale:g}x-')
+        try:
+            result = benchmark_scale(scale, seed, csv, trees, repeats, work_dir)
+        finally:
+            shutil.rmtree(work_dir, ignore_errors=True)
+        regressions += [f"{scale:g}x {name}" for name in report(result, previous_result(results_path, result), tolerance)]
+        with open(results_path, 'a') as f:
+            f.write(json.dumps(result) + '\n')
+    print(f"\n[SUCCESS] Results appended to {results_path}")
+    if regressions:
+        print(f"[WARNING] Slower than the previous run: {', '.join(regressions)}")
+    return regressions
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Stage-by-stage training/inference benchmark on synthetic snapshots.")
+    parser.add_argument('--scales', type=float, nargs='+', default=list(SCALES[:2]),
+                        help=f"Data scales relative to today's volume (suite: {' '.join(map(str, SCALES))})")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--no-csv', action='store_true', help="Skip writing/timing the CSV load (large scales)")
+    parser.add_argument('--trees', type=int, default=MODEL_PARAMS['n_estimators'])
+    parser.add_argument('--repeats', type=int, default=3, help="Best-of repeats for the load/feature/predict stages")
+    parser.add_argument('--results', default=RESULTS_PATH)
+    parser.add_argument('--tolerance', type=float, default=0.2,
+                        help="Flag stages this much slower than the previous comparable run")
+    args = parser.parse_args()
+    run_suite(args.scales, args.seed, not args.no_csv, args.trees, args.repeats, args.results, args.tolerance)
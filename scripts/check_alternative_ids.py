@@ -1,7 +1,14 @@
 import pandas as pd
 import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from parksense.csv_profile import load_profile, normalize_values
+from parksense.sensor_events import EVENTS_DIR
 
 SENSORS_PATH = 'data/On-street_Car_Parking_Sensor_Data_-_2019.csv'
+if not os.path.exists(SENSORS_PATH):
+    SENSORS_PATH = EVENTS_DIR  # download_data.py ingests the 2019 ZIP straight into the store
 BAYS_PATH = 'data/on-street-parking-bays.csv'
 
 def check_alternatives():
@@ -16,29 +23,23 @@ def check_alternatives():
     has_device_id_static = 'DeviceId' in bays.columns
     
     # RoadSegmentID is definitely in Static
-    static_segments = set(bays['RoadSegmentID'].dropna().astype(str))
+    static_segments = normalize_values(bays['RoadSegmentID'])
     print(f"Unique Static RoadSegmentIDs: {len(static_segments)}")
 
     # 2. Check 2019 Data
-    print(f"\nLoading {SENSORS_PATH} (Sample)...")
-    # We load a sample to check column presence first
-    sample = pd.read_csv(SENSORS_PATH, nrows=5)
-    print(f"2019 Columns: {list(sample.columns)}")
+    print(f"\nLoading {SENSORS_PATH} (Profile)...")
+    # The one-pass profile records the column list as well
+    profile = load_profile(SENSORS_PATH)
+    print(f"2019 Columns: {profile['columns']}")
     
     # 2019 has 'DeviceId' -> Let's check overlap with Static 'RoadSegmentID' (unlikely match, but requested)
     # 2019 has 'StreetId' -> Maybe matches RoadSegmentID?
     
-    print("\nChecking Overlaps (Full Scan)...")
-    
-    sensor_devices = set()
-    sensor_segments = set() # We'll try to match StreetId or similar
+    print("\nChecking Overlaps (File Profile)...")
     
-    # Iterate
-    chunksize = 500000
-    for chunk in pd.read_csv(SENSORS_PATH, usecols=['DeviceId', 'StreetId'], chunksize=chunksize):
-        sensor_devices.update(chunk['DeviceId'].dropna().astype(str))
-        sensor_segments.update(chunk['StreetId'].dropna().astype(str))
-        print(f"Collected {len(sensor_devices)} devices, {len(sensor_segments)} streets...", end='\r')
+    sensor_devices = profile['distinct']['DeviceId']
+    sensor_segments = profile['distinct']['StreetId'] # We'll try to match StreetId or similar
+    print(f"Collected {len(sensor_devices)} devices, {len(sensor_segments)} streets...")
 
     print("\n\n--- RESULTS ---")
     
@@ -1,5 +1,12 @@
+import os
+import sys
+
 import pandas as pd
 
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from parksense.artifact_cache import id_summary
+from parksense.bay_registry import BayRegistry
+
 BAYS_PATH = 'data/on-street-parking-bays.csv'
 SENSORS_PATH = 'data/on-street-parking-bay-sensors.csv' # Note: This is the LIVE sensor file, not 2019
 
@@ -8,25 +15,25 @@ def check_live():
     
     # 1. Load Static Bays
     print(f"Loading {BAYS_PATH}...")
-    bays = pd.read_csv(BAYS_PATH)
-    bays_ids = set(bays['KerbsideID'].dropna().astype(str).str.replace(r'\.0$', '', regex=True))
-    print(f"Static Map IDs: {len(bays_ids)}")
+    registry = BayRegistry.load_or_build(BAYS_PATH)
+    print(f"Static Map IDs: {len(registry)}")
 
-    # 2. Load Live Sensors
+    # 2. Load Live Sensors (distinct IDs cached until the file changes)
     print(f"Loading {SENSORS_PATH}...")
-    sensors = pd.read_csv(SENSORS_PATH)
+    header = pd.read_csv(SENSORS_PATH, nrows=0).columns
     # Note: Column might be 'KerbsideID' or 'BayId' in this file too
-    col_name = 'KerbsideID' if 'KerbsideID' in sensors.columns else 'BayId'
+    col_name = 'KerbsideID' if 'KerbsideID' in header else 'BayId'
     print(f"Using Sensor Column: {col_name}")
-    
-    sensor_ids = set(sensors[col_name].dropna().astype(str).str.replace(r'\.0$', '', regex=True))
-    print(f"Live Sensor IDs: {len(sensor_ids)}")
+    sensors = id_summary(SENSORS_PATH, col_name)
     
     # 3. Overlap
-    common = bays_ids.intersection(sensor_ids)
+    common, missing = registry.overlap(sensors['ids'])
+    sensor_ids = len(common) + len(missing)
+    print(f"Live Sensor IDs: {sensor_ids}")
+    
     print(f"\n--- RESULTS ---")
     print(f"Overlap Count: {len(common)}")
-    print(f"Match Rate (Sensor -> Map): {len(common) / len(sensor_ids) * 100:.2f}%")
+    print(f"Match Rate (Sensor -> Map): {len(common) / sensor_ids * 100:.2f}%")
 
 if __name__ == "__main__":
     check_live()
@@ -1,7 +1,14 @@
 import pandas as pd
 import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from parksense.csv_profile import load_profile
+from parksense.sensor_events import EVENTS_DIR
 
 SENSORS_PATH = 'data/On-street_Car_Parking_Sensor_Data_-_2019.csv'
+if not os.path.exists(SENSORS_PATH):
+    SENSORS_PATH = EVENTS_DIR  # download_data.py ingests the 2019 ZIP straight into the store
 BAYS_PATH = 'data/on-street-parking-bays.csv'
 
 def check_streetmarker():
@@ -13,23 +20,13 @@ def check_streetmarker():
     bays_ids = set(bays['KerbsideID'].dropna().astype(str).str.replace(r'\.0$', '', regex=True))
     print(f"Target (2024 KerbsideIDs): {len(bays_ids)}")
 
-    # 2. Load 2019 'StreetMarker' (Candidate IDs)
-    print(f"\nLoading {SENSORS_PATH} (StreetMarker column)...")
-    street_markers = set()
-    bay_ids = set() # Also load BayId again for comparison
-    
-    # Iterating to save RAM
-    chunksize = 500000
-    for chunk in pd.read_csv(SENSORS_PATH, usecols=['StreetMarker', 'BayId'], chunksize=chunksize):
-        # normalize
-        sm = chunk['StreetMarker'].dropna().astype(str).str.replace(r'\.0$', '', regex=True)
-        bi = chunk['BayId'].dropna().astype(str).str.replace(r'\.0$', '', regex=True)
-        
-        street_markers.update(sm)
-        bay_ids.update(bi)
-        print(f"Collected {len(street_markers)} markers, {len(bay_ids)} IDs...", end='\r')
+    # 2. Load 2019 'StreetMarker' (Candidate IDs) from the one-pass file profile
+    print(f"\nLoading {SENSORS_PATH} profile (StreetMarker, BayId)...")
+    profile = load_profile(SENSORS_PATH)
+    street_markers = profile['distinct']['StreetMarker']
+    bay_ids = profile['distinct']['BayId'] # Also load BayId again for comparison
     
-    print(f"\n\n--- RESULTS ---")
+    print(f"\n--- RESULTS ---")
     
     # 3. Compare Matches
     match_sm = bays_ids.intersection(street_markers)
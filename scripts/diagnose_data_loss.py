@@ -1,7 +1,14 @@
 import pandas as pd
 import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from parksense.csv_profile import load_profile
+from parksense.sensor_events import EVENTS_DIR
 
 SENSORS_PATH = 'data/On-street_Car_Parking_Sensor_Data_-_2019.csv'
+if not os.path.exists(SENSORS_PATH):
+    SENSORS_PATH = EVENTS_DIR  # download_data.py ingests the 2019 ZIP straight into the store
 BAYS_PATH = 'data/on-street-parking-bays.csv'
 
 def diagnose_loss():
@@ -16,19 +23,11 @@ def diagnose_loss():
     unique_bays_ids = set(bays['KerbsideID'].unique())
     print(f"Static Bays: {len(bays)} rows, {len(unique_bays_ids)} unique IDs")
 
-    # 2. Check 2019 Sensor IDs (Read in chunks to avoid memory crash)
-    print(f"\nLoading {SENSORS_PATH} (Iterating to count)...")
-    sensor_ids = set()
-    total_rows = 0
-    
-    # We only need the ID column
-    chunksize = 500000
-    for chunk in pd.read_csv(SENSORS_PATH, usecols=['BayId'], chunksize=chunksize):
-        # Rename for consistency
-        chunk_ids = chunk['BayId'].dropna().astype(str).str.replace(r'\.0$', '', regex=True)
-        sensor_ids.update(chunk_ids)
-        total_rows += len(chunk)
-        print(f"Processed {total_rows} rows...", end='\r')
+    # 2. Check 2019 Sensor IDs (from the one-pass file profile, built on first use)
+    print(f"\nLoading {SENSORS_PATH} profile...")
+    profile = load_profile(SENSORS_PATH)
+    sensor_ids = profile['distinct']['BayId']
+    total_rows = profile['rows']
     
     print(f"\nTotal 2019 Rows: {total_rows}")
     print(f"Unique 2019 IDs: {len(sensor_ids)}")
@@ -1,9 +1,13 @@
+import json
 import os
 import requests
+import shutil
 import sys
 import zipfile
-import io
-import shutil
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from parksense.sensor_events import EVENTS_DIR, has_events, ingest_csv_stream
 
 # Constants
 DATA_DIR = "data"
@@ -14,91 +18,264 @@ DATASETS = {
 
 # 2019 Data URL (ZIP file)
 DATASET_2019_URL = "https://opendatasoft-s3.s3.amazonaws.com/downloads/archive/7pgd-bdf2.zip"
-DATASET_2019_FILENAME = "On-street_Car_Parking_Sensor_Data_-_2019.csv"
+DATASET_2019_ZIP = "2019_data.zip"
+
+CHUNK_SIZE = 1024 * 1024
+SEGMENTS = 4
+PARALLEL_MIN_SIZE = 64 * 1024 * 1024  # Only split files bigger than this
+TIMEOUT = 60
+
+def _meta_path(filepath):
+    return filepath + ".meta.json"
+
+def _read_meta(filepath):
+    if os.path.exists(filepath) and os.path.exists(_meta_path(filepath)):
+        with open(_meta_path(filepath)) as f:
+            return json.load(f)
+    return {}
+
+def _write_meta(filepath, headers):
+    meta = {"etag": headers.get("ETag"), "last_modified": headers.get("Last-Modified")}
+    with open(_meta_path(filepath), "w") as f:
+        json.dump(meta, f)
+
+def _conditional_headers(meta):
+    headers = {}
+    if meta.get("etag"):
+        headers["If-None-Match"] = meta["etag"]
+    if meta.get("last_modified"):
+        headers["If-Modified-Since"] = meta["last_modified"]
+    return headers
+
+def _progress(done, total):
+    if total:
+        bar = int(50 * done / total)
+        sys.stdout.write(f"\r[{'=' * bar}{' ' * (50 - bar)}] {done // (1024 * 1024)}MB")
+    else:
+        sys.stdout.write(f"\r{done // (1024 * 1024)}MB")
+    sys.stdout.flush()
+
+class SourceChanged(Exception):
+    """The server's file no longer matches the validator the partial download was started with."""
+
+def _part_state_path(part_path):
+    return part_path + ".json"
+
+def _part_paths(part_path):
+    """`part_path` and its numbered segment files."""
+    folder, name = os.path.split(part_path)
+    return [os.path.join(folder, f) for f in os.listdir(folder or ".")
+            if f == name or (f.startswith(name) and f[len(name):].isdigit())]
+
+def _discard_parts(part_path):
+    for p in _part_paths(part_path) + [_part_state_path(part_path)]:
+        if os.path.exists(p):
+            os.remove(p)
+
+def _resume_state(part_path, validator, total, segments):
+    """
+    The (validator, total, segments) the partial download was started with.
+    Parts from another version of the file, from an older layout or without a
+    recorded validator are thrown away, so old and new bytes are never mixed.
+    """
+    state = {"validator": validator, "total": total, "segments": segments}
+    saved = None
+    if os.path.exists(_part_state_path(part_path)):
+        with open(_part_state_path(part_path)) as f:
+            saved = json.load(f)
+    if saved != state or not validator:
+        _discard_parts(part_path)
+        with open(_part_state_path(part_path), "w") as f:
+            json.dump(state, f)
+    return state
+
+def _fetch_range(url, part_path, start, end, validator, on_bytes):
+    """
+    Downloads bytes [start, end] (inclusive, end=None for open-ended) into
+    `part_path`, resuming from whatever is already there. `validator` is the
+    one the part was started with, sent as `If-Range`: a server whose file
+    changed answers 200 instead of 206 and SourceChanged is raised, so the
+    caller can throw every part away and start over.
+    """
+    have = os.path.getsize(part_path) if os.path.exists(part_path) else 0
+    if end is not None and start + have > end:
+        return
+    headers = {"Range": f"bytes={start + have}-{'' if end is None else end}"}
+    if have and validator:
+        headers["If-Range"] = validator
+    with requests.get(url, headers=headers, stream=True, timeout=TIMEOUT) as r:
+        r.raise_for_status()
+        if r.status_code != 206:
+            if have:
+                raise SourceChanged(url)
+            if start != 0 or end is not None:
+                raise IOError(f"Server ignored Range request for {url}")
+            # Full body of the current version is exactly what we need
+            with open(part_path, "wb") as f:
+                for chunk in r.iter_content(chunk_size=CHUNK_SIZE):
+                    f.write(chunk)
+                    on_bytes(len(chunk))
+            return
+        with open(part_path, "ab") as f:
+            for chunk in r.iter_content(chunk_size=CHUNK_SIZE):
+                f.write(chunk)
+                on_bytes(len(chunk))
+
+def _fetch(url, part_path, total, ranges_ok, validator, segments):
+    """Fills `part_path` with the whole file, resuming parts left by an interrupted run."""
+    segmented = ranges_ok and total >= PARALLEL_MIN_SIZE and segments > 1
+    state = _resume_state(part_path, validator, total, segments if segmented else 1)
 
-def download_file(url, filepath):
-    """Downloads a file from a URL to a local path with a progress bar."""
+    if segmented:
+        step = -(-total // segments)
+        bounds = [(i, start, min(start + step, total) - 1) for i, start in enumerate(range(0, total, step))]
+        part_paths = [f"{part_path}{i}" for i, _, _ in bounds]
+        done = [sum(os.path.getsize(p) for p in part_paths if os.path.exists(p))]
+
+        def on_bytes(n):
+            done[0] += n
+            _progress(done[0], total)
+
+        with ThreadPoolExecutor(max_workers=segments) as pool:
+            jobs = [pool.submit(_fetch_range, url, part_paths[i], start, end, state["validator"], on_bytes)
+                    for i, start, end in bounds]
+            for job in jobs:
+                job.result()
+        with open(part_path, "wb") as out:
+            for p in part_paths:
+                with open(p, "rb") as src:
+                    shutil.copyfileobj(src, out, CHUNK_SIZE)
+        for p in part_paths:
+            os.remove(p)
+    else:
+        have = os.path.getsize(part_path) if os.path.exists(part_path) else 0
+        done = [have]
+
+        def on_bytes(n):
+            done[0] += n
+            _progress(done[0], total)
+
+        if ranges_ok:
+            _fetch_range(url, part_path, 0, None, state["validator"], on_bytes)
+        else:
+            # No Range support: stream the whole body again
+            done[0] = 0
+            with requests.get(url, stream=True, timeout=TIMEOUT) as r:
+                r.raise_for_status()
+                with open(part_path, "wb") as f:
+                    for chunk in r.iter_content(chunk_size=CHUNK_SIZE):
+                        f.write(chunk)
+                        on_bytes(len(chunk))
+
+    if total and os.path.getsize(part_path) != total:
+        raise IOError(f"Expected {total:,} bytes from {url}, got {os.path.getsize(part_path):,}")
+
+def download_file(url, filepath, segments=SEGMENTS):
+    """
+    Downloads `url` to `filepath`.
+      - Refreshes are conditional (ETag / Last-Modified): an unchanged file is skipped.
+      - Interrupted downloads resume from `.part` files over HTTP Range, as long
+        as the server still has the version they were started from.
+      - Large files are fetched as `segments` parallel byte ranges.
+    Returns "downloaded", "unchanged" or "failed".
+    """
     print(f"Downloading {filepath}...")
+    part_path = filepath + ".part"
     try:
-        with requests.get(url, stream=True) as r:
-            r.raise_for_status()
-            total_length = r.headers.get('content-length')
-            
-            with open(filepath, 'wb') as f:
-                if total_length is None: 
-                    f.write(r.content)
-                else:
-                    dl = 0
-                    total_length = int(total_length)
-                    for chunk in r.iter_content(chunk_size=8192): 
-                        if chunk: 
-                            dl += len(chunk)
-                            f.write(chunk)
-                            # Progress bar
-                            done = int(50 * dl / total_length)
-                            sys.stdout.write(f"\r[{'=' * done}{' ' * (50-done)}] {dl//(1024*1024)}MB")
-                            sys.stdout.flush()
+        for attempt in range(2):
+            meta = _read_meta(filepath)
+            head = requests.head(url, allow_redirects=True, timeout=TIMEOUT, headers=_conditional_headers(meta))
+            # Some servers ignore conditionals on HEAD, so compare the validators too
+            unchanged = meta and (
+                (meta.get("etag") and meta["etag"] == head.headers.get("ETag"))
+                or (not meta.get("etag") and meta.get("last_modified")
+                    and meta["last_modified"] == head.headers.get("Last-Modified"))
+            )
+            if head.status_code == 304 or (head.ok and unchanged):
+                print(f"Skipping {filepath}: unchanged on server.")
+                return "unchanged"
+            head.raise_for_status()
+
+            total = int(head.headers.get("Content-Length") or 0)
+            ranges_ok = head.headers.get("Accept-Ranges", "").lower() == "bytes"
+            # If-Range needs a strong ETag; fall back to Last-Modified
+            etag = head.headers.get("ETag")
+            validator = etag if etag and not etag.startswith("W/") else head.headers.get("Last-Modified")
+            try:
+                _fetch(url, part_path, total, ranges_ok, validator, segments)
+                break
+            except SourceChanged:
+                # Changed between the HEAD and the range requests: start over from the new version
+                print(f"\n{url} changed during the download, starting over...")
+                _discard_parts(part_path)
+                if attempt:
+                    raise
+
+        os.replace(part_path, filepath)
+        os.remove(_part_state_path(part_path))
+        _write_meta(filepath, head.headers)
         print(f"\nSaved to {filepath}")
-        return True
+        return "downloaded"
     except Exception as e:
         print(f"\nError downloading {filepath}: {e}")
-        return False
+        return "failed"
 
-def download_and_unzip_2019(url, target_dir):
-    """Downloads the 2019 ZIP, extracts it, and renames the CSV."""
-    zip_path = os.path.join(target_dir, "2019_data.zip")
+def download_and_ingest_2019(url, target_dir, events_dir=EVENTS_DIR):
+    """
+    Downloads the 2019 ZIP (resumable, conditional) and streams its CSV member
+    straight into the columnar sensor-event store. No extracted CSV is written.
+    """
+    zip_path = os.path.join(target_dir, DATASET_2019_ZIP)
     print(f"\nProcessing 2019 Data (ZIP Download)...")
-    
-    if download_file(url, zip_path):
-        print("Extracting ZIP file...")
-        try:
-            with zipfile.ZipFile(zip_path, 'r') as zip_ref:
-                # Find the CSV in the zip
-                csv_files = [f for f in zip_ref.namelist() if f.endswith('.csv')]
-                if not csv_files:
-                    print("Error: No CSV found in ZIP.")
-                    return
-
-                extracted_file = csv_files[0]
-                zip_ref.extract(extracted_file, target_dir)
-                
-                # Move/Rename to expected filename
-                src = os.path.join(target_dir, extracted_file)
-                dst = os.path.join(target_dir, DATASET_2019_FILENAME)
-                if src != dst:
-                    if os.path.exists(dst):
-                        os.remove(dst)
-                    os.rename(src, dst)
-                
-                print(f"Extracted and saved as {dst}")
-                
-            # Cleanup ZIP
-            os.remove(zip_path)
-            print("Removed temporary ZIP file.")
-            
-        except zipfile.BadZipFile:
-            print("Error: Downloaded file is not a valid ZIP.")
+
+    result = download_file(url, zip_path)
+    if result == "failed":
+        return
+    if result == "unchanged" and has_events(events_dir):
+        print(f"Skipping 2019 ingestion: {events_dir} is up to date.")
+        return
+
+    print(f"Streaming ZIP into {events_dir}...")
+    try:
+        with zipfile.ZipFile(zip_path, 'r') as zip_ref:
+            # Find the CSV in the zip
+            csv_files = [f for f in zip_ref.namelist() if f.endswith('.csv')]
+            if not csv_files:
+                print("Error: No CSV found in ZIP.")
+                return
+
+            # Ingest into a fresh sibling directory and swap it in only once it is complete,
+            # so an interrupted run never leaves a partial store that looks up to date
+            tmp_dir = events_dir + ".tmp"
+            if os.path.exists(tmp_dir):
+                shutil.rmtree(tmp_dir)
+            with zip_ref.open(csv_files[0]) as stream:
+                total = ingest_csv_stream(stream, tmp_dir)
+            old_dir = events_dir + ".old"
+            if os.path.exists(old_dir):
+                shutil.rmtree(old_dir)
+            if os.path.exists(events_dir):
+                os.replace(events_dir, old_dir)
+            os.replace(tmp_dir, events_dir)
+            if os.path.exists(old_dir):
+                shutil.rmtree(old_dir)
+            print(f"Ingested {total:,} rows into {events_dir}")
+
+    except zipfile.BadZipFile:
+        print("Error: Downloaded file is not a valid ZIP.")
 
 def main():
     if not os.path.exists(DATA_DIR):
         os.makedirs(DATA_DIR)
         print(f"Created directory: {DATA_DIR}")
 
-    # 1. Download Standard CSVs
+    # 1. Download Standard CSVs (skipped when the server says they're unchanged)
     print("--- Downloading Standard Datasets ---")
     for filename, url in DATASETS.items():
-        filepath = os.path.join(DATA_DIR, filename)
-        if os.path.exists(filepath):
-            print(f"Skipping {filename}: Already exists.")
-        else:
-            download_file(url, filepath)
+        download_file(url, os.path.join(DATA_DIR, filename))
 
-    # 2. Download and Handle 2019 ZIP
-    target_2019 = os.path.join(DATA_DIR, DATASET_2019_FILENAME)
-    if os.path.exists(target_2019):
-        print(f"\nSkipping 2019 Data: {DATASET_2019_FILENAME} already exists.")
-    else:
-        download_and_unzip_2019(DATASET_2019_URL, DATA_DIR)
+    # 2. Download the 2019 ZIP and stream it into the columnar store
+    download_and_ingest_2019(DATASET_2019_URL, DATA_DIR)
 
     print("\nAll downloads complete!")
 
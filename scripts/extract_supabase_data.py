@@ -1,5 +1,15 @@
+import argparse
+import json
+import os
+import sys
+
 import pandas as pd
-from sqlalchemy import create_engine
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+from sqlalchemy import DateTime, bindparam, create_engine, text
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from parksense.snapshot_store import STORE_DIR, TIME_COLUMN, list_parts, read_snapshots, write_snapshots
 
 # Config - Using Transaction Pooler (IPv4)
 DB_USER = "postgres.prwbzhkabpclahzaaffi"  # Format: postgres.{project-ref}
@@ -8,37 +18,128 @@ DB_HOST = "aws-1-ap-south-1.pooler.supabase.com"  # Transaction Pooler
 DB_PORT = "6543"  # Pooler port
 DB_NAME = "postgres"
 
-OUTPUT_PATH = "data/supabase_snapshots.csv"
+SNAPSHOTS_TABLE = "public.snapshots"
+CHUNK_SIZE = 50000
+WATERMARK_FILE = "_watermark.json"
+
+def _read_state(store_dir=STORE_DIR, conn=None, table=SNAPSHOTS_TABLE):
+    """
+    Where to resume: `last_id` (0 if empty), the `parts` the watermark
+    covers and, for a store imported without ids, `since`, the timestamp up
+    to which the import already holds every row.
+    """
+    path = os.path.join(store_dir, WATERMARK_FILE)
+    parts = list_parts(store_dir)
+    if os.path.exists(path):
+        with open(path) as f:
+            state = json.load(f)
+        # Watermarks written before parts were recorded covered everything on disk
+        state.setdefault('parts', parts)
+        return state
+    # No watermark yet (e.g. store built by a CSV import): fall back to the data itself
+    state = {'last_id': 0, 'parts': parts}
+    if not parts:
+        return state
+    with_id = [part for part in parts if 'id' in pq.read_schema(os.path.join(store_dir, part)).names]
+    if with_id:
+        state['last_id'] = max(int(pc.max(pq.read_table(os.path.join(store_dir, part), columns=['id'])['id']).as_py() or 0)
+                               for part in with_id)
+        return state
+    if conn is None:
+        raise ValueError(f"{store_dir} has no snapshot ids: a connection is needed to resume by timestamp")
+    last_seen = read_snapshots(columns=[TIME_COLUMN], root=store_dir)[TIME_COLUMN].max()
+    # Resume just before the first row newer than the store. Ids need not follow time, so
+    # rows pulled from there are also filtered on `since` and nothing is stored twice
+    query = text(f"SELECT COALESCE((SELECT MIN(id) - 1 FROM {table} WHERE {TIME_COLUMN} > :last_seen), "
+                 f"(SELECT MAX(id) FROM {table}), 0)").bindparams(bindparam('last_seen', type_=DateTime(timezone=True)))
+    state['last_id'] = int(conn.execute(query, {'last_seen': last_seen.to_pydatetime()}).scalar())
+    state['since'] = last_seen.isoformat()
+    return state
+
+def read_watermark(store_dir=STORE_DIR, conn=None, table=SNAPSHOTS_TABLE):
+    """
+    Returns the last snapshot `id` already in the local store (0 if empty).
+    A store without ids (e.g. a CSV export without the `id` column) is
+    resumed from its last status_timestamp, looked up in `table` via `conn`.
+    """
+    return int(_read_state(store_dir, conn, table)['last_id'])
+
+def write_watermark(last_id, store_dir=STORE_DIR, since=None):
+    """Records `last_id` together with the part files written up to it."""
+    os.makedirs(store_dir, exist_ok=True)
+    state = {'last_id': int(last_id), 'parts': list_parts(store_dir)}
+    if since is not None:
+        state['since'] = since
+    path = os.path.join(store_dir, WATERMARK_FILE)
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(state, f)
+    os.replace(tmp_path, path)
 
-def extract_data():
-    connection_url = f"postgresql://{DB_USER}:{DB_PASS}@{DB_HOST}:{DB_PORT}/{DB_NAME}?sslmode=require"
-    
-    print(f"Connecting to Supabase Pooler: {DB_HOST}:{DB_PORT}...")
+def _stored_ids(store_dir, parts):
+    """Snapshot ids held by `parts` (parts without an id column hold none)."""
+    ids = set()
+    for part in parts:
+        path = os.path.join(store_dir, part)
+        if 'id' in pq.read_schema(path).names:
+            ids.update(pq.read_table(path, columns=['id'])['id'].to_pylist())
+    return ids
+
+def extract_incremental(engine, store_dir=STORE_DIR, table=SNAPSHOTS_TABLE, chunk_size=CHUNK_SIZE):
+    """
+    Pulls only snapshots newer than the stored watermark using keyset pagination
+    (`WHERE id > :last_id ORDER BY id LIMIT n`) and appends each page to the
+    snapshot store as it arrives, so memory stays at one page.
+    A page written by a run that stopped before saving its watermark is
+    pulled again, but the rows already stored are skipped by id.
+    Works against Postgres or any SQLAlchemy engine (e.g. SQLite in tests).
+    Returns the number of new rows.
+    """
+    query = text(f"SELECT * FROM {table} WHERE id > :last_id ORDER BY id ASC LIMIT :limit")
+
+    total = 0
+    with engine.connect() as conn:
+        state = _read_state(store_dir, conn, table)
+        last_id, since = int(state['last_id']), state.get('since')
+        covered = set(state['parts'])
+        stored = _stored_ids(store_dir, [part for part in list_parts(store_dir) if part not in covered])
+        print(f"Resuming after id {last_id:,}...")
+        while True:
+            chunk = pd.read_sql(query, conn, params={'last_id': last_id, 'limit': chunk_size})
+            if chunk.empty:
+                break
+            last_id = int(chunk['id'].iloc[-1])
+            new = chunk[~chunk['id'].isin(stored)]
+            if since is not None:
+                new = new[pd.to_datetime(new[TIME_COLUMN], utc=True) > pd.Timestamp(since)]
+            write_snapshots(new, store_dir)
+            # Only advance the watermark once the page is safely on disk
+            write_watermark(last_id, store_dir, since)
+            total += len(new)
+            print(f"Downloaded {total:,} new rows (last id {last_id:,})...", end='\r')
+            if len(chunk) < chunk_size:
+                break
+    return total
+
+def extract_data(db_url=None, table=SNAPSHOTS_TABLE, store_dir=STORE_DIR):
+    connection_url = db_url or f"postgresql://{DB_USER}:{DB_PASS}@{DB_HOST}:{DB_PORT}/{DB_NAME}?sslmode=require"
+
+    print(f"Connecting to {connection_url.split('@')[-1]}...")
     try:
         engine = create_engine(connection_url)
-        query = "SELECT * FROM public.snapshots ORDER BY id ASC"
-        
-        print("Executing Query...")
-        chunk_size = 50000
-        chunks = []
-        
-        # Using chunks for progress tracking
-        for chunk in pd.read_sql(query, engine, chunksize=chunk_size):
-            chunks.append(chunk)
-            total = len(pd.concat(chunks))
-            print(f"Downloaded {total:,} rows...", end='\r')
-            
-        df = pd.concat(chunks)
-        print(f"\n[SUCCESS] Total Rows: {len(df):,}")
-        
-        # Save
-        df.to_csv(OUTPUT_PATH, index=False)
-        print(f"[SUCCESS] Saved to {OUTPUT_PATH}")
-        
+        total = extract_incremental(engine, store_dir=store_dir, table=table)
+        print(f"\n[SUCCESS] New Rows: {total:,}")
+        print(f"[SUCCESS] Snapshot store up to date: {store_dir}")
+
     except Exception as e:
         print(f"\n[ERROR] Connection Failed: {e}")
 
         print("Please check your network connection or VPN.")
 
 if __name__ == "__main__":
-    extract_data()
+    parser = argparse.ArgumentParser(description="Incrementally pull Supabase snapshots into the local store.")
+    parser.add_argument('--db-url', help="SQLAlchemy URL to pull from instead of the Supabase pooler (e.g. sqlite:///local.db)")
+    parser.add_argument('--table', default=SNAPSHOTS_TABLE)
+    parser.add_argument('--store', default=STORE_DIR)
+    args = parser.parse_args()
+    extract_data(args.db_url, args.table, args.store)
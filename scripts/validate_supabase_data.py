@@ -1,55 +1,81 @@
+import os
+import sys
+
+import numpy as np
 import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from parksense.artifact_cache import cached
+from parksense.bay_registry import BayRegistry, to_int_ids
+from parksense.snapshot_store import STORE_DIR, list_parts, read_snapshots
 
-SUPABASE_DATA = 'data/supabase_snapshots.csv'
 STATIC_BAYS = 'data/on-street-parking-bays.csv'
+SUMMARY_VERSION = 2
+
+def snapshot_summary():
+    # Everything the checks need from the store, in a few small arrays
+    def compute():
+        df = read_snapshots(columns=['kerbsideid', 'status', 'status_timestamp'])
+        status_counts = df['status'].value_counts()
+        min_date = df['status_timestamp'].min()
+        max_date = df['status_timestamp'].max()
+        # Every column stored, not just the ones read (only the part footers are opened)
+        schema = pa.unify_schemas([pq.read_schema(os.path.join(STORE_DIR, part)) for part in list_parts()])
+        return {
+            'rows': len(df),
+            'columns': np.asarray(schema.names, dtype=str),
+            'start': str(min_date),
+            'end': str(max_date),
+            'duration_days': (max_date - min_date).days,
+            'ids': np.unique(to_int_ids(df['kerbsideid'])),
+            'statuses': status_counts.index.to_numpy(dtype=str),
+            'status_counts': status_counts.to_numpy(),
+        }
+    return cached('snapshot_summary', SUMMARY_VERSION, [STORE_DIR], compute)
 
 def validate_supabase_data():
     print("=== SUPABASE DATA VALIDATION ===\n")
     
-    # Load data
+    # Load data (summary cached until the snapshot store changes)
     print("Loading Supabase snapshots...")
-    df = pd.read_csv(SUPABASE_DATA, parse_dates=['status_timestamp'])
-    print(f"Total Rows: {len(df):,}")
-    print(f"Columns: {list(df.columns)}\n")
+    summary = snapshot_summary()
+    print(f"Total Rows: {summary['rows']:,}")
+    print(f"Columns: {summary['columns'].tolist()}\n")
     
     # 1. Time Range
     print("--- TIME RANGE ---")
-    min_date = df['status_timestamp'].min()
-    max_date = df['status_timestamp'].max()
-    duration = max_date - min_date
-    
-    print(f"Start: {min_date}")
-    print(f"End:   {max_date}")
-    print(f"Duration: {duration.days} days ({duration.days / 7:.1f} weeks)\n")
+    print(f"Start: {summary['start']}")
+    print(f"End:   {summary['end']}")
+    print(f"Duration: {summary['duration_days']} days ({summary['duration_days'] / 7:.1f} weeks)\n")
     
     # 2. Ghost Bay Check
     print("--- GHOST BAY CHECK ---")
-    bays = pd.read_csv(STATIC_BAYS)
-    bays_ids = set(bays['KerbsideID'].dropna().astype(str).str.replace(r'\.0$', '', regex=True))
-    
-    # Clean Supabase IDs
-    supabase_ids = set(df['kerbsideid'].dropna().astype(str).str.replace(r'\.0$', '', regex=True))
+    registry = BayRegistry.load_or_build(STATIC_BAYS)
     
-    overlap = bays_ids.intersection(supabase_ids)
-    ghost_ids = supabase_ids - bays_ids
+    # Integer IDs: vectorized membership against the registry, no string sets
+    overlap, ghost_ids = registry.overlap(summary['ids'])
+    supabase_ids = len(overlap) + len(ghost_ids)
     
-    print(f"Unique IDs in Supabase: {len(supabase_ids)}")
-    print(f"Unique IDs in Static Map: {len(bays_ids)}")
+    print(f"Unique IDs in Supabase: {supabase_ids}")
+    print(f"Unique IDs in Static Map: {len(registry)}")
     print(f"Matching IDs: {len(overlap)}")
-    print(f"Ghost IDs: {len(ghost_ids)} ({len(ghost_ids) / len(supabase_ids) * 100:.2f}%)\n")
+    print(f"Ghost IDs: {len(ghost_ids)} ({len(ghost_ids) / supabase_ids * 100:.2f}%)\n")
     
     if len(ghost_ids) > 0:
-        print(f"Example Ghost IDs: {list(ghost_ids)[:5]}\n")
+        print(f"Example Ghost IDs: {[str(i) for i in ghost_ids[:5]]}\n")
     
     # 3. Status Distribution
     print("--- STATUS DISTRIBUTION ---")
-    status_counts = df['status'].value_counts()
+    status_counts = pd.Series(summary['status_counts'], name='count',
+                              index=pd.Index(summary['statuses'], name='status'))
     print(status_counts)
     print()
     
     # 4. Recommendation
     print("--- RECOMMENDATION ---")
-    if len(ghost_ids) / len(supabase_ids) < 0.05:  # Less than 5% ghosts
+    if len(ghost_ids) / supabase_ids < 0.05:  # Less than 5% ghosts
         print("✓ EXCELLENT: Less than 5% ghost bays!")
         print("✓ This dataset is MUCH better than the 2019 data.")
         print("✓ Recommended: Use this for training.")
@@ -0,0 +1,28 @@
+"""Backtest training rows never see a target inside the test window."""
+import numpy as np
+
+from parksense.backtest import rolling_folds, train_mask
+from parksense.features import BUCKETS_PER_DAY, target_buckets
+
+
+def test_rows_are_purged_on_their_own_target_bucket():
+    # One group observed every bucket for three days, except a quiet hour before day 2
+    days = 3
+    bucket = np.arange(days * BUCKETS_PER_DAY + 1, dtype=np.int64)
+    origin = 2 * BUCKETS_PER_DAY
+    bucket = bucket[(bucket < origin - 4) | (bucket >= origin)]
+    target = target_buckets(np.zeros(len(bucket), dtype=np.int64), bucket, 15)
+    has_target = ~np.isnan(target)
+    bucket, target = bucket[has_target], target[has_target].astype(np.int64)
+
+    folds = rolling_folds(bucket, folds=1, test_days=1)
+    assert [fold['origin_bucket'] for fold in folds] == [origin]
+    fold = folds[0]
+    train_lo, train_hi = fold['train']
+    assert bucket[train_hi - 1] == origin - 5
+
+    # Its target is the next observed bucket, the first of the test window
+    keep = train_mask(fold, target)
+    assert not keep[-1]
+    assert keep[:-1].all()
+    assert (target[train_lo:train_hi][keep] < origin).all()
@@ -0,0 +1,22 @@
+"""The compiled evaluator scores like xgboost for every supported objective."""
+import numpy as np
+import pytest
+import xgboost as xgb
+
+from parksense.compiled_model import SUPPORTED_OBJECTIVES, CompiledModel, export_model
+
+
+@pytest.mark.parametrize('objective', sorted(SUPPORTED_OBJECTIVES))
+def test_parity_with_xgboost(objective, tmp_path):
+    rng = np.random.default_rng(0)
+    X = rng.random((2000, 6)).astype(np.float32)
+    X[rng.random(X.shape) < 0.05] = np.nan
+    y = np.clip(0.3 * np.nan_to_num(X[:, 1]) + 0.4 * np.nan_to_num(X[:, 4]) + rng.normal(0, 0.05, len(X)), 0, 1)
+    model = xgb.XGBRegressor(objective=objective, n_estimators=40, max_depth=5, learning_rate=0.2,
+                             n_jobs=1, random_state=0)
+    model.fit(X, y)
+    model_path = str(tmp_path / 'model.ubj')
+    model.save_model(model_path)
+
+    compiled = CompiledModel.load(export_model(model_path))
+    np.testing.assert_allclose(compiled.predict(X), model.predict(X), atol=1e-5)
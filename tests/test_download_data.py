@@ -0,0 +1,166 @@
+"""Resumable downloads never mix file versions; 2019 ingestion swaps in a complete store only."""
+import http.server
+import io
+import json
+import os
+import sys
+import threading
+import zipfile
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'scripts'))
+import download_data
+from parksense.sensor_events import has_events, read_events
+
+CSV = (b"DeviceId,ArrivalTime,DepartureTime,DurationMinutes,BayId\n"
+       b"1,01/02/2019 09:00:00 AM,01/02/2019 10:00:00 AM,60,100\n"
+       b"2,01/03/2019 09:00:00 AM,01/03/2019 09:30:00 AM,30,101\n")
+
+
+@pytest.fixture
+def archive(tmp_path, monkeypatch):
+    with zipfile.ZipFile(tmp_path / download_data.DATASET_2019_ZIP, 'w') as z:
+        z.writestr('sensors_2019.csv', CSV)
+    monkeypatch.setattr(download_data, 'download_file', lambda url, path: 'downloaded')
+    return tmp_path
+
+
+def test_interrupted_ingest_keeps_previous_store(archive, monkeypatch):
+    events_dir = str(archive / 'sensors_2019')
+    download_data.download_and_ingest_2019('unused', str(archive), events_dir)
+    assert len(read_events(root=events_dir)) == 2
+
+    original = download_data.ingest_csv_stream
+
+    def interrupted(stream, root):
+        original(io.BytesIO(b"".join(stream.readlines()[:2])), root)  # header and first row only
+        raise KeyboardInterrupt
+
+    monkeypatch.setattr(download_data, 'ingest_csv_stream', interrupted)
+    with pytest.raises(KeyboardInterrupt):
+        download_data.download_and_ingest_2019('unused', str(archive), events_dir)
+    assert len(read_events(root=events_dir)) == 2
+
+
+def test_interrupted_first_ingest_leaves_no_store(archive, monkeypatch):
+    events_dir = str(archive / 'sensors_2019')
+    original = download_data.ingest_csv_stream
+
+    def interrupted(stream, root):
+        original(stream, root)
+        raise KeyboardInterrupt
+
+    monkeypatch.setattr(download_data, 'ingest_csv_stream', interrupted)
+    with pytest.raises(KeyboardInterrupt):
+        download_data.download_and_ingest_2019('unused', str(archive), events_dir)
+    # Nothing that looks like a finished store, so the next run ingests again
+    assert not has_events(events_dir)
+
+
+class _Server:
+    """Local HTTP server for one file, with ETag, Range and If-Range support."""
+
+    def __init__(self, body, etag):
+        self.body, self.etag, self.ranges, self.after_head = body, etag, [], None
+        server = self
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def _headers(self, status, length, content_range=None):
+                self.send_response(status)
+                self.send_header('ETag', server.etag)
+                self.send_header('Accept-Ranges', 'bytes')
+                self.send_header('Content-Length', str(length))
+                if content_range:
+                    self.send_header('Content-Range', content_range)
+                self.end_headers()
+
+            def do_HEAD(self):
+                self._headers(200, len(server.body))
+                if server.after_head:
+                    server.after_head()
+
+            def do_GET(self):
+                body, requested = server.body, self.headers.get('Range')
+                if_range = self.headers.get('If-Range')
+                if requested and (if_range is None or if_range == server.etag):
+                    server.ranges.append(requested)
+                    first, last = requested[len('bytes='):].split('-')
+                    last = int(last) if last else len(body) - 1
+                    self._headers(206, last - int(first) + 1, f'bytes {first}-{last}/{len(body)}')
+                    self.wfile.write(body[int(first):last + 1])
+                else:
+                    self._headers(200, len(body))
+                    self.wfile.write(body)
+
+        self.httpd = http.server.ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.url = f'http://127.0.0.1:{self.httpd.server_port}/file.bin'
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+
+    def change(self, body, etag):
+        self.body, self.etag = body, etag
+
+
+@pytest.fixture
+def server():
+    server = _Server(bytes(range(256)) * 4, '"v1"')  # 1024 bytes
+    yield server
+    server.httpd.shutdown()
+
+
+def _start_part(path, data, validator, total, segments=1, suffix=''):
+    with open(f'{path}.part{suffix}', 'wb') as f:
+        f.write(data)
+    with open(f'{path}.part.json', 'w') as f:
+        json.dump({'validator': validator, 'total': total, 'segments': segments}, f)
+
+
+def test_resume_appends_the_missing_range(server, tmp_path):
+    path = str(tmp_path / 'file.bin')
+    _start_part(path, server.body[:400], '"v1"', 1024)
+    assert download_data.download_file(server.url, path) == 'downloaded'
+    assert open(path, 'rb').read() == server.body
+    assert server.ranges == ['bytes=400-']
+
+
+def test_changed_file_discards_the_stale_part(server, tmp_path):
+    path = str(tmp_path / 'file.bin')
+    old = server.body
+    _start_part(path, old[:400], '"v1"', len(old))
+    server.change(bytes(reversed(range(250))) * 4, '"v2"')
+    assert download_data.download_file(server.url, path) == 'downloaded'
+    assert open(path, 'rb').read() == server.body
+
+
+def test_change_between_head_and_get_starts_over(server, tmp_path):
+    path = str(tmp_path / 'file.bin')
+    _start_part(path, server.body[:400], '"v1"', 1024)
+    new = bytes(reversed(range(200))) * 5
+    server.after_head = lambda: (server.change(new, '"v2"'), setattr(server, 'after_head', None))
+    assert download_data.download_file(server.url, path) == 'downloaded'
+    assert open(path, 'rb').read() == new
+
+
+def test_segmented_resume(server, tmp_path, monkeypatch):
+    monkeypatch.setattr(download_data, 'PARALLEL_MIN_SIZE', 100)
+    path = str(tmp_path / 'file.bin')
+    # Segment 0 finished, segment 1 half done, segments 2-3 not started
+    _start_part(path, server.body[:256], '"v1"', 1024, segments=4, suffix='0')
+    with open(f'{path}.part1', 'wb') as f:
+        f.write(server.body[256:356])
+    assert download_data.download_file(server.url, path, segments=4) == 'downloaded'
+    assert open(path, 'rb').read() == server.body
+    assert sorted(server.ranges) == ['bytes=356-511', 'bytes=512-767', 'bytes=768-1023']
+
+
+def test_segmented_resume_after_change(server, tmp_path, monkeypatch):
+    monkeypatch.setattr(download_data, 'PARALLEL_MIN_SIZE', 100)
+    path = str(tmp_path / 'file.bin')
+    _start_part(path, server.body[:256], '"v1"', 1024, segments=4, suffix='0')
+    server.change(bytes(reversed(range(256))) * 5, '"v2"')
+    assert download_data.download_file(server.url, path, segments=4) == 'downloaded'
+    assert open(path, 'rb').read() == server.body
+    assert not [name for name in os.listdir(tmp_path) if '.part' in name]
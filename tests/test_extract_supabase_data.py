@@ -0,0 +1,77 @@
+"""Incremental extraction resumes a store that was imported without ids."""
+import os
+import sys
+
+import pandas as pd
+import pytest
+from sqlalchemy import create_engine
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'scripts'))
+import extract_supabase_data
+from parksense.snapshot_store import read_snapshots, write_snapshots
+
+
+def _snapshots(rows):
+    times = pd.Timestamp('2024-05-01', tz='UTC') + pd.to_timedelta(range(rows), unit='min')
+    return pd.DataFrame({'id': range(1, rows + 1), 'kerbsideid': [5100 + i % 7 for i in range(rows)],
+                         'status': ['Present', 'Unoccupied'] * (rows // 2), 'status_timestamp': times})
+
+
+def test_store_without_ids_resumes_from_last_timestamp(tmp_path):
+    snapshots = _snapshots(40)
+    engine = create_engine(f"sqlite:///{tmp_path / 'snapshots.db'}")
+    snapshots.to_sql('snapshots', engine, index=False)
+    store = str(tmp_path / 'snapshots')
+    # A CSV export of the first 30 rows, without the id column
+    write_snapshots(snapshots.iloc[:30].drop(columns='id'), store)
+
+    total = extract_supabase_data.extract_incremental(engine, store, 'snapshots', chunk_size=4)
+
+    assert total == 10
+    assert extract_supabase_data.read_watermark(store) == 40
+    stored = read_snapshots(columns=['status_timestamp'], root=store)['status_timestamp']
+    assert stored.is_unique and len(stored) == 40
+
+
+def test_page_written_before_its_watermark_is_not_stored_twice(tmp_path, monkeypatch):
+    engine = create_engine(f"sqlite:///{tmp_path / 'snapshots.db'}")
+    _snapshots(40).to_sql('snapshots', engine, index=False)
+    store = str(tmp_path / 'snapshots')
+
+    write_watermark = extract_supabase_data.write_watermark
+    calls = []
+
+    def crash_on_second_page(*args, **kwargs):
+        calls.append(args)
+        if len(calls) == 2:
+            raise KeyboardInterrupt
+        write_watermark(*args, **kwargs)
+
+    monkeypatch.setattr(extract_supabase_data, 'write_watermark', crash_on_second_page)
+    with pytest.raises(KeyboardInterrupt):
+        extract_supabase_data.extract_incremental(engine, store, 'snapshots', chunk_size=16)
+    monkeypatch.setattr(extract_supabase_data, 'write_watermark', write_watermark)
+    assert extract_supabase_data.read_watermark(store) == 16
+
+    total = extract_supabase_data.extract_incremental(engine, store, 'snapshots', chunk_size=16)
+
+    assert total == 8
+    ids = read_snapshots(columns=['id'], root=store)['id']
+    assert ids.is_unique and sorted(ids) == list(range(1, 41))
+
+
+def test_resume_by_timestamp_when_ids_do_not_follow_time(tmp_path):
+    snapshots = _snapshots(40)
+    # Ids assigned out of time order: some rows older than the export got later ids
+    snapshots['id'] = [(i * 17) % 41 for i in range(1, 41)]
+    engine = create_engine(f"sqlite:///{tmp_path / 'snapshots.db'}")
+    snapshots.to_sql('snapshots', engine, index=False)
+    store = str(tmp_path / 'snapshots')
+    write_snapshots(snapshots.iloc[:30].drop(columns='id'), store)
+
+    total = extract_supabase_data.extract_incremental(engine, store, 'snapshots', chunk_size=4)
+    assert extract_supabase_data.extract_incremental(engine, store, 'snapshots', chunk_size=4) == 0
+
+    assert total == 10
+    stored = read_snapshots(columns=['status_timestamp'], root=store)['status_timestamp']
+    assert stored.is_unique and len(stored) == 40
@@ -0,0 +1,23 @@
+"""Incremental runs only train on rows whose features match a full build."""
+import numpy as np
+
+from parksense.features import FEATURES, build_feature_frame
+from parksense.incremental import new_rows
+
+
+def test_new_rows_have_the_full_history_lags():
+    # Group 0 is seen every bucket; group 20 goes quiet for a while around the cut
+    bucket = np.r_[np.arange(100), np.arange(0, 50), np.arange(56, 100)]
+    group = np.r_[np.zeros(100, dtype=np.int64), np.full(94, 20)]
+    ratio = np.random.default_rng(0).random(len(bucket))
+    full = build_feature_frame(group, bucket, ratio)
+
+    loaded_from, watermark = 52, 50
+    window = bucket >= loaded_from
+    partial = build_feature_frame(group[window], bucket[window], ratio[window])
+    fresh = new_rows(group[window], bucket[window], 15, watermark)
+
+    expected = full.loc[window].reset_index(drop=True)
+    np.testing.assert_array_equal(partial.loc[fresh, FEATURES].to_numpy(), expected.loc[fresh, FEATURES].to_numpy())
+    # Each group's first two rows in the window are skipped, and the last rows have no target yet
+    np.testing.assert_array_equal(fresh, np.r_[[False] * 2, [True] * 45, False, [False] * 2, [True] * 41, False])
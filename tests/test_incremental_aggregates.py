@@ -0,0 +1,75 @@
+"""Rollup and tile updates interrupted mid-swap finish on the next run without counting parts twice."""
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from parksense import occupancy_tiles, rollup
+from parksense.snapshot_store import write_snapshots
+from parksense.synthetic import generate_snapshots
+
+
+@pytest.fixture
+def snapshots(tmp_path):
+    frame = generate_snapshots(scale=2 / 8, bays=30)
+    ids = np.unique(frame['kerbsideid'])
+    rng = np.random.default_rng(0)
+    bays = str(tmp_path / 'bays.csv')
+    pd.DataFrame({'RoadSegmentID': ids // 50, 'KerbsideID': ids,
+                  'Latitude': -37.81 + rng.normal(0, 0.003, len(ids)),
+                  'Longitude': 144.96 + rng.normal(0, 0.003, len(ids))}).to_csv(bays, index=False)
+    times = pd.to_datetime(frame['status_timestamp'], utc=True)
+    later = times >= times.min() + (times.max() - times.min()) / 2
+    return frame[~later], frame[later], bays
+
+
+def _files(directory):
+    found = {}
+    for folder, _, names in os.walk(directory):
+        for name in names:
+            if name.endswith('.npz'):
+                with np.load(os.path.join(folder, name)) as data:
+                    found[os.path.relpath(os.path.join(folder, name), directory)] = {k: data[k] for k in data.files}
+    return found
+
+
+UPDATES = {
+    'rollup': lambda root, out, bays, tmp: rollup.update_rollup(root, out, bays, str(tmp / 'reg.npz')),
+    'tiles': lambda root, out, bays, tmp: occupancy_tiles.update_tiles(root, out, bays_path=bays,
+                                                                       registry_path=str(tmp / 'reg.npz')),
+}
+
+
+@pytest.mark.parametrize('name', sorted(UPDATES))
+def test_interrupted_swap_is_finished_not_repeated(name, snapshots, tmp_path, monkeypatch):
+    update = UPDATES[name]
+    earlier, later, bays = snapshots
+    root = str(tmp_path / 'snapshots')
+    write_snapshots(earlier, root)
+    out = str(tmp_path / 'interrupted')
+    update(root, out, bays, tmp_path)
+    write_snapshots(later, root)
+    update(root, str(tmp_path / 'clean'), bays, tmp_path)
+
+    # The next update crashes after a few of its staged files were swapped in
+    real_replace, swapped = os.replace, []
+
+    def crashing_replace(src, dst):
+        if dst.startswith(out) and dst.endswith('.npz'):
+            if len(swapped) == 3:
+                raise KeyboardInterrupt
+            swapped.append(dst)
+        real_replace(src, dst)
+
+    monkeypatch.setattr(os, 'replace', crashing_replace)
+    with pytest.raises(KeyboardInterrupt):
+        update(root, out, bays, tmp_path)
+    monkeypatch.setattr(os, 'replace', real_replace)
+    update(root, out, bays, tmp_path)
+
+    clean, resumed = _files(str(tmp_path / 'clean')), _files(out)
+    assert clean.keys() == resumed.keys()
+    for path in clean:
+        for column in clean[path]:
+            np.testing.assert_array_equal(clean[path][column], resumed[path][column])
@@ -0,0 +1,28 @@
+"""Instrumented code behaves the same with profiling on and off."""
+import json
+
+import pytest
+
+from parksense.instrumentation import RunProfiler
+
+
+def _run(profiler):
+    with profiler.stage('load', rows=3) as stage:
+        values = [1, 2, 3, 4]
+        stage.rows = len(values)
+        stage.dropped = 1
+    # Callers read what they set back after the stage ends
+    return stage.rows - stage.dropped
+
+
+@pytest.mark.parametrize('enabled', [True, False])
+def test_stage_keeps_attributes(enabled, tmp_path):
+    profiler = RunProfiler(enabled=enabled)
+    assert _run(profiler) == 3
+
+    path = profiler.write_report(str(tmp_path / 'run.json'))
+    if enabled:
+        with open(path) as f:
+            assert [(s['stage'], s['rows']) for s in json.load(f)['stages']] == [('load', 4)]
+    else:
+        assert path is None and profiler.stages == []
@@ -0,0 +1,57 @@
+"""The live ingester writes a keyframe per bucket and only changes in between (mock feed, local SQLite)."""
+import asyncio
+
+import httpx
+import pandas as pd
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from parksense.live_ingest import KEYFRAME_SECONDS, LiveIngester
+
+URL = 'http://feed.test/records'
+BAYS = 250  # more than one page of the feed
+
+
+class _Feed:
+    """Mock of the records endpoint, paginated like the real one."""
+
+    def __init__(self):
+        self.states = {5000 + i: ('Unoccupied', '2024-05-06T00:00:00+00:00') for i in range(BAYS)}
+
+    def handle(self, request):
+        offset, limit = int(request.url.params['offset']), int(request.url.params['limit'])
+        records = [{'kerbsideid': kerbsideid, 'status_description': status, 'status_timestamp': timestamp}
+                   for kerbsideid, (status, timestamp) in sorted(self.states.items())]
+        return httpx.Response(200, json={'total_count': len(records), 'results': records[offset:offset + limit]})
+
+
+def test_keyframe_per_bucket_and_changes_between(tmp_path):
+    db = tmp_path / 'local.db'
+    with create_engine(f'sqlite:///{db}').begin() as conn:
+        conn.exec_driver_sql('CREATE TABLE snapshots '
+                             '(id INTEGER PRIMARY KEY, kerbsideid BIGINT, status TEXT, status_timestamp TEXT)')
+    feed = _Feed()
+    now = [pd.Timestamp('2024-05-06T00:00:00Z').timestamp()]
+
+    async def polls():
+        engine = create_async_engine(f'sqlite+aiosqlite:///{db}')
+        async with httpx.AsyncClient(transport=httpx.MockTransport(feed.handle)) as client:
+            ingester = LiveIngester(engine, client, URL, 'snapshots', clock=lambda: now[0])
+            results = [await ingester.poll_once()]
+            feed.states[5003] = ('Present', '2024-05-06T00:04:00+00:00')
+            now[0] += 300
+            results.append(await ingester.poll_once())
+            now[0] += 300
+            results.append(await ingester.poll_once())  # nothing changed
+            now[0] += KEYFRAME_SECONDS
+            results.append(await ingester.poll_once())  # next bucket
+        await engine.dispose()
+        return results
+
+    assert asyncio.run(polls()) == [(BAYS, BAYS, True), (BAYS, 1, False), (BAYS, 0, False), (BAYS, BAYS, True)]
+    rows = pd.read_sql('SELECT kerbsideid, status FROM snapshots ORDER BY id', f'sqlite:///{db}')
+    assert len(rows) == 2 * BAYS + 1
+    # The second keyframe carries every bay's current state, quiet bays included
+    keyframe = rows.iloc[-BAYS:]
+    assert keyframe['kerbsideid'].nunique() == BAYS
+    assert keyframe.set_index('kerbsideid').loc[5003, 'status'] == 'Present'
@@ -0,0 +1,46 @@
+"""2019 history joins the snapshot groups only through known bays, without chaining across the gap."""
+import numpy as np
+import pandas as pd
+
+from parksense.features import build_feature_frame, combine_group_series, to_buckets
+from parksense.occupancy_sweep import read_group_occupancy, sweep
+from parksense.online_state import GroupFeatureState
+
+
+def _ns(*times):
+    return pd.DatetimeIndex(times, tz='UTC').as_unit('ns').asi8
+
+
+def test_unknown_2019_bays_are_dropped(tmp_path):
+    out = str(tmp_path / 'occupancy')
+    # 5101 is a registry KerbsideID; 5105 (same kerbside block) and 9000 are not
+    bay = np.array([5101, 5105, 9000])
+    arrival = _ns('2019-03-01 09:00', '2019-03-01 09:00', '2019-03-01 09:00')
+    departure = _ns('2019-03-01 10:00', '2019-03-01 09:15', '2019-03-01 10:00')
+    sweep([(bay, arrival, departure)], known_bays=[5100, 5101, 5200], output_dir=out)
+
+    group, bucket, ratio = read_group_occupancy(output_dir=out)
+    assert set(group) == {5100}
+    # Only 5101 counts: occupied 09:00-10:00 (free in its departure bucket), not diluted by 5105
+    np.testing.assert_allclose(ratio, [1.0, 1.0, 1.0, 1.0, 0.0])
+
+
+def test_lags_and_targets_stop_at_the_history_gap():
+    history = (np.array([5100] * 3), to_buckets(pd.date_range('2019-12-31 23:15', periods=3, freq='15min')),
+               np.array([0.1, 0.2, 0.3]))
+    snapshots = (np.array([5100] * 3), to_buckets(pd.date_range('2024-05-06 00:00', periods=3, freq='15min')),
+                 np.array([0.7, 0.8, 0.9]))
+    frame = build_feature_frame(*combine_group_series(history, snapshots))
+
+    np.testing.assert_array_equal(frame['lag_15m'], [np.nan, 0.1, 0.2, np.nan, 0.7, 0.8])
+    np.testing.assert_array_equal(frame['lag_30m'], [np.nan, np.nan, 0.1, np.nan, np.nan, 0.7])
+    np.testing.assert_array_equal(frame['target_15m'], [0.2, 0.3, np.nan, 0.8, 0.9, np.nan])
+
+
+def test_serving_lags_stop_at_the_same_gap():
+    state = GroupFeatureState()
+    buckets = to_buckets(pd.DatetimeIndex(['2024-05-01 08:00', '2024-05-06 08:00', '2024-05-06 08:15'], tz='UTC'))
+    for bucket, occupied in zip(buckets, [1.0, 0.0, 1.0]):
+        state.update([5100], [bucket], [occupied])
+    row = state.feature_rows([5100])[0]
+    assert row[4] == 0.0 and np.isnan(row[5])  # lag_15m from 08:00, no lag_30m from five days earlier
@@ -0,0 +1,26 @@
+"""Smoke test: out-of-core training on a small synthetic snapshot store."""
+import json
+import os
+import subprocess
+import sys
+
+from parksense.snapshot_store import write_snapshots
+from parksense.synthetic import generate_snapshots
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_out_of_core_without_profiling(tmp_path):
+    write_snapshots(generate_snapshots(scale=0.5, bays=60), root=str(tmp_path / 'data' / 'snapshots'))
+
+    result = subprocess.run(
+        [sys.executable, os.path.join(REPO_DIR, 'train_final_model.py'), '--out-of-core', '--no-profile', '--nthread', '1'],
+        cwd=tmp_path, capture_output=True, text=True, env={**os.environ, 'PYTHONPATH': REPO_DIR},
+    )
+    assert result.returncode == 0, result.stderr
+
+    assert (tmp_path / 'models' / 'parking_model_15m.ubj').exists()
+    with open(tmp_path / 'models' / 'model_versions.json') as f:
+        entry = json.load(f)['15'][-1]
+    assert entry['kind'] == 'full'
+    assert entry['rows'] > 0
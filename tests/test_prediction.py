@@ -0,0 +1,56 @@
+"""The engine only serves predictions made from a group's latest observation."""
+import numpy as np
+import xgboost as xgb
+
+from parksense.features import FEATURES, kerbside_group
+from parksense.online_state import GroupFeatureState
+from parksense.prediction import PredictionEngine
+
+
+def _engine(tmp_path):
+    rng = np.random.default_rng(0)
+    X = rng.random((500, len(FEATURES)))
+    model = xgb.XGBRegressor(n_estimators=10, max_depth=3, n_jobs=1, random_state=0)
+    model.fit(X, X[:, 0])
+    model_path = str(tmp_path / 'model.ubj')
+    model.save_model(model_path)
+    features_path = tmp_path / 'features.txt'
+    features_path.write_text(','.join(FEATURES))
+
+    # Bays from 9000 up are not placed in any group
+    state = GroupFeatureState(group_fn=lambda ids: np.where(np.asarray(ids) < 9000, kerbside_group(ids), -1))
+    return PredictionEngine(model_path, str(features_path), state, str(tmp_path / 'neighbourhoods.txt'))
+
+
+def _score(engine, group_id):
+    return float(np.clip(engine.booster.inplace_predict(engine.state.feature_rows([group_id])), 0, 1)[0])
+
+
+def test_quiet_groups_keep_their_own_bucket(tmp_path):
+    engine = _engine(tmp_path)
+    busy, quiet = 5100, 5200
+    engine.state.update([busy, busy, busy, quiet, quiet], [100, 101, 102, 100, 101], [1, 0, 1, 1, 1])
+
+    # Only the group observed in the newest bucket is scored
+    assert engine.refresh() == 1
+    assert engine.bucket == 102
+    assert engine.predict_group(quiet, bucket=102) is None
+    expected = _score(engine, quiet)
+    assert engine.predict_group(quiet) == expected
+    assert engine.predict_group(quiet, bucket=101) == expected
+    assert engine.predict_bay(quiet + 3) == expected
+
+    # A newer observation replaces the group's cached prediction
+    engine.state.update(busy, 103, 0)
+    assert engine.refresh() == 1
+    assert engine.predict_group(busy, bucket=102) is None
+    assert engine.predict_group(busy, bucket=103) == _score(engine, busy)
+
+
+def test_unplaced_bays_and_unseen_groups(tmp_path):
+    engine = _engine(tmp_path)
+    engine.state.update(5100, 100, 1)
+    engine.refresh()
+    assert engine.predict_bay(9001) is None
+    assert engine.predict_group(5300) is None
+    assert engine.predict_group(10**9) is None
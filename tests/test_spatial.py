@@ -0,0 +1,42 @@
+"""The neighbourhood index is tied to the models trained with it."""
+import numpy as np
+import pandas as pd
+import pytest
+
+from parksense.bay_registry import BayRegistry
+from parksense.spatial import NeighbourhoodIndex, check_fingerprint, index_fingerprint
+
+
+def _write_bays(path, latitude):
+    pd.DataFrame({
+        'RoadSegmentID': [1, 1, 2],
+        'KerbsideID': [5101, 5102, 5103],
+        'Latitude': latitude,
+        'Longitude': [144.9616, 144.9617, 144.9700],
+    }).to_csv(path, index=False)
+
+
+def test_moved_bays_rebuild_the_index_and_are_refused(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    bays = str(tmp_path / 'bays.csv')
+    index_path = str(tmp_path / 'neighbourhoods.npz')
+    _write_bays(bays, [-37.8030, -37.8031, -37.8100])
+    trained = NeighbourhoodIndex.load_or_build(bays, index_path)
+    assert NeighbourhoodIndex.load_or_build(bays, index_path).fingerprint == trained.fingerprint
+
+    # Same KerbsideIDs, but a bay moved into another cell: its group id changes
+    _write_bays(bays, [-37.8030, -37.8100, -37.8100])
+    current = NeighbourhoodIndex.load_or_build(bays, index_path)
+    assert current.group_of([5102])[0] != trained.group_of([5102])[0]
+    with pytest.raises(ValueError, match="retrain"):
+        check_fingerprint(current, trained.fingerprint)
+    check_fingerprint(current, index_fingerprint(current))
+
+
+def test_empty_index():
+    index = NeighbourhoodIndex.from_registry(BayRegistry.from_frame(pd.DataFrame(
+        {'RoadSegmentID': [], 'KerbsideID': [], 'Latitude': [], 'Longitude': []})))
+    assert len(index) == 0
+    assert len(index.groups_within(-37.8136, 144.9631, 500)) == 0
+    np.testing.assert_array_equal(index.group_of_point([-37.8136], [144.9631]), [-1])
+    np.testing.assert_array_equal(index.group_of([5101]), [-1])
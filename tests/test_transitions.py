@@ -0,0 +1,56 @@
+"""Incremental compaction gives the same runs as a rebuild."""
+import numpy as np
+import pandas as pd
+
+from parksense.snapshot_store import list_parts, write_snapshots
+from parksense.synthetic import generate_snapshots
+from parksense.transitions import RUN_COLUMNS, compact
+
+
+def _assert_same_runs(a, b):
+    assert a.statuses == b.statuses
+    for name in RUN_COLUMNS:
+        np.testing.assert_array_equal(getattr(a, name), getattr(b, name))
+
+
+def _rebuild(root, tmp_path):
+    return compact(root, str(tmp_path / 'rebuilt.npz'))
+
+
+def test_part_appended_to_last_compacted_day(tmp_path, capsys):
+    root = str(tmp_path / 'snapshots')
+    path = str(tmp_path / 'transitions.npz')
+    snapshots = generate_snapshots(scale=3 / 8, bays=40)
+    times = pd.to_datetime(snapshots['status_timestamp'], utc=True)
+    cut = times.max().floor('D') + pd.Timedelta(hours=12)
+
+    write_snapshots(snapshots[times < cut], root)
+    compact(root, path)
+    parts_before = len(list_parts(root))
+
+    # The extractor appends the rest of the day as a new part of the same partition
+    write_snapshots(snapshots[times >= cut], root)
+    assert len(list_parts(root)) == parts_before + 1
+    capsys.readouterr()
+    runs = compact(root, path)
+    assert "rebuilding" not in capsys.readouterr().out
+
+    _assert_same_runs(runs, _rebuild(root, tmp_path))
+
+
+def test_new_day_and_late_part(tmp_path):
+    root = str(tmp_path / 'snapshots')
+    path = str(tmp_path / 'transitions.npz')
+    snapshots = generate_snapshots(scale=4 / 8, bays=40)
+    times = pd.to_datetime(snapshots['status_timestamp'], utc=True)
+    last_day = times.max().floor('D')
+
+    write_snapshots(snapshots[times < last_day - pd.Timedelta(hours=6)], root)
+    compact(root, path)
+    # A late part for the last compacted day plus a whole new day
+    write_snapshots(snapshots[times >= last_day - pd.Timedelta(hours=6)], root)
+    runs = compact(root, path)
+    _assert_same_runs(runs, _rebuild(root, tmp_path))
+
+    # Nothing new: loads the saved runs
+    _assert_same_runs(compact(root, path), runs)
@@ -1,83 +1,427 @@
-import pandas as pd
-import numpy as np
 from xgboost import XGBRegressor
+import argparse
+import json
 import os
+import time
+
+import pandas as pd
+
+from parksense.compiled_model import export_model
+from parksense.features import (
+    FEATURES, BUCKETS_PER_DAY, bucket_start, build_feature_frame, combine_group_series, is_occupied,
+    kerbside_group, resample_groups, target_column, to_buckets,
+)
+from parksense.incremental import (
+    HOLDOUT_DAYS, MODES, context_start, holdout_errors, latest_version, new_rows, record_version,
+    store_watermark, target_buckets, update_booster,
+)
+from parksense.instrumentation import RunProfiler
+from parksense.occupancy_sweep import read_group_occupancy
+from parksense.out_of_core import BATCH_DIR, DAYS_PER_BATCH, spill_feature_batches, train_from_batches
+from parksense.rollup import group_series, update_rollup
+from parksense.snapshot_store import read_snapshots
+from parksense.spatial import NeighbourhoodIndex, check_fingerprint, index_fingerprint, save_fingerprint
+from parksense.transitions import compact
+
+GROUPINGS = ('kerbside', 'spatial')
+SOURCES = ('snapshots', 'transitions', 'rollup')
+REPORT_PATH = 'models/training_run.json'
+INCREMENTAL_REPORT_PATH = 'models/incremental_report.json'
+INCREMENTAL_ROUNDS = 50
+
+# Using XGBoost Regressor: A powerful tree-based model.
+# We optimize for 'Regression' because we are predicting a percentage (0.0 to 1.0).
+MODEL_PARAMS = dict(
+    n_estimators=300,    # Number of trees
+    learning_rate=0.05,  # Speed of learning
+    max_depth=7,         # Complexity of each tree
+    subsample=0.8,       # % of data used to grow each tree (prevents overfitting)
+    colsample_bytree=0.8
+)
 
-def train_production_model():
+def train_production_model(horizons=(15,), history_2019=False, grouping='kerbside', profile=True, nthread=None,
+                           source='snapshots'):
     """
     Trains the production XGBoost model to predict parking availability.
     The model uses 'neighborhood' grouping (20 bays) to provide more stable 
     predictions than tracking individual noisy sensor data.
+
+    With several `horizons` (minutes ahead, e.g. 15/30/45) the snapshots are
+    loaded and the feature matrix built once; only the target column differs
+    between the exported `parking_model_{h}m.ubj` models.
+
+    `history_2019` adds the 15-minute group occupancy swept from the 2019
+    sessions (see parksense/occupancy_sweep.py) to the training history.
+
+    `grouping='spatial'` groups bays by location (parksense/spatial.py)
+    instead of `kerbsideid // 20`. The backend must then use the same
+    NeighbourhoodIndex as its `group_fn`.
+
+    With `profile` each stage's wall/CPU time, peak RSS and row count are
+    written to models/training_run.json (see parksense/instrumentation.py).
+
+    `nthread` caps XGBoost's threads (default: all cores).
+
+    `source` picks where the 15-minute group series comes from: the raw
+    snapshot rows, the run-length-encoded transitions
+    (parksense/transitions.py) or the 15-minute group cells of the rollup
+    (parksense/rollup.py, kerbside grouping only). The last two are brought
+    up to date first.
     """
+    run_start = time.perf_counter()
+    # Stage timings/peak memory go to models/training_run.json (off: near-zero cost)
+    profiler = RunProfiler(enabled=profile)
+    
     print("🚀 Loading snapshot data...")
-    # Load historical sensor data exported from Supabase
-    df = pd.read_csv('data/supabase_snapshots.csv')
-    df['status_timestamp'] = pd.to_datetime(df['status_timestamp'])
+    # Load historical sensor data from the columnar snapshot store
+    # (see parksense/snapshot_store.py for importing a Supabase CSV export)
+    with profiler.stage('load') as stage:
+        if source == 'rollup':
+            if grouping != 'kerbside':
+                raise ValueError("The rollup's group cells use kerbside grouping only")
+            update_rollup()
+        elif source == 'transitions':
+            runs = compact()
+            stage.rows = len(runs)
+        else:
+            df = read_snapshots(columns=['kerbsideid', 'status', 'status_timestamp'])
+            stage.rows = len(df)
     
     # --- 1. Neighborhood Grouping Logic ---
     # We group bays into blocks of 20 based on their kerbside ID.
     # Individual sensor data is often too 'noisy' (flipping between Present/Vacant).
     # Predicting the occupancy % of a block is more accurate for the user.
     print("📍 Grouping bays into neighborhoods...")
-    df['group_id'] = (df['kerbsideid'] // 20) * 20
-    df['is_occupied'] = df['status'].apply(lambda x: 1 if x == 'Present' else 0)
+    with profiler.stage('grouping') as stage:
+        group_fn = NeighbourhoodIndex.load_or_build() if grouping == 'spatial' else kerbside_group
+        if source == 'snapshots':
+            group_ids = group_fn(df['kerbsideid'].to_numpy())
+            occupied = is_occupied(df['status'])
+            
+            # Bays without coordinates can't be placed in a spatial neighbourhood
+            located = group_ids >= 0
+            if not located.all():
+                print(f"⚠️ Skipping {(~located).sum():,} snapshots from bays not in the bay registry")
+                df, group_ids, occupied = df[located], group_ids[located], occupied[located]
+            stage.rows = len(group_ids)
     
     # 2. Time-Series Resampling 
     # Convert individual sensor events into consistent 15-minute 'heartbeats'.
     # This calculates the average occupancy ratio (0.0 to 1.0) for each group at each interval.
     print("📊 Preprocessing time-series into 15-min intervals...")
-    group_ts = df.groupby(['group_id', pd.Grouper(key='status_timestamp', freq='15min')])['is_occupied'].mean().reset_index()
-    group_ts.columns = ['group_id', 'timestamp', 'occupancy_ratio']
-    group_ts = group_ts.sort_values(['group_id', 'timestamp'])
+    with profiler.stage('resample') as stage:
+        if source == 'rollup':
+            # Already aggregated: just read the cells
+            group, bucket, ratio = group_series()
+        elif source == 'transitions':
+            # One event pair per run instead of one row per snapshot
+            group, bucket, ratio = runs.group_ratios(group_fn)
+            del runs
+        else:
+            group, bucket, ratio = resample_groups(group_ids, to_buckets(df['status_timestamp']), occupied)
+            del df, group_ids, occupied
+        
+        if history_2019:
+            if grouping != 'kerbside':
+                raise ValueError("The 2019 occupancy history is swept with kerbside grouping only")
+            print("📚 Adding 2019 occupancy history...")
+            group, bucket, ratio = combine_group_series(read_group_occupancy(), (group, bucket, ratio))
+        stage.rows = len(group)
+    # Incremental runs pick up after the last bucket this run saw
+    watermark = int(bucket.max())
     
     # --- 3. Feature Engineering ---
-    # We create inputs (X) that help the model understand 'patterns'.
+    # Time-of-day, lags (15m and 30m ago) and the target (occupancy 15 minutes
+    # into the future). Shared with the backend via parksense/features.py.
     print("🛠️ Engineering features (lags and time-based)...")
-    group_ts['hour'] = group_ts['timestamp'].dt.hour
-    group_ts['day_of_week'] = group_ts['timestamp'].dt.dayofweek
-    
-    # Lag Features: Looking at what happened 15m and 30m ago to find trends
-    group_ts['lag_15m'] = group_ts.groupby('group_id')['occupancy_ratio'].shift(1)
-    group_ts['lag_30m'] = group_ts.groupby('group_id')['occupancy_ratio'].shift(2)
-    
-    # Target Variable: This is what we want the model to learn to predict
-    # We shift the current occupancy back by 1 (which represents 15 minutes into the future)
-    group_ts['target_15m'] = group_ts.groupby('group_id')['occupancy_ratio'].shift(-1)
-    
-    # Remove rows with empty values created by the 'shifts' (the very first and last records)
-    model_data = group_ts.dropna()
+    with profiler.stage('features') as stage:
+        group_ts = build_feature_frame(group, bucket, ratio, horizons)
+        stage.rows = len(group_ts)
     
     # Define the exact order of features for the model
-    features = ['group_id', 'occupancy_ratio', 'hour', 'day_of_week', 'lag_15m', 'lag_30m']
-    X = model_data[features]
-    y = model_data['target_15m']
-    
-    # --- 4. Model Training ---
-    # Using XGBoost Regressor: A powerful tree-based model.
-    # We optimize for 'Regression' because we are predicting a percentage (0.0 to 1.0).
-    print(f"🧠 Training XGBoost model on {len(X)} samples...")
-    model = XGBRegressor(
-        n_estimators=300,    # Number of trees
-        learning_rate=0.05,  # Speed of learning
-        max_depth=7,         # Complexity of each tree
-        subsample=0.8,       # % of data used to grow each tree (prevents overfitting)
-        colsample_bytree=0.8
-    )
-    model.fit(X, y)
+    features = FEATURES
+    shared_s = time.perf_counter() - run_start
     
-    # --- 5. Exporting for Production ---
-    # Save the model in Universal Binary JSON format for fast loading in the FastAPI backend.
     os.makedirs('models', exist_ok=True)
-    model_file = 'models/parking_model_15m.ubj'
-    model.save_model(model_file)
+    fit_times = {}
+    for horizon in horizons:
+        horizon_start = time.perf_counter()
+        target = target_column(horizon)
+        
+        with profiler.stage(f'fit_{horizon}m') as stage:
+            # Remove rows with empty values created by the 'shifts' (the very first and last records)
+            model_data = group_ts.dropna(subset=features + [target])
+            X = model_data[features]
+            y = model_data[target]
+            
+            # --- 4. Model Training ---
+            print(f"🧠 Training {horizon}m XGBoost model on {len(X)} samples...")
+            model = XGBRegressor(**MODEL_PARAMS, n_jobs=nthread)
+            model.fit(X, y)
+            stage.rows = len(X)
+        
+        # --- 5. Exporting for Production ---
+        # Save the model in Universal Binary JSON format for fast loading in the FastAPI backend,
+        # plus the compiled .npz copy that workers can score without importing xgboost.
+        model_file = f'models/parking_model_{horizon}m.ubj'
+        with profiler.stage(f'export_{horizon}m'):
+            model.save_model(model_file)
+            export_model(model_file)
+            version = record_version(model_file, horizon, 'full', watermark, grouping,
+                                     MODEL_PARAMS['n_estimators'], len(X), index=index_fingerprint(group_fn))
+        fit_times[horizon] = time.perf_counter() - horizon_start
+        print(f"✅ Success! Model saved to {model_file} (version {version})")
     
     # Save the feature sequence to ensure the backend provides data in the SAME order
+    # (one manifest shared by every horizon model)
     with open('models/features.txt', 'w') as f:
         f.write(",".join(features))
+    save_fingerprint(group_fn)
         
-    print(f"✅ Success! Model saved to {model_file}")
     print(f"📍 Features expected by BE: {features}")
+    
+    if len(horizons) > 1:
+        total_s = time.perf_counter() - run_start
+        # Separate runs would each repeat the load + feature build
+        separate_s = len(horizons) * shared_s + sum(fit_times.values())
+        print(f"⏱️ Load + features: {shared_s:.1f}s (once), "
+              f"fits: {', '.join(f'{h}m {t:.1f}s' for h, t in fit_times.items())}")
+        print(f"⏱️ Total wall time: {total_s:.1f}s vs ~{separate_s:.1f}s for {len(horizons)} separate runs")
+    
+    report_path = profiler.write_report(REPORT_PATH, horizons=list(horizons), history_2019=history_2019,
+                                        grouping=grouping, model_params=MODEL_PARAMS,
+                                        source=source)
+    if report_path:
+        print(f"⏱️ Stage profile ({report_path}):\n{profiler.summary()}")
+
+def train_out_of_core_model(horizons=(15,), history_2019=False, grouping='kerbside', profile=True,
+                            nthread=None, days_per_batch=DAYS_PER_BATCH, external_memory=False):
+    """
+    Same models as `train_production_model`, trained with bounded memory.
+    The snapshot store is streamed a few days at a time into feature batches
+    on disk (parksense/out_of_core.py). XGBoost reads them back through a
+    DataIter into a QuantileDMatrix with `hist`. With `external_memory` the
+    quantized pages stay on disk too.
+    """
+    run_start = time.perf_counter()
+    profiler = RunProfiler(enabled=profile)
+    group_fn = NeighbourhoodIndex.load_or_build() if grouping == 'spatial' else kerbside_group
+    if history_2019 and grouping != 'kerbside':
+        raise ValueError("The 2019 occupancy history is swept with kerbside grouping only")
+    watermark = store_watermark()
+    
+    print(f"🚀 Streaming snapshots into feature batches ({days_per_batch} days each)...")
+    with profiler.stage('features') as stage:
+        batches, rows = spill_feature_batches(horizons, BATCH_DIR, days_per_batch=days_per_batch,
+                                              group_fn=group_fn, history_2019=history_2019)
+        stage.rows = rows
+    print(f"🛠️ {rows:,} feature rows in {batches} batches under {BATCH_DIR}")
+    
+    os.makedirs('models', exist_ok=True)
+    for horizon in horizons:
+        print(f"🧠 Training {horizon}m XGBoost model from batches...")
+        with profiler.stage(f'fit_{horizon}m') as stage:
+            booster, rows = train_from_batches(BATCH_DIR, horizon, MODEL_PARAMS, nthread, external_memory)
+            stage.rows = rows
+        model_file = f'models/parking_model_{horizon}m.ubj'
+        with profiler.stage(f'export_{horizon}m'):
+            booster.save_model(model_file)
+            export_model(model_file)
+            version = record_version(model_file, horizon, 'full', watermark, grouping,
+                                     MODEL_PARAMS['n_estimators'], rows, index=index_fingerprint(group_fn))
+        print(f"✅ Success! Model saved to {model_file} ({rows:,} samples, version {version})")
+    
+    with open('models/features.txt', 'w') as f:
+        f.write(",".join(FEATURES))
+    save_fingerprint(group_fn)
+    print(f"📍 Features expected by BE: {FEATURES}")
+    print(f"⏱️ Total wall time: {time.perf_counter() - run_start:.1f}s")
+    
+    report_path = profiler.write_report(REPORT_PATH, horizons=list(horizons), history_2019=history_2019,
+                                        grouping=grouping, model_params=MODEL_PARAMS, out_of_core=True,
+                                        days_per_batch=days_per_batch, external_memory=external_memory,
+                                        nthread=nthread)
+    if report_path:
+        print(f"⏱️ Stage profile ({report_path}):\n{profiler.summary()}")
+
+def _group_feature_frame(df, group_fn, horizons):
+    """Snapshot rows -> (feature frame, group, bucket); frame rows line up with the arrays."""
+    group_ids = group_fn(df['kerbsideid'].to_numpy())
+    located = group_ids >= 0
+    group, bucket, ratio = resample_groups(group_ids[located], to_buckets(df['status_timestamp'][located]),
+                                           is_occupied(df['status'][located]))
+    return build_feature_frame(group, bucket, ratio, horizons), group, bucket
+
+def train_incremental_model(horizons=(15,), mode='continue', rounds=INCREMENTAL_ROUNDS, compare=False,
+                            since=None, profile=True, nthread=None):
+    """
+    Updates the exported models with the snapshots that arrived after their
+    training watermark, instead of rebuilding every tree over the full
+    history (see parksense/incremental.py).
+
+    `mode='continue'` adds `rounds` trees; `mode='refresh'` re-fits the leaf
+    values of the existing trees. The result is saved as a new version and
+    becomes the production model. `since` sets the watermark for models
+    trained before versions were recorded.
+
+    With `compare` the last HOLDOUT_DAYS are held out first. The previous
+    model, an incremental update and a full retrain over all earlier history
+    are scored on them, and their MAE/RMSE and wall times are written to
+    models/incremental_report.json. That shows when a full rebuild is due.
+    """
+    run_start = time.perf_counter()
+    profiler = RunProfiler(enabled=profile)
+
+    entries = {horizon: latest_version(horizon) for horizon in horizons}
+    missing = [horizon for horizon, entry in entries.items() if entry is None]
+    if missing and since is None:
+        raise ValueError(f"No recorded version of the {missing}m model(s): run a full training first or pass --since")
+    since_bucket = None if since is None else int(to_buckets(pd.to_datetime([since], utc=True))[0])
+    watermarks = {horizon: since_bucket if since is not None else entry['watermark_bucket']
+                  for horizon, entry in entries.items()}
+    groupings = {entry['grouping'] for entry in entries.values() if entry} or {'kerbside'}
+    if len(groupings) > 1:
+        raise ValueError(f"Models were trained with different groupings {groupings}: retrain them fully")
+    grouping = groupings.pop()
+    group_fn = NeighbourhoodIndex.load_or_build() if grouping == 'spatial' else kerbside_group
+    for horizon, entry in entries.items():
+        if entry:
+            # Spatial group ids are renumbered when the bay registry changes
+            check_fingerprint(group_fn, entry.get('index'), f"the {horizon}m model (version {entry['version']})")
+
+    loaded_from = context_start(min(watermarks.values()))
+    print(f"🚀 Loading snapshots since {loaded_from} (watermark minus lag context)...")
+    with profiler.stage('load') as stage:
+        df = read_snapshots(columns=['kerbsideid', 'status', 'status_timestamp'], start=loaded_from)
+        stage.rows = len(df)
+    print("🛠️ Engineering features for the new data...")
+    with profiler.stage('features') as stage:
+        frame, group, bucket = _group_feature_frame(df, group_fn, horizons)
+        stage.rows = len(frame)
+    del df
+    data_end = int(bucket.max())
+    shared_s = time.perf_counter() - run_start
+
+    if compare:
+        holdout_start = data_end - HOLDOUT_DAYS * BUCKETS_PER_DAY + 1
+        print(f"📚 Building full-history features for the comparison retrain...")
+        full_start = time.perf_counter()
+        with profiler.stage('full_features') as stage:
+            full_frame, full_group, full_bucket = _group_feature_frame(
+                read_snapshots(columns=['kerbsideid', 'status', 'status_timestamp']), group_fn, horizons)
+            stage.rows = len(full_frame)
+        full_features_s = time.perf_counter() - full_start
+
+    os.makedirs('models', exist_ok=True)
+    report = {'mode': mode, 'rounds': rounds if mode == 'continue' else None, 'grouping': grouping, 'horizons': {}}
+    for horizon in horizons:
+        target = target_column(horizon)
+        model_file = f'models/parking_model_{horizon}m.ubj'
+        base_file = entries[horizon]['model'] if entries[horizon] else model_file
+        labelled = frame[FEATURES + [target]].notna().all(axis=1).to_numpy()
+        fresh = new_rows(group, bucket, horizon, watermarks[horizon]) & labelled
+        if not fresh.any():
+            print(f"✅ {horizon}m model is up to date (no new labelled rows)")
+            continue
+        result = {'base_version': entries[horizon]['version'] if entries[horizon] else None}
+
+        if compare:
+            update_rows = fresh & (target_buckets(group, bucket, horizon) < holdout_start)
+            holdout = labelled & (bucket >= holdout_start)
+            X_holdout, y_holdout = frame.loc[holdout, FEATURES], frame.loc[holdout, target]
+            if not update_rows.any() or not holdout.any():
+                print(f"⚠️ Not enough new data before the {HOLDOUT_DAYS}-day holdout to compare the {horizon}m model")
+            else:
+                print(f"🧪 Comparing on {holdout.sum():,} holdout rows: previous, {mode} update, full retrain...")
+                previous = XGBRegressor()
+                previous.load_model(base_file)
+                with profiler.stage(f'holdout_update_{horizon}m') as stage:
+                    update_start = time.perf_counter()
+                    candidate = update_booster(base_file, frame.loc[update_rows, FEATURES],
+                                               frame.loc[update_rows, target], mode, MODEL_PARAMS, rounds, nthread)
+                    update_s = time.perf_counter() - update_start
+                    stage.rows = int(update_rows.sum())
+                with profiler.stage(f'full_retrain_{horizon}m') as stage:
+                    full_rows = (full_frame[FEATURES + [target]].notna().all(axis=1).to_numpy()
+                                 & (target_buckets(full_group, full_bucket, horizon) < holdout_start))
+                    fit_start = time.perf_counter()
+                    full = XGBRegressor(**MODEL_PARAMS, n_jobs=nthread)
+                    full.fit(full_frame.loc[full_rows, FEATURES], full_frame.loc[full_rows, target])
+                    full_fit_s = time.perf_counter() - fit_start
+                    stage.rows = int(full_rows.sum())
+                result['holdout'] = {
+                    'start': bucket_start([holdout_start])[0].isoformat(),
+                    'previous': holdout_errors(y_holdout, previous.predict(X_holdout)),
+                    'incremental': {**holdout_errors(y_holdout, candidate.inplace_predict(X_holdout)),
+                                    'train_rows': int(update_rows.sum()), 'wall_s': shared_s + update_s},
+                    'full_retrain': {**holdout_errors(y_holdout, full.predict(X_holdout)),
+                                     'train_rows': int(full_rows.sum()), 'wall_s': full_features_s + full_fit_s},
+                }
+                for name, scores in result['holdout'].items():
+                    if name != 'start':
+                        print(f"   {name:<13} MAE {scores['mae']:.4f}  RMSE {scores['rmse']:.4f}"
+                              + (f"  ({scores['train_rows']:,} rows, {scores['wall_s']:.1f}s)" if 'wall_s' in scores else ''))
+
+        # The production update uses every new labelled row, holdout included
+        print(f"🧠 {mode.capitalize()} {horizon}m model on {fresh.sum():,} new rows...")
+        with profiler.stage(f'fit_{horizon}m') as stage:
+            booster = update_booster(base_file, frame.loc[fresh, FEATURES], frame.loc[fresh, target],
+                                     mode, MODEL_PARAMS, rounds, nthread)
+            stage.rows = int(fresh.sum())
+        with profiler.stage(f'export_{horizon}m'):
+            booster.save_model(model_file)
+            export_model(model_file)
+            version = record_version(model_file, horizon, mode, data_end, grouping, booster.num_boosted_rounds(),
+                                     fresh.sum(), base_version=result['base_version'],
+                                     index=index_fingerprint(group_fn))
+        result.update(version=version, rows=int(fresh.sum()), trees=booster.num_boosted_rounds())
+        report['horizons'][str(horizon)] = result
+        print(f"✅ Success! Model saved to {model_file} (version {version}, {booster.num_boosted_rounds()} trees)")
+
+    report['wall_s'] = time.perf_counter() - run_start
+    with open(INCREMENTAL_REPORT_PATH, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"⏱️ Total wall time: {report['wall_s']:.1f}s (report: {INCREMENTAL_REPORT_PATH})")
+    report_path = profiler.write_report(REPORT_PATH, horizons=list(horizons), grouping=grouping,
+                                        model_params=MODEL_PARAMS, incremental=mode, rounds=rounds)
+    if report_path:
+        print(f"⏱️ Stage profile ({report_path}):\n{profiler.summary()}")
 
 if __name__ == "__main__":
-    train_production_model()
+    parser = argparse.ArgumentParser(description="Train the ParkSense XGBoost model(s).")
+    parser.add_argument('--horizons', type=int, nargs='+', default=[15],
+                        help="Prediction horizons in minutes, e.g. --horizons 15 30 45")
+    parser.add_argument('--history-2019', action='store_true',
+                        help="Also train on the 2019 occupancy swept by parksense/occupancy_sweep.py")
+    parser.add_argument('--grouping', choices=GROUPINGS, default='kerbside',
+                        help="Neighbourhoods from kerbside ID blocks of 20, or from bay locations")
+    parser.add_argument('--no-profile', action='store_true',
+                        help=f"Don't record stage timings/peak memory to {REPORT_PATH}")
+    parser.add_argument('--nthread', type=int, default=None, help="XGBoost threads (default: all cores)")
+    parser.add_argument('--out-of-core', action='store_true',
+                        help="Stream the store in day batches instead of loading it all (bounded memory)")
+    parser.add_argument('--days-per-batch', type=int, default=DAYS_PER_BATCH,
+                        help="Days of snapshots per out-of-core batch")
+    parser.add_argument('--external-memory', action='store_true',
+                        help="With --out-of-core, also keep XGBoost's quantized pages on disk")
+    parser.add_argument('--source', choices=SOURCES, default='snapshots',
+                        help="Raw snapshots, compacted transition runs or the occupancy rollup")
+    parser.add_argument('--incremental', choices=MODES, default=None,
+                        help="Warm-start the current models on data newer than their watermark instead")
+    parser.add_argument('--rounds', type=int, default=INCREMENTAL_ROUNDS,
+                        help="Trees added by --incremental continue")
+    parser.add_argument('--compare', action='store_true',
+                        help=f"With --incremental, score it against a full retrain on a {HOLDOUT_DAYS}-day holdout")
+    parser.add_argument('--since', default=None,
+                        help="With --incremental, watermark for models trained before versions were recorded")
+    args = parser.parse_args()
+    if args.incremental:
+        train_incremental_model(tuple(args.horizons), args.incremental, args.rounds, args.compare, args.since,
+                                not args.no_profile, args.nthread)
+    elif args.out_of_core:
+        train_out_of_core_model(tuple(args.horizons), args.history_2019, args.grouping, not args.no_profile,
+                                args.nthread, args.days_per_batch, args.external_memory)
+    else:
+        train_production_model(tuple(args.horizons), args.history_2019, args.grouping, not args.no_profile,
+                               args.nthread, args.source)
 